@@ -20,5 +20,11 @@ class AgentConfig:
     # Monitoring
     process_update_interval = 5  # seconds
 
+    # Logging (written by a background thread)
+    log_level = os.environ.get('LOG_LEVEL', 'INFO')
+    log_file = os.environ.get('LOG_FILE')  # rotating file, in addition to the console
+    log_json = os.environ.get('LOG_JSON', 'false').lower() == 'true'  # JSON lines in LOG_FILE
+    log_repeat_limit = int(os.environ.get('LOG_REPEAT_LIMIT', '5'))  # identical messages per minute (0 = no limit)
+
     def __repr__(self):
         return f"AgentConfig(server={self.server_url}, student={self.student_name})"
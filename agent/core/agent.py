@@ -35,6 +35,12 @@ class StudentAgent:
         self.student_id = None
         self.is_locked = False
 
+        # Capture settings (the server lowers these when no teacher is watching)
+        self.screenshot_interval = config.screenshot_interval
+        self.max_width = 1280
+        self.max_height = 720
+        self.capture_wakeup = threading.Event()
+
         logger.info(f"Agent initialized on {platform.system()}")
 
     def start(self):
@@ -42,6 +48,10 @@ class StudentAgent:
         logger.info("Starting agent...")
         self.running = True
 
+        # Register event handlers before connecting so the settings sent
+        # right after registration aren't missed
+        self._register_handlers()
+
         # Connect to server
         self.network.connect()
 
@@ -52,9 +62,6 @@ class StudentAgent:
         screenshot_thread.start()
         process_thread.start()
 
-        # Register event handlers
-        self._register_handlers()
-
         logger.info("Agent started successfully")
 
         # Keep main thread alive
@@ -99,12 +106,15 @@ class StudentAgent:
                         # Compress
                         compressed, img_hash, size_kb = compress_image(
                             screenshot_data,
-                            quality=self.config.screenshot_quality
+                            quality=self.config.screenshot_quality,
+                            max_width=self.max_width,
+                            max_height=self.max_height
                         )
 
                         # Get active window info
                         active_window = self.screen_capture.get_active_window()
                         active_app = self.screen_capture.get_active_app()
+                        window_rect = self.screen_capture.get_active_window_rect()
 
                         # Send to server
                         self.network.emit('screen_update', {
@@ -113,12 +123,15 @@ class StudentAgent:
                             'size_kb': size_kb,
                             'active_window': active_window,
                             'active_app': active_app,
+                            'window_rect': window_rect,
                             'timestamp': datetime.now().isoformat()
                         })
 
                         logger.debug(f"Screenshot sent ({size_kb:.1f} KB)")
 
-                time.sleep(self.config.screenshot_interval)
+                # Sleep until the next capture, or until the settings change
+                self.capture_wakeup.wait(self.screenshot_interval)
+                self.capture_wakeup.clear()
 
             except Exception as e:
                 logger.error(f"Screenshot loop error: {e}")
@@ -181,6 +194,21 @@ class StudentAgent:
                 print(f"  {i}. {option}")
             print()
 
+        @self.network.on('capture_settings')
+        def handle_capture_settings(data):
+            """Adjust capture rate and size to what teachers are viewing"""
+            self.screenshot_interval = max(
+                self.config.screenshot_interval,
+                data.get('interval', self.config.screenshot_interval)
+            )
+            self.max_width = data.get('max_width', self.max_width)
+            self.max_height = data.get('max_height', self.max_height)
+            logger.info(
+                f"Capture settings: every {self.screenshot_interval}s "
+                f"at {self.max_width}x{self.max_height} (watched={data.get('watched')})"
+            )
+            self.capture_wakeup.set()
+
         @self.network.on('shutdown')
         def handle_shutdown(data):
             """Emergency shutdown"""
@@ -1,5 +1,8 @@
 import socketio
 import time
+from utils.logger import get_logger
+
+logger = get_logger('network')
 
 class NetworkHandler:
     """Handle WebSocket connection with auto-reconnect"""
@@ -34,7 +37,7 @@ class NetworkHandler:
                 return True
             except Exception as e:
                 retry_count += 1
-                print(f"Connection failed (attempt {retry_count}/{max_retries}): {e}")
+                logger.error(f"Connection failed (attempt {retry_count}/{max_retries}): {e}")
                 if retry_count < max_retries:
                     time.sleep(2 ** retry_count)  # Exponential backoff
 
@@ -52,7 +55,7 @@ class NetworkHandler:
         try:
             self.sio.emit(event, data)
         except Exception as e:
-            print(f"Emit error: {e}")
+            logger.error(f"Emit error: {e}")
 
     def on(self, event):
         """Decorator to register event handler"""
@@ -5,6 +5,9 @@ from tkinter import font as tkfont
 import threading
 import platform
 from datetime import datetime, timedelta
+from utils.logger import get_logger
+
+logger = get_logger('overlay')
 
 class NotificationOverlay:
     """Display temporary notification overlay"""
@@ -108,7 +111,7 @@ class NotificationOverlay:
             self.window.mainloop()
 
         except Exception as e:
-            print(f"Notification error: {e}")
+            logger.error(f"Notification error: {e}")
 
     def hide(self):
         """Hide notification"""
@@ -261,7 +264,7 @@ class LockOverlay:
             self.window.mainloop()
 
         except Exception as e:
-            print(f"Lock overlay error: {e}")
+            logger.error(f"Lock overlay error: {e}")
             self.is_active = False
 
     def _update_countdown(self):
@@ -330,5 +333,5 @@ class LockOverlay:
                     self.unlock_callback()
 
             except Exception as e:
-                print(f"Error hiding lock overlay: {e}")
+                logger.error(f"Error hiding lock overlay: {e}")
                 self.is_active = False
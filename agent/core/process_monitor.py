@@ -1,4 +1,7 @@
 import psutil
+from utils.logger import get_logger
+
+logger = get_logger('process_monitor')
 
 class ProcessMonitor:
     """Monitor running processes"""
@@ -14,7 +17,7 @@ class ProcessMonitor:
                     pass
             return list(set(processes))  # Remove duplicates
         except Exception as e:
-            print(f"Process monitoring error: {e}")
+            logger.error(f"Process monitoring error: {e}")
             return []
 
     def get_browser_urls(self):
@@ -7,6 +7,10 @@ import os
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from utils.logger import get_logger
+
+logger = get_logger('screen_capture')
+
 OS = platform.system()
 
 # Import platform-specific implementation
@@ -19,7 +23,7 @@ try:
         from platform.linux import LinuxScreenCapture as PlatformCapture
     HAS_PLATFORM_CAPTURE = True
 except ImportError as e:
-    print(f"Warning: Platform-specific capture not available: {e}")
+    logger.warning(f"Platform-specific capture not available: {e}")
     HAS_PLATFORM_CAPTURE = False
     PlatformCapture = None
 
@@ -33,13 +37,13 @@ class ScreenCapture:
             try:
                 self.platform_capture = PlatformCapture()
                 self.use_platform = True
-                print(f"✅ Using {OS}-specific screen capture")
+                logger.info(f"✅ Using {OS}-specific screen capture")
             except Exception as e:
-                print(f"⚠️ Platform capture initialization failed: {e}")
+                logger.warning(f"⚠️ Platform capture initialization failed: {e}")
                 self.use_platform = False
                 self.platform_capture = None
         else:
-            print(f"⚠️ No platform-specific capture available for {OS}")
+            logger.warning(f"⚠️ No platform-specific capture available for {OS}")
             self.use_platform = False
             self.platform_capture = None
             self._init_fallback()
@@ -50,9 +54,9 @@ class ScreenCapture:
             import mss
             self.sct = mss.mss()
             self.use_mss = True
-            print("✅ Using fallback mss screen capture")
+            logger.info("✅ Using fallback mss screen capture")
         except ImportError:
-            print("❌ No screen capture available (mss not installed)")
+            logger.error("❌ No screen capture available (mss not installed)")
             self.use_mss = False
             self.sct = None
 
@@ -66,7 +70,7 @@ class ScreenCapture:
             try:
                 return self.platform_capture.capture()
             except Exception as e:
-                print(f"Platform capture error: {e}")
+                logger.error(f"Platform capture error: {e}")
                 # Fall through to fallback
 
         # Fallback to mss
@@ -96,7 +100,7 @@ class ScreenCapture:
 
             return base64.b64encode(img_bytes).decode('utf-8')
         except Exception as e:
-            print(f"Fallback capture error: {e}")
+            logger.error(f"Fallback capture error: {e}")
             return None
 
     def get_active_window(self):
@@ -105,16 +109,47 @@ class ScreenCapture:
             try:
                 return self.platform_capture.get_active_window()
             except Exception as e:
-                print(f"Error getting active window: {e}")
+                logger.error(f"Error getting active window: {e}")
 
         return "Unknown"
 
+    def get_active_window_rect(self):
+        """
+        Where the active window is on the screenshot, so the server can crop
+        to it before AI analysis
+        Returns: [x, y, width, height] as fractions of the screen, or None
+        """
+        if not (self.use_platform and self.platform_capture):
+            return None
+
+        try:
+            rect = self.platform_capture.get_active_window_rect()
+        except Exception as e:
+            logger.error(f"Error getting active window rect: {e}")
+            return None
+        if not rect:
+            return None
+
+        x, y, width, height, screen_width, screen_height = rect
+        if screen_width <= 0 or screen_height <= 0:
+            return None
+
+        # Clip to the screen (windows can hang off an edge)
+        left = min(max(x / screen_width, 0.0), 1.0)
+        top = min(max(y / screen_height, 0.0), 1.0)
+        right = min(max((x + width) / screen_width, 0.0), 1.0)
+        bottom = min(max((y + height) / screen_height, 0.0), 1.0)
+        if right <= left or bottom <= top:
+            return None
+
+        return [round(left, 4), round(top, 4), round(right - left, 4), round(bottom - top, 4)]
+
     def get_active_app(self):
         """Get name of active application"""
         if self.use_platform and self.platform_capture:
             try:
                 return self.platform_capture.get_active_app()
             except Exception as e:
-                print(f"Error getting active app: {e}")
+                logger.error(f"Error getting active app: {e}")
 
         return "Unknown"
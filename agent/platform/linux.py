@@ -4,6 +4,9 @@ import subprocess
 import base64
 import tempfile
 import os
+from utils.logger import get_logger
+
+logger = get_logger('platform.linux')
 
 try:
     from PIL import Image
@@ -23,11 +26,11 @@ class LinuxScreenCapture:
                 self.display = Xlib.display.Display()
             except:
                 self.display = None
-                print("Warning: Could not connect to X11 display")
+                logger.warning("Could not connect to X11 display")
         else:
             self.display = None
-            print(
-                "Warning: Linux dependencies not installed. "
+            logger.warning(
+                "Linux dependencies not installed. "
                 "Install: pip install pillow python-xlib"
             )
 
@@ -59,7 +62,7 @@ class LinuxScreenCapture:
                         timeout=5
                     )
                 except (subprocess.CalledProcessError, FileNotFoundError):
-                    print("Error: Neither scrot nor imagemagick found")
+                    logger.error("Neither scrot nor imagemagick found")
                     return None
 
             # Read and encode
@@ -72,10 +75,10 @@ class LinuxScreenCapture:
             return base64.b64encode(img_bytes).decode('utf-8')
 
         except subprocess.TimeoutExpired:
-            print("Screenshot timeout on Linux")
+            logger.warning("Screenshot timeout on Linux")
             return None
         except Exception as e:
-            print(f"Linux capture error: {e}")
+            logger.error(f"Linux capture error: {e}")
             return None
 
     def get_active_window(self):
@@ -118,9 +121,41 @@ class LinuxScreenCapture:
             return "Unknown"
 
         except Exception as e:
-            print(f"Error getting active window: {e}")
+            logger.error(f"Error getting active window: {e}")
             return self._fallback_get_active_window()
 
+    def get_active_window_rect(self):
+        """
+        Position of the active window on the root window (what scrot captures)
+        Returns: (x, y, width, height, screen_width, screen_height) in pixels, or None
+        """
+        if not self.display:
+            return None
+
+        try:
+            screen = self.display.screen()
+            root = screen.root
+
+            window_id = root.get_full_property(
+                self.display.intern_atom('_NET_ACTIVE_WINDOW'),
+                Xlib.X.AnyPropertyType
+            )
+            if not window_id or not window_id.value[0]:
+                return None
+
+            window = self.display.create_resource_object('window', window_id.value[0])
+            geometry = window.get_geometry()
+            # Root's origin in window coordinates is minus the window's position
+            origin = window.translate_coords(root, 0, 0)
+
+            return (
+                -origin.x, -origin.y, geometry.width, geometry.height,
+                screen.width_in_pixels, screen.height_in_pixels
+            )
+        except Exception as e:
+            logger.error(f"Error getting active window rect: {e}")
+            return None
+
     def _fallback_get_active_window(self):
         """Fallback method using xdotool"""
         try:
@@ -161,7 +196,7 @@ class LinuxScreenCapture:
             return "Unknown"
 
         except Exception as e:
-            print(f"Error getting active app: {e}")
+            logger.error(f"Error getting active app: {e}")
             return self._fallback_get_active_app()
 
     def _fallback_get_active_app(self):
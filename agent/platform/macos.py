@@ -5,6 +5,9 @@ import base64
 import io
 import tempfile
 import os
+from utils.logger import get_logger
+
+logger = get_logger('platform.macos')
 
 try:
     from PIL import Image
@@ -20,8 +23,8 @@ class MacOSScreenCapture:
 
     def __init__(self):
         if not HAS_MACOS_DEPS:
-            print(
-                "Warning: macOS dependencies not fully installed. "
+            logger.warning(
+                "macOS dependencies not fully installed. "
                 "Install: pip install pillow pyobjc-framework-Cocoa pyobjc-framework-Quartz"
             )
 
@@ -53,10 +56,10 @@ class MacOSScreenCapture:
             return base64.b64encode(img_bytes).decode('utf-8')
 
         except subprocess.TimeoutExpired:
-            print("Screenshot timeout on macOS")
+            logger.warning("Screenshot timeout on macOS")
             return None
         except Exception as e:
-            print(f"macOS capture error: {e}")
+            logger.error(f"macOS capture error: {e}")
             return None
 
     def get_active_window(self):
@@ -76,9 +79,38 @@ class MacOSScreenCapture:
                 )
                 return result.stdout.strip() if result.returncode == 0 else "Unknown"
         except Exception as e:
-            print(f"Error getting active window: {e}")
+            logger.error(f"Error getting active window: {e}")
             return "Unknown"
 
+    def get_active_window_rect(self):
+        """
+        Position of the frontmost app's main window on the main display
+        Returns: (x, y, width, height, screen_width, screen_height) in points, or None
+        """
+        if not HAS_MACOS_DEPS:
+            return None
+
+        try:
+            pid = NSWorkspace.sharedWorkspace().activeApplication().get('NSApplicationProcessIdentifier')
+            windows = Quartz.CGWindowListCopyWindowInfo(
+                Quartz.kCGWindowListOptionOnScreenOnly | Quartz.kCGWindowListExcludeDesktopElements,
+                Quartz.kCGNullWindowID
+            )
+            screen = Quartz.CGDisplayBounds(Quartz.CGMainDisplayID()).size
+
+            # Front-to-back order; layer 0 skips menus and overlays
+            for window in windows:
+                if window.get('kCGWindowOwnerPID') == pid and window.get('kCGWindowLayer') == 0:
+                    bounds = window['kCGWindowBounds']
+                    return (
+                        bounds['X'], bounds['Y'], bounds['Width'], bounds['Height'],
+                        screen.width, screen.height
+                    )
+            return None
+        except Exception as e:
+            logger.error(f"Error getting active window rect: {e}")
+            return None
+
     def get_active_app(self):
         """Get name of active application"""
         try:
@@ -96,5 +128,5 @@ class MacOSScreenCapture:
                 )
                 return result.stdout.strip() if result.returncode == 0 else "Unknown"
         except Exception as e:
-            print(f"Error getting active app: {e}")
+            logger.error(f"Error getting active app: {e}")
             return "Unknown"
@@ -2,6 +2,9 @@
 
 import base64
 import io
+from utils.logger import get_logger
+
+logger = get_logger('platform.windows')
 
 try:
     import mss
@@ -46,7 +49,7 @@ class WindowsScreenCapture:
             return base64.b64encode(img_bytes).decode('utf-8')
 
         except Exception as e:
-            print(f"Windows capture error: {e}")
+            logger.error(f"Windows capture error: {e}")
             return None
 
     def get_active_window(self):
@@ -56,9 +59,26 @@ class WindowsScreenCapture:
             window_title = win32gui.GetWindowText(hwnd)
             return window_title if window_title else "Unknown"
         except Exception as e:
-            print(f"Error getting active window: {e}")
+            logger.error(f"Error getting active window: {e}")
             return "Unknown"
 
+    def get_active_window_rect(self):
+        """
+        Position of the active window on the captured (primary) monitor
+        Returns: (x, y, width, height, screen_width, screen_height) in pixels, or None
+        """
+        try:
+            hwnd = win32gui.GetForegroundWindow()
+            left, top, right, bottom = win32gui.GetWindowRect(hwnd)
+            monitor = self.sct.monitors[1]
+            return (
+                left - monitor['left'], top - monitor['top'], right - left, bottom - top,
+                monitor['width'], monitor['height']
+            )
+        except Exception as e:
+            logger.error(f"Error getting active window rect: {e}")
+            return None
+
     def get_active_app(self):
         """Get name of active application"""
         try:
@@ -67,5 +87,5 @@ class WindowsScreenCapture:
             process = psutil.Process(pid)
             return process.name()
         except Exception as e:
-            print(f"Error getting active app: {e}")
+            logger.error(f"Error getting active app: {e}")
             return "Unknown"
@@ -2,6 +2,9 @@ from PIL import Image
 import io
 import base64
 import hashlib
+from utils.logger import get_logger
+
+logger = get_logger('compression')
 
 def compress_image(base64_str, quality=60, max_width=1280, max_height=720):
     """
@@ -40,5 +43,5 @@ def compress_image(base64_str, quality=60, max_width=1280, max_height=720):
         return compressed_base64, img_hash, size_kb
 
     except Exception as e:
-        print(f"Compression error: {e}")
+        logger.error(f"Compression error: {e}")
         return None, None, 0
@@ -1,23 +1,169 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import queue
 import sys
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
 
-def get_logger(name):
-    """Get configured logger instance"""
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
+_lock = threading.Lock()
+_listener = None
+
+# Attributes every LogRecord has; anything else came in through `extra=`
+_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RepeatFilter(logging.Filter):
+    """
+    Let at most `limit` identical messages through per `window` seconds.
+
+    Identical means same logger, level and formatted text, so a capture
+    error raised every frame is logged a few times a minute while distinct
+    messages from the same call site are not held back. The first message
+    after a quiet period reports how many copies were dropped.
+    """
+
+    def __init__(self, limit=5, window=60.0, max_keys=1000):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self.seen = {}  # key -> [window start, count, suppressed]
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if self.limit <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = time.monotonic()
+
+        with self.lock:
+            entry = self.seen.get(key)
+            if entry is None or now - entry[0] >= self.window:
+                suppressed = entry[2] if entry else 0
+                if entry is None and len(self.seen) >= self.max_keys:
+                    self.seen.clear()
+                self.seen[key] = [now, 1, 0]
+            elif entry[1] < self.limit:
+                entry[1] += 1
+                suppressed = 0
+            else:
+                entry[2] += 1
+                return False
+
+        if suppressed:
+            record.msg = f"{record.getMessage()} ({suppressed} similar messages suppressed)"
+            record.args = None
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, with any `extra=` fields"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking or erroring when the queue is full"""
 
-    # Console handler
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(logging.DEBUG)
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
 
-    # Formatter
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s - %(name)s - %(message)s',
-        datefmt='%Y-%m-%d %H:%M:%S'
-    )
-    console_handler.setFormatter(formatter)
+    def prepare(self, record):
+        # Resolve the message now (args may change later) but keep exc_info
+        # for the writer's formatters; the queue never leaves the process
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
 
-    logger.addHandler(console_handler)
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level='INFO', log_file=None, json_format=False, max_bytes=10 * 1024 * 1024,
+                  backups=5, repeat_limit=5, repeat_window=60.0, queue_size=10000):
+    """
+    Route all logging through a queue to one background writer (idempotent)
+
+    Callers only format the record and put it on a bounded queue; console
+    and file I/O happen on the QueueListener thread. Records are dropped
+    rather than blocking if the writer falls behind.
+
+    Args:
+        level: root level name or number
+        log_file: also write to this file, rotated at max_bytes
+        json_format: write the file as JSON lines (console stays text)
+        repeat_limit: identical messages allowed per repeat_window
+                      seconds (0 disables the limit)
+
+    Returns:
+        the QueueListener
+    """
+    global _listener
+
+    with _lock:
+        if _listener is not None:
+            return _listener
+
+        text_formatter = logging.Formatter(
+            '[%(asctime)s] %(levelname)s - %(name)s - %(message)s',
+            datefmt='%Y-%m-%d %H:%M:%S'
+        )
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(text_formatter)
+        handlers = [console_handler]
+
+        if log_file:
+            file_handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=max_bytes, backupCount=backups, encoding='utf-8'
+            )
+            file_handler.setFormatter(JSONFormatter() if json_format else text_formatter)
+            handlers.append(file_handler)
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        queue_handler = DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(RepeatFilter(repeat_limit, repeat_window))
+
+        root = logging.getLogger()
+        root.setLevel(level if isinstance(level, int) else str(level).upper())
+        root.addHandler(queue_handler)
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)  # flush what is queued on exit
+        return _listener
+
+
+def get_logger(name):
+    """Get a logger; logging is set up from AgentConfig on first use"""
+    if _listener is None:
+        from config import AgentConfig
 
-    return logger
+        setup_logging(
+            level=AgentConfig.log_level,
+            log_file=AgentConfig.log_file,
+            json_format=AgentConfig.log_json,
+            repeat_limit=AgentConfig.log_repeat_limit
+        )
+    return logging.getLogger(name)
@@ -1,27 +1,46 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 from flask_socketio import emit, join_room, leave_room
 from flask_jwt_extended import create_access_token, get_jwt_identity
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Import extensions
 from extensions import db, socketio, cache, limiter, bcrypt, jwt, init_extensions
-from config import config
+from config import config, Config
 
 # Import models
 from models.user import User
 from models.activity import Activity
 from models.violation import Violation
 from models.message import Message
+from models.activity_rollup import ActivityRollup
 
 # Import services
 from services.ai_service import ai_service
-from services.compression_service import compressor
-from services.security_service import require_auth, rate_limit, ai_rate_limiter, screenshot_rate_limiter
+from services.ai_cache import ai_cache
+from services.ai_scheduler import ai_scheduler
+from services.code_check_jobs import code_check_jobs, CodeCheckJobsBusy
+from services.screen_prep import screen_prep
+from services.screen_clusters import screen_clusterer
+from services.task_classifier import task_classifier
+from services.compression_service import compression_pool
+from services.security_service import require_auth, require_admin, rate_limit, token_claims, revoke_user_tokens, ai_rate_limiter, screenshot_rate_limiter
+from services.fanout_service import fanout
+from services.roster_service import roster
+from services.rollup_service import rollups
+from services.metrics_service import classroom_metrics
+from services.password_service import password_hasher, PasswordHasherBusy
+from services.telemetry import telemetry, instrument_event, instrument_sqlalchemy, metrics_authorized, screen_frame_bytes
+from services.profiler import sampling_profiler, event_profiler, profiled, ProfilerBusy
+from services.traffic_recorder import traffic_recorder, recorded, RecorderBusy
 
 # Import middleware
 from middleware.error_handler import register_error_handlers
+from utils.logger import get_logger
+from utils.violations import detect_violations
+
+logger = get_logger(__name__)
 
 def create_app(config_name='development'):
     """Create and configure Flask app"""
@@ -37,11 +56,24 @@ def create_app(config_name='development'):
     # Register error handlers
     register_error_handlers(app)
 
+    # Time DB flushes/commits for /metrics
+    instrument_sqlalchemy()
+
+    # Flush activity rollups and apply retention in the background
+    rollups.start(app)
+
     # Health check endpoint
     @app.route('/health', methods=['GET'])
     def health():
         return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Prometheus scrape endpoint"""
+        if not metrics_authorized(request.headers.get('Authorization')):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return Response(telemetry.render(), mimetype='text/plain; version=0.0.4')
+
     # Authentication routes
     @app.route('/api/auth/register', methods=['POST'])
     def register():
@@ -59,12 +91,17 @@ def create_app(config_name='development'):
             return jsonify({'error': 'Email already exists'}), 400
 
         # Create user
+        try:
+            password_hash = password_hasher.hash(data['password'])
+        except PasswordHasherBusy:
+            return jsonify({'error': 'Server busy, please retry', 'retry_after': 1}), 503
+
         user = User(
             username=data['username'],
             email=data.get('email', ''),
-            role=data.get('role', 'student')
+            role=data.get('role', 'student'),
+            password_hash=password_hash
         )
-        user.set_password(data['password'])
 
         db.session.add(user)
         db.session.commit()
@@ -81,11 +118,19 @@ def create_app(config_name='development'):
 
         user = User.query.filter_by(username=data['username']).first()
 
-        if not user or not user.check_password(data['password']):
+        if not user or not user.has_usable_password():
             return jsonify({'error': 'Invalid credentials'}), 401
 
-        # Create access token
-        access_token = create_access_token(identity=user.id)
+        try:
+            valid = password_hasher.check(user.password_hash, data['password'])
+        except PasswordHasherBusy:
+            return jsonify({'error': 'Server busy, please retry', 'retry_after': 1}), 503
+
+        if not valid:
+            return jsonify({'error': 'Invalid credentials'}), 401
+
+        # Create access token; role and version claims let require_auth skip the DB
+        access_token = create_access_token(identity=user.id, additional_claims=token_claims(user))
 
         return jsonify({
             'access_token': access_token,
@@ -98,10 +143,8 @@ def create_app(config_name='development'):
     @rate_limit(ai_rate_limiter)
     def classroom_insights():
         """Get AI-powered classroom insights"""
-        data = request.get_json()
-        students_data = data.get('students', {})
-
-        insights = ai_service.analyze_classroom(students_data)
+        # Metrics come from the server-side aggregator, not the request body
+        insights = ai_service.analyze_classroom()
 
         return jsonify(insights), 200
 
@@ -109,14 +152,40 @@ def create_app(config_name='development'):
     @require_auth(role='teacher')
     @rate_limit(ai_rate_limiter)
     def check_all_code():
-        """Batch check code on all student screens"""
+        """Start a background code check of all student screens"""
         data = request.get_json()
         students = data.get('students', [])
         language = data.get('language', 'python')
 
-        results = ai_service.batch_check_code(students)
+        # Results stream to the teacher's socket (`sid`) as they complete
+        try:
+            job = code_check_jobs.start(students, language, owner=get_jwt_identity(), sid=data.get('sid'))
+        except CodeCheckJobsBusy:
+            return jsonify({'error': 'Too many code checks running, please retry', 'retry_after': 10}), 429
+
+        return jsonify({'job_id': job.id, 'status': job.status, 'total': job.total}), 202
+
+    @app.route('/api/ai/check-all-code/<job_id>', methods=['GET'])
+    @require_auth(role='teacher')
+    def code_check_status(job_id):
+        """Progress and results so far of a code check job"""
+        found = code_check_jobs.status(job_id)
+        if not found or found[0] != get_jwt_identity():
+            return jsonify({'error': 'Job not found'}), 404
 
-        return jsonify(results), 200
+        return jsonify(found[1]), 200
+
+    @app.route('/api/ai/check-all-code/<job_id>', methods=['DELETE'])
+    @require_auth(role='teacher')
+    def cancel_code_check(job_id):
+        """Cancel a running code check job"""
+        found = code_check_jobs.status(job_id)
+        if not found or found[0] != get_jwt_identity():
+            return jsonify({'error': 'Job not found'}), 404
+
+        code_check_jobs.cancel(job_id)
+
+        return jsonify((code_check_jobs.status(job_id) or found)[1]), 200
 
     @app.route('/api/ai/message-suggest', methods=['POST'])
     @require_auth(role='teacher')
@@ -129,29 +198,285 @@ def create_app(config_name='development'):
 
         return jsonify(suggestions), 200
 
+    # Analytics routes
+    @app.route('/api/analytics/usage/<user_id>', methods=['GET'])
+    @require_auth(role='teacher')
+    def student_usage(user_id):
+        """Time per app for a student from the activity rollups"""
+        hours = min(request.args.get('hours', 24, type=int), 24 * 365)
+        resolution = ActivityRollup.MINUTE if request.args.get('resolution') == 'minute' else ActivityRollup.HOUR
+
+        usage = rollups.usage(user_id, since=datetime.utcnow() - timedelta(hours=hours), resolution=resolution)
+
+        return jsonify(usage), 200
+
+    # Monitoring routes
+    @app.route('/api/stats/fanout', methods=['GET'])
+    @require_auth(role='teacher')
+    def fanout_stats():
+        """Per-teacher screen fan-out queue depth and drop metrics"""
+        return jsonify(fanout.stats()), 200
+
+    @app.route('/api/stats/compression', methods=['GET'])
+    @require_auth(role='teacher')
+    def compression_stats():
+        """Compression pool queue depth and load-shedding counters"""
+        return jsonify(compression_pool.stats()), 200
+
+    @app.route('/api/stats/ai-cache', methods=['GET'])
+    @require_auth(role='teacher')
+    def ai_cache_stats():
+        """AI response cache hit/miss counters per endpoint"""
+        return jsonify(ai_cache.stats()), 200
+
+    @app.route('/api/stats/ai-scheduler', methods=['GET'])
+    @require_auth(role='teacher')
+    def ai_scheduler_stats():
+        """AI request queue depth, dedupe and expiry counters"""
+        return jsonify(ai_scheduler.stats()), 200
+
+    @app.route('/api/stats/screen-prep', methods=['GET'])
+    @require_auth(role='teacher')
+    def screen_prep_stats():
+        """Bytes and image tokens saved by each screenshot preprocessing step"""
+        return jsonify(screen_prep.stats()), 200
+
+    @app.route('/api/stats/screen-clusters', methods=['GET'])
+    @require_auth(role='teacher')
+    def screen_cluster_stats():
+        """Identical-screen groups found in code checks and checks saved"""
+        return jsonify(screen_clusterer.stats()), 200
+
+    @app.route('/api/stats/task-classifier', methods=['GET'])
+    @require_auth(role='teacher')
+    def task_classifier_stats():
+        """Screens decided without the model, per tier, with precision/recall against AI labels"""
+        return jsonify(task_classifier.stats()), 200
+
+    @app.route('/api/stats/latency', methods=['GET'])
+    @require_auth(role='teacher')
+    def latency_stats():
+        """p50/p90/p99 of the /metrics histograms (seconds; bytes for frame sizes)"""
+        return jsonify(telemetry.summary()), 200
+
+    @app.route('/api/stats/code-checks', methods=['GET'])
+    @require_auth(role='teacher')
+    def code_check_stats():
+        """Running and finished whole-class code check jobs"""
+        return jsonify(code_check_jobs.stats()), 200
+
+    @app.route('/api/stats/rollups', methods=['GET'])
+    @require_auth(role='teacher')
+    def rollup_stats():
+        """Activity rollup flush and retention counters"""
+        return jsonify(rollups.stats()), 200
+
+    def ensure_roster():
+        """Load the student roster from the database on first use"""
+        if not roster.loaded():
+            roster.load([s.to_dict() for s in User.query.filter_by(role='student').all()])
+
+    # Admin profiling routes
+    @app.route('/api/admin/profile', methods=['POST'])
+    @require_admin
+    def profile_server():
+        """Sample every thread's stack for a while; collapsed stacks for flamegraph.pl/speedscope"""
+        data = request.get_json(silent=True) or {}
+
+        try:
+            collapsed, report = sampling_profiler.profile(
+                seconds=float(data.get('seconds', 10)),
+                interval=float(data.get('interval', 0.01)),
+                idle=bool(data.get('idle', False))
+            )
+        except ProfilerBusy:
+            return jsonify({'error': 'A profile is already running'}), 409
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid seconds or interval'}), 400
+
+        response = Response(collapsed, mimetype='text/plain')
+        response.headers['X-Profile-Samples'] = str(report['samples'])
+        response.headers['X-Profile-Overhead'] = str(report['overhead'])
+        return response
+
+    @app.route('/api/admin/profile/events/<event>', methods=['POST'])
+    @require_admin
+    def profile_event(event):
+        """cProfile the next N invocations of one Socket.IO event"""
+        data = request.get_json(silent=True) or {}
+
+        try:
+            calls = event_profiler.arm(event, int(data.get('calls', 20)))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'Invalid calls'}), 400
+
+        return jsonify({'event': event, 'remaining': calls}), 202
+
+    @app.route('/api/admin/profile/events/<event>', methods=['GET'])
+    @require_admin
+    def event_profile(event):
+        """Merged cProfile table of the event's captured invocations"""
+        sort = request.args.get('sort', 'cumulative')
+        if sort not in ('cumulative', 'tottime', 'ncalls'):
+            return jsonify({'error': 'Invalid sort'}), 400
+
+        report = event_profiler.report(event, sort=sort, limit=request.args.get('limit', 40, type=int))
+        if report is None:
+            return jsonify({'error': 'Event was never profiled'}), 404
+
+        return jsonify(report), 200
+
+    @app.route('/api/admin/profile/events/<event>', methods=['DELETE'])
+    @require_admin
+    def stop_event_profile(event):
+        """Stop profiling an event before its N invocations are captured"""
+        event_profiler.disarm(event)
+
+        return jsonify(event_profiler.report(event) or {'event': event}), 200
+
+    # Admin traffic recording routes
+    @app.route('/api/admin/recording', methods=['POST'])
+    @require_admin
+    def start_recording():
+        """Record every inbound Socket.IO event to a trace for scripts/replay_traffic.py"""
+        data = request.get_json(silent=True) or {}
+
+        try:
+            path = traffic_recorder.start(data.get('name'))
+        except RecorderBusy:
+            return jsonify({'error': 'A recording is already running'}), 409
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({'path': path, **traffic_recorder.stats()}), 201
+
+    @app.route('/api/admin/recording', methods=['GET'])
+    @require_admin
+    def recording_status():
+        """Current or last recording"""
+        return jsonify(traffic_recorder.stats()), 200
+
+    @app.route('/api/admin/recording', methods=['DELETE'])
+    @require_admin
+    def stop_recording():
+        """Stop recording and flush the trace"""
+        return jsonify(traffic_recorder.stop()), 200
+
+    # Admin account routes
+    @app.route('/api/admin/users/<user_id>', methods=['PUT'])
+    @require_admin
+    def update_user(user_id):
+        """Change a user's role and/or password; tokens issued before are revoked"""
+        data = request.get_json(silent=True) or {}
+
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        role = data.get('role')
+        if role is not None and role not in ('teacher', 'student'):
+            return jsonify({'error': 'Invalid role'}), 400
+
+        password = data.get('password')
+        if password is not None and (not isinstance(password, str) or not password):
+            return jsonify({'error': 'Invalid password'}), 400
+
+        was_student = user.role == 'student'
+        changed = False
+        if role and role != user.role:
+            user.role = role
+            changed = True
+        if password:
+            try:
+                user.password_hash = password_hasher.hash(password)
+            except PasswordHasherBusy:
+                return jsonify({'error': 'Server busy, please retry', 'retry_after': 1}), 503
+            changed = True
+
+        if changed:
+            revoke_user_tokens(user)
+            db.session.commit()
+
+            if was_student and user.role != 'student' and roster.loaded():
+                roster.remove(user.id)
+
+        return jsonify({'user': user.to_dict(), 'tokens_revoked': changed}), 200
+
+    @app.route('/api/admin/users/<user_id>', methods=['DELETE'])
+    @require_admin
+    def delete_user(user_id):
+        """Delete an account with its activity, violations and messages; its tokens stop working"""
+        if user_id == get_jwt_identity():
+            return jsonify({'error': 'Cannot delete your own account'}), 400
+
+        user = db.session.get(User, user_id)
+        if not user:
+            return jsonify({'error': 'User not found'}), 404
+
+        # Tokens are authorized from claims alone, so they outlive the row
+        # unless revoked
+        revoke_user_tokens(user)
+
+        Message.query.filter(
+            (Message.sender_id == user.id) | (Message.receiver_id == user.id)
+        ).delete(synchronize_session=False)
+        ActivityRollup.query.filter_by(user_id=user.id).delete(synchronize_session=False)
+        Violation.query.filter_by(resolved_by=user.id).update({'resolved_by': None}, synchronize_session=False)
+        db.session.delete(user)
+        db.session.commit()
+
+        if user.role == 'student':
+            fanout.remove_student(user.id)
+            rollups.forget(user.id, discard=True)
+            classroom_metrics.remove_student(user.id)
+            if roster.loaded():
+                roster.remove(user.id)
+
+        return jsonify({'message': 'User deleted'}), 200
+
     # SocketIO event handlers
     @socketio.on('connect')
-    def handle_connect():
+    @instrument_event('connect')
+    @recorded('connect')
+    @profiled('connect')
+    def handle_connect(auth=None):
         """Handle client connection"""
-        print(f"Client connected: {request.sid}")
+        logger.debug(f"Client connected: {request.sid}")
         emit('connected', {'session_id': request.sid})
 
     @socketio.on('disconnect')
+    @instrument_event('disconnect')
+    @recorded('disconnect')
+    @profiled('disconnect')
     def handle_disconnect():
         """Handle client disconnection"""
-        print(f"Client disconnected: {request.sid}")
+        logger.debug(f"Client disconnected: {request.sid}")
+
+        # Stop screen fan-out and code checks if this was a teacher
+        fanout.remove_teacher(request.sid)
+        code_check_jobs.cancel_for_sid(request.sid)
 
         # Update user status
         user = User.query.filter_by(session_id=request.sid).first()
         if user:
+            fanout.remove_student(user.id)
+            rollups.forget(user.id)
+            classroom_metrics.remove_student(user.id)
             user.status = 'offline'
             user.last_seen = datetime.utcnow()
             db.session.commit()
 
+            if user.role == 'student':
+                ensure_roster()
+                roster.leave(user.id, user.last_seen.isoformat())
+
     @socketio.on('register_student')
+    @instrument_event('register_student')
+    @recorded('register_student')
+    @profiled('register_student')
     def handle_register_student(data):
         """Register student agent"""
-        print(f"Student registered: {data.get('name')}")
+        logger.info(f"Student registered: {data.get('name')}")
 
         # Find or create user
         user = User.query.filter_by(computer_id=data.get('computer_id')).first()
@@ -164,7 +489,8 @@ def create_app(config_name='development'):
                 role='student',
                 computer_id=data.get('computer_id')
             )
-            user.set_password('default_password')  # Should be changed
+            # Agents never log in with a password; skip bcrypt entirely
+            user.set_unusable_password()
             db.session.add(user)
 
         user.session_id = request.sid
@@ -174,67 +500,146 @@ def create_app(config_name='development'):
 
         # Join student room
         join_room('students')
+        fanout.add_student(user.id, request.sid)
+        classroom_metrics.add_student(user.id, user.username)
 
         emit('registered', {'user_id': user.id, 'username': user.username})
 
         # Notify teachers
-        emit('student_connected', {
-            'user_id': user.id,
-            'username': user.username,
-            'timestamp': datetime.utcnow().isoformat()
-        }, room='teachers', broadcast=True)
+        ensure_roster()
+        roster.join(user.to_dict())
 
     @socketio.on('register_teacher')
+    @instrument_event('register_teacher')
+    @recorded('register_teacher')
+    @profiled('register_teacher')
     def handle_register_teacher(data):
         """Register teacher client"""
-        print(f"Teacher registered: {data.get('name')}")
+        logger.info(f"Teacher registered: {data.get('name')}")
 
         join_room('teachers')
 
-        # Send current student list
-        students = User.query.filter_by(role='student').all()
-        emit('student_list', {
-            'students': [s.to_dict() for s in students]
-        })
-
-    @socketio.on('screen_update')
-    @rate_limit(screenshot_rate_limiter, key_func=lambda: request.sid)
-    def handle_screen_update(data):
-        """Handle screenshot update from student"""
-        user = User.query.filter_by(session_id=request.sid).first()
-
-        if not user:
+        # Start latest-wins screen fan-out for this connection
+        fanout.add_teacher(request.sid, max_fps=data.get('max_fps'))
+
+        send_roster(data)
+
+    @socketio.on('sync_roster')
+    @instrument_event('sync_roster')
+    @recorded('sync_roster')
+    @profiled('sync_roster')
+    def handle_sync_roster(data):
+        """Teacher noticed a gap in roster_delta versions"""
+        send_roster(data or {})
+
+    def send_roster(data):
+        """Send only the missed roster deltas if possible, otherwise a snapshot"""
+        ensure_roster()
+        missed = roster.since(data.get('roster_epoch'), data.get('roster_version'))
+        if missed is not None:
+            emit('roster_deltas', missed)
+        else:
+            emit('student_list', roster.snapshot())
+
+    @socketio.on('subscribe_screens')
+    @instrument_event('subscribe_screens')
+    @recorded('subscribe_screens')
+    @profiled('subscribe_screens')
+    def handle_subscribe_screens(data):
+        """Teacher declares which student screens are visible and at what size"""
+        data = data or {}
+        try:
+            subscriptions = fanout.subscribe(
+                request.sid,
+                data.get('students'),
+                width=data.get('width'),
+                height=data.get('height')
+            )
+        except KeyError:
+            emit('screens_subscribed', {'error': 'Not registered as a teacher'})
+            return
+        except ValueError as e:
+            emit('screens_subscribed', {'error': str(e)})
             return
 
-        # Compress image if needed
-        screenshot = data.get('screenshot')
-        if screenshot and not data.get('hash'):
-            compressed, img_hash, size_kb = compressor.compress_base64(screenshot)
-            data['screenshot'] = compressed
-            data['hash'] = img_hash
-            data['size_kb'] = size_kb
+        emit('screens_subscribed', {
+            'students': None if subscriptions is None else list(subscriptions.keys())
+        })
 
-        # Save activity
+    def record_screen_update(user_id, username, data):
+        """Save the activity row and hand the frame to the fan-out scheduler"""
+        # Set here rather than read back, which would reload the row after commit
+        timestamp = datetime.utcnow()
         activity = Activity(
-            user_id=user.id,
+            user_id=user_id,
             screenshot_hash=data.get('hash'),
             active_window=data.get('active_window'),
-            active_app=data.get('active_app')
+            active_app=data.get('active_app'),
+            timestamp=timestamp
         )
         db.session.add(activity)
         db.session.commit()
+        rollups.record(user_id, data.get('active_app'), data.get('hash'), timestamp)
+        screen_frame_bytes.observe(len(data.get('screenshot') or '') * 3 // 4)
+        classroom_metrics.record_screen(
+            user_id, username, data.get('active_app'), data.get('hash'), active_window=data.get('active_window')
+        )
 
-        # Broadcast to teachers
-        emit('screen_data', {
-            'user_id': user.id,
-            'username': user.username,
+        # Teachers pick up the newest frame on their next send tick
+        fanout.publish(user_id, {
+            'user_id': user_id,
+            'username': username,
             'image': data.get('screenshot'),
             'active_window': data.get('active_window'),
             'active_app': data.get('active_app'),
+            'window_rect': data.get('window_rect'),
             'timestamp': datetime.utcnow().isoformat()
-        }, room='teachers', broadcast=True)
+        })
+
+    def finish_compressed_update(user_id, username, data, result):
+        """Complete a screen update once the compression pool is done"""
+        compressed, img_hash, size_kb = result
+        if not compressed:
+            return
+
+        data['screenshot'] = compressed
+        data['hash'] = img_hash
+        data['size_kb'] = size_kb
+
+        with app.app_context():
+            record_screen_update(user_id, username, data)
+
+    @socketio.on('screen_update')
+    @instrument_event('screen_update')
+    @recorded('screen_update')
+    @profiled('screen_update')
+    @rate_limit(screenshot_rate_limiter, key_func=lambda: request.sid)
+    def handle_screen_update(data):
+        """Handle screenshot update from student"""
+        user = User.query.filter_by(session_id=request.sid).first()
+
+        if not user:
+            return
+
+        # Raw screenshots are compressed in the process pool; the broadcast
+        # completes from its callback. Frames are shed when the pool is full.
+        screenshot = data.get('screenshot')
+        if screenshot and not data.get('hash'):
+            user_id, username = user.id, user.username
+            compression_pool.submit(
+                screenshot,
+                lambda result: socketio.start_background_task(
+                    finish_compressed_update, user_id, username, data, result
+                )
+            )
+            return
+
+        record_screen_update(user.id, user.username, data)
 
     @socketio.on('process_update')
+    @instrument_event('process_update')
+    @recorded('process_update')
+    @profiled('process_update')
     def handle_process_update(data):
         """Handle process list update from student"""
         user = User.query.filter_by(session_id=request.sid).first()
@@ -246,37 +651,18 @@ def create_app(config_name='development'):
         processes = data.get('processes', [])
         urls = data.get('urls', [])
 
-        # Simple violation detection
-        violation_keywords = {
-            'game': ['game', 'minecraft', 'fortnite', 'roblox'],
-            'social_media': ['facebook', 'instagram', 'twitter', 'tiktok'],
-            'video': ['youtube', 'netflix', 'twitch']
-        }
-
-        for v_type, keywords in violation_keywords.items():
-            for process in processes:
-                process_lower = process.lower()
-                if any(keyword in process_lower for keyword in keywords):
-                    violation = Violation(
-                        user_id=user.id,
-                        violation_type=v_type,
-                        detail=f"Detected process: {process}"
-                    )
-                    db.session.add(violation)
-
-            for url in urls:
-                url_lower = url.lower()
-                if any(keyword in url_lower for keyword in keywords):
-                    violation = Violation(
-                        user_id=user.id,
-                        violation_type=v_type,
-                        detail=f"Detected URL: {url}"
-                    )
-                    db.session.add(violation)
+        detected = detect_violations(processes, urls)
+        for v_type, detail in detected:
+            db.session.add(Violation(user_id=user.id, violation_type=v_type, detail=detail))
 
         db.session.commit()
+        classroom_metrics.record_violations(user.id, detected)
+        classroom_metrics.record_processes(user.id, processes)
 
     @socketio.on('send_message')
+    @instrument_event('send_message')
+    @recorded('send_message')
+    @profiled('send_message')
     def handle_send_message(data):
         """Send message to student(s)"""
         sender_user = User.query.filter_by(session_id=request.sid).first()
@@ -308,6 +694,9 @@ def create_app(config_name='development'):
                 }, room=target_user.session_id)
 
     @socketio.on('lock_screens')
+    @instrument_event('lock_screens')
+    @recorded('lock_screens')
+    @profiled('lock_screens')
     def handle_lock_screens(data):
         """Lock student screens"""
         sender_user = User.query.filter_by(session_id=request.sid).first()
@@ -324,6 +713,7 @@ def create_app(config_name='development'):
                 'duration': duration,
                 'message': message
             }, room='students', broadcast=True)
+            students = roster.online_ids()
         else:
             for student_id in students:
                 target_user = User.query.get(student_id)
@@ -333,7 +723,13 @@ def create_app(config_name='development'):
                         'message': message
                     }, room=target_user.session_id)
 
+        for student_id in students:
+            roster.update(student_id, locked=True)
+
     @socketio.on('unlock_screens')
+    @instrument_event('unlock_screens')
+    @recorded('unlock_screens')
+    @profiled('unlock_screens')
     def handle_unlock_screens(data):
         """Unlock student screens"""
         sender_user = User.query.filter_by(session_id=request.sid).first()
@@ -345,13 +741,20 @@ def create_app(config_name='development'):
 
         if students == 'all':
             emit('screen_unlock', {}, room='students', broadcast=True)
+            students = roster.online_ids()
         else:
             for student_id in students:
                 target_user = User.query.get(student_id)
                 if target_user and target_user.session_id:
                     emit('screen_unlock', {}, room=target_user.session_id)
 
+        for student_id in students:
+            roster.update(student_id, locked=False)
+
     @socketio.on('create_poll')
+    @instrument_event('create_poll')
+    @recorded('create_poll')
+    @profiled('create_poll')
     def handle_create_poll(data):
         """Create a poll for students"""
         sender_user = User.query.filter_by(session_id=request.sid).first()
@@ -372,6 +775,9 @@ def create_app(config_name='development'):
         emit('show_poll', poll_data, room='students', broadcast=True)
 
     @socketio.on('poll_response')
+    @instrument_event('poll_response')
+    @recorded('poll_response')
+    @profiled('poll_response')
     def handle_poll_response(data):
         """Handle poll response from student"""
         poll_id = data.get('poll_id')
@@ -386,8 +792,11 @@ def create_app(config_name='development'):
 
     return app
 
-# Create app instance
-app = create_app(os.environ.get('FLASK_ENV', 'development'))
+# Create app instance. Compression pool workers are spawned processes that
+# re-import the main module as __mp_main__; they must not build the app
+# (extensions, message queue, rollup thread) just to compress images.
+if __name__ != '__mp_main__':
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
 
 if __name__ == '__main__':
     # Create database tables
@@ -397,4 +806,4 @@ if __name__ == '__main__':
 
     # Run app
     print("🚀 Starting AI ClassGuard Pro Server...")
-    socketio.run(app, host='0.0.0.0', port=5000, debug=True)
+    socketio.run(app, host=os.environ.get('HOST', '0.0.0.0'), port=int(os.environ.get('PORT', 5000)), debug=True)
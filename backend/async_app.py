@@ -0,0 +1,448 @@
+"""
+Asyncio Socket.IO server for large deployments.
+
+Same events as app.py, but served by python-socketio's AsyncServer on
+aiohttp: one event loop instead of one OS thread per connection. Blocking
+SQLAlchemy work runs in a small thread pool and image compression in the
+process pool, so the loop itself only does socket I/O.
+
+Only the Socket.IO events, /health and /metrics are served here; login
+and the REST API (/api/...) stay in app.py, which must keep running next
+to this server behind a proxy that sends /socket.io to it.
+
+Run with:  python backend/async_app.py
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import socketio
+from aiohttp import web
+from flask import Flask
+
+from config import config, Config
+from extensions import db
+
+from models.user import User
+from models.activity import Activity
+from models.violation import Violation
+
+from services.compression_service import compression_pool
+from services.fanout_service import FrameFanout
+from services.roster_service import Roster
+from services.rollup_service import rollups
+from services.metrics_service import classroom_metrics
+from services.security_service import screenshot_rate_limiter
+from services.telemetry import telemetry, instrument_event, instrument_sqlalchemy, metrics_authorized, broadcast_seconds, screen_frame_bytes
+from services.traffic_recorder import recorded
+from utils.violations import detect_violations
+
+# Flask app only provides the SQLAlchemy session and config for DB work
+flask_app = Flask(__name__)
+flask_app.config.from_object(config[os.environ.get('FLASK_ENV', 'development')])
+db.init_app(flask_app)
+instrument_sqlalchemy()
+
+# Socket.IO server (Redis manager lets several processes share rooms)
+if Config.SOCKETIO_MESSAGE_QUEUE:
+    client_manager = socketio.AsyncRedisManager(Config.SOCKETIO_MESSAGE_QUEUE)
+else:
+    client_manager = None
+
+sio = socketio.AsyncServer(
+    async_mode='aiohttp',
+    cors_allowed_origins='*',
+    client_manager=client_manager
+)
+web_app = web.Application()
+sio.attach(web_app)
+
+db_executor = ThreadPoolExecutor(max_workers=Config.ASYNC_DB_WORKERS, thread_name_prefix='db')
+
+
+def _emit_soon(event, data, to):
+    """Schedule an emit from synchronous code running on the loop"""
+    asyncio.ensure_future(sio.emit(event, data, to=to))
+
+
+fanout = FrameFanout(max_fps=Config.SCREEN_FANOUT_MAX_FPS, emit=_emit_soon, spawn_loops=False)
+roster = Roster(emit=_emit_soon)
+
+
+def _in_app_context(fn, *args):
+    with flask_app.app_context():
+        return fn(*args)
+
+
+async def run_db(fn, *args):
+    """Run a blocking DB function in the DB thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, _in_app_context, fn, *args)
+
+
+async def compress(screenshot):
+    """
+    Compress a screenshot in the process pool
+
+    Returns:
+        (compressed_base64, hash, size_kb), or None if the frame was shed
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+
+    def on_done(result):
+        loop.call_soon_threadsafe(future.set_result, result)
+
+    if not compression_pool.submit(screenshot, on_done):
+        return None
+    return await future
+
+
+async def teacher_send_loop(sid):
+    """Push the newest frame per student to one teacher at most max_fps a second"""
+    channel = fanout.teachers.get(sid)
+    if not channel:
+        return
+    interval = 1.0 / channel.max_fps
+
+    while channel.running:
+        started = asyncio.get_running_loop().time()
+
+        for payload in fanout.drain(sid):
+            with broadcast_seconds.time('screen_data'):
+                await sio.emit('screen_data', payload, to=sid)
+
+        elapsed = asyncio.get_running_loop().time() - started
+        await asyncio.sleep(max(0, interval - elapsed))
+
+
+# Blocking DB helpers (run via run_db)
+
+def _find_user_by_sid(sid):
+    user = User.query.filter_by(session_id=sid).first()
+    if not user:
+        return None
+    return {'id': user.id, 'username': user.username, 'role': user.role}
+
+
+def _find_session(user_id):
+    user = db.session.get(User, user_id)
+    return user.session_id if user else None
+
+
+def _mark_offline(sid):
+    user = User.query.filter_by(session_id=sid).first()
+    if not user:
+        return None
+    user.status = 'offline'
+    user.last_seen = datetime.utcnow()
+    db.session.commit()
+    return {'id': user.id, 'role': user.role, 'last_seen': user.last_seen.isoformat()}
+
+
+def _register_student(sid, data):
+    user = User.query.filter_by(computer_id=data.get('computer_id')).first()
+
+    if not user:
+        user = User(
+            username=data.get('name', f"student_{sid}"),
+            email=f"{data.get('name', 'student')}@school.local",
+            role='student',
+            computer_id=data.get('computer_id')
+        )
+        # Agents never log in with a password; skip bcrypt entirely
+        user.set_unusable_password()
+        db.session.add(user)
+
+    user.session_id = sid
+    user.status = 'online'
+    user.last_seen = datetime.utcnow()
+    db.session.commit()
+    return user.to_dict()
+
+
+def _student_list():
+    return [s.to_dict() for s in User.query.filter_by(role='student').all()]
+
+
+def _save_activity(user_id, data):
+    # Set here rather than read back, which would reload the row after commit
+    timestamp = datetime.utcnow()
+    activity = Activity(
+        user_id=user_id,
+        screenshot_hash=data.get('hash'),
+        active_window=data.get('active_window'),
+        active_app=data.get('active_app'),
+        timestamp=timestamp
+    )
+    db.session.add(activity)
+    db.session.commit()
+    rollups.record(user_id, data.get('active_app'), data.get('hash'), timestamp)
+
+
+def _save_violations(user_id, violations):
+    for v_type, detail in violations:
+        db.session.add(Violation(user_id=user_id, violation_type=v_type, detail=detail))
+    db.session.commit()
+
+
+# Socket.IO event handlers
+
+@sio.event
+@instrument_event('connect')
+@recorded('connect')
+async def connect(sid, environ, auth=None):
+    await sio.emit('connected', {'session_id': sid}, to=sid)
+
+
+@sio.event
+@instrument_event('disconnect')
+@recorded('disconnect')
+async def disconnect(sid):
+    fanout.remove_teacher(sid)
+    user = await run_db(_mark_offline, sid)
+    if user:
+        fanout.remove_student(user['id'])
+        rollups.forget(user['id'])
+        classroom_metrics.remove_student(user['id'])
+        if user['role'] == 'student':
+            await ensure_roster()
+            roster.leave(user['id'], user['last_seen'])
+
+
+@sio.on('register_student')
+@instrument_event('register_student')
+@recorded('register_student')
+async def register_student(sid, data):
+    user = await run_db(_register_student, sid, data)
+
+    await sio.enter_room(sid, 'students')
+    fanout.add_student(user['id'], sid)
+    classroom_metrics.add_student(user['id'], user['username'])
+
+    await sio.emit('registered', {'user_id': user['id'], 'username': user['username']}, to=sid)
+    await ensure_roster()
+    roster.join(user)
+
+
+@sio.on('register_teacher')
+@instrument_event('register_teacher')
+@recorded('register_teacher')
+async def register_teacher(sid, data):
+    await sio.enter_room(sid, 'teachers')
+
+    # A repeated register_teacher keeps the running send loop
+    if sid not in fanout.teachers:
+        fanout.add_teacher(sid, max_fps=data.get('max_fps'))
+        sio.start_background_task(teacher_send_loop, sid)
+
+    await send_roster(sid, data)
+
+
+@sio.on('sync_roster')
+@instrument_event('sync_roster')
+@recorded('sync_roster')
+async def sync_roster(sid, data):
+    await send_roster(sid, data or {})
+
+
+async def ensure_roster():
+    if not roster.loaded():
+        roster.load(await run_db(_student_list))
+
+
+async def send_roster(sid, data):
+    """Missed roster deltas if the log still has them, otherwise a snapshot"""
+    await ensure_roster()
+    missed = roster.since(data.get('roster_epoch'), data.get('roster_version'))
+    if missed is not None:
+        await sio.emit('roster_deltas', missed, to=sid)
+    else:
+        await sio.emit('student_list', roster.snapshot(), to=sid)
+
+
+@sio.on('subscribe_screens')
+@instrument_event('subscribe_screens')
+@recorded('subscribe_screens')
+async def subscribe_screens(sid, data):
+    data = data or {}
+    try:
+        subscriptions = fanout.subscribe(sid, data.get('students'), width=data.get('width'), height=data.get('height'))
+    except KeyError:
+        await sio.emit('screens_subscribed', {'error': 'Not registered as a teacher'}, to=sid)
+        return
+    except ValueError as e:
+        await sio.emit('screens_subscribed', {'error': str(e)}, to=sid)
+        return
+    await sio.emit('screens_subscribed', {
+        'students': None if subscriptions is None else list(subscriptions.keys())
+    }, to=sid)
+
+
+@sio.on('screen_update')
+@instrument_event('screen_update')
+@recorded('screen_update')
+async def screen_update(sid, data):
+    if not screenshot_rate_limiter.allow(sid):
+        return {'error': 'Rate limit exceeded', 'retry_after': round(screenshot_rate_limiter.retry_after(sid), 1)}
+
+    user = await run_db(_find_user_by_sid, sid)
+    if not user:
+        return
+
+    screenshot = data.get('screenshot')
+    if screenshot and not data.get('hash'):
+        result = await compress(screenshot)
+        if not result or not result[0]:
+            return
+        data['screenshot'], data['hash'], data['size_kb'] = result
+
+    await run_db(_save_activity, user['id'], data)
+    screen_frame_bytes.observe(len(data.get('screenshot') or '') * 3 // 4)
+    classroom_metrics.record_screen(
+        user['id'], user['username'], data.get('active_app'), data.get('hash'), active_window=data.get('active_window')
+    )
+
+    fanout.publish(user['id'], {
+        'user_id': user['id'],
+        'username': user['username'],
+        'image': data.get('screenshot'),
+        'active_window': data.get('active_window'),
+        'active_app': data.get('active_app'),
+        'window_rect': data.get('window_rect'),
+        'timestamp': datetime.utcnow().isoformat()
+    })
+
+
+@sio.on('process_update')
+@instrument_event('process_update')
+@recorded('process_update')
+async def process_update(sid, data):
+    user = await run_db(_find_user_by_sid, sid)
+    if not user:
+        return
+
+    classroom_metrics.record_processes(user['id'], data.get('processes', []))
+
+    violations = detect_violations(data.get('processes', []), data.get('urls', []))
+
+    if violations:
+        await run_db(_save_violations, user['id'], violations)
+        classroom_metrics.record_violations(user['id'], violations)
+
+
+async def _teacher(sid):
+    user = await run_db(_find_user_by_sid, sid)
+    return user if user and user['role'] == 'teacher' else None
+
+
+async def _emit_to_students(event, payload, students):
+    """Emit to every student, or to the listed student ids"""
+    if students == 'all':
+        await sio.emit(event, payload, room='students')
+        return
+    for student_id in students:
+        session_id = await run_db(_find_session, student_id)
+        if session_id:
+            await sio.emit(event, payload, to=session_id)
+
+
+@sio.on('send_message')
+@instrument_event('send_message')
+@recorded('send_message')
+async def send_message(sid, data):
+    sender = await _teacher(sid)
+    if not sender:
+        return
+
+    target = data.get('target', 'all')
+    payload = {
+        'message': data.get('message', ''),
+        'type': data.get('type', 'normal'),
+        'from': sender['username'],
+        'timestamp': datetime.utcnow().isoformat()
+    }
+    await _emit_to_students('receive_message', payload, 'all' if target == 'all' else [target])
+
+
+@sio.on('lock_screens')
+@instrument_event('lock_screens')
+@recorded('lock_screens')
+async def lock_screens(sid, data):
+    if not await _teacher(sid):
+        return
+
+    students = data.get('students', 'all')
+    await _emit_to_students('screen_lock', {
+        'duration': data.get('duration', 300),
+        'message': data.get('message', 'Screen locked by teacher')
+    }, students)
+
+    for student_id in roster.online_ids() if students == 'all' else students:
+        roster.update(student_id, locked=True)
+
+
+@sio.on('unlock_screens')
+@instrument_event('unlock_screens')
+@recorded('unlock_screens')
+async def unlock_screens(sid, data):
+    if not await _teacher(sid):
+        return
+
+    students = data.get('students', 'all')
+    await _emit_to_students('screen_unlock', {}, students)
+
+    for student_id in roster.online_ids() if students == 'all' else students:
+        roster.update(student_id, locked=False)
+
+
+@sio.on('create_poll')
+@instrument_event('create_poll')
+@recorded('create_poll')
+async def create_poll(sid, data):
+    if not await _teacher(sid):
+        return
+
+    await sio.emit('show_poll', {
+        'poll_id': f"poll_{datetime.utcnow().timestamp()}",
+        'question': data.get('question'),
+        'options': data.get('options', []),
+        'timestamp': datetime.utcnow().isoformat()
+    }, room='students')
+
+
+@sio.on('poll_response')
+@instrument_event('poll_response')
+@recorded('poll_response')
+async def poll_response(sid, data):
+    await sio.emit('poll_results', {
+        'poll_id': data.get('poll_id'),
+        'answer': data.get('answer'),
+        'timestamp': datetime.utcnow().isoformat()
+    }, room='teachers')
+
+
+async def health(request):
+    return web.json_response({'status': 'healthy', 'mode': 'asyncio', 'timestamp': datetime.now().isoformat()})
+
+web_app.router.add_get('/health', health)
+
+
+async def metrics(request):
+    if not metrics_authorized(request.headers.get('Authorization')):
+        return web.json_response({'error': 'Unauthorized'}, status=401)
+    return web.Response(body=telemetry.render().encode(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+web_app.router.add_get('/metrics', metrics)
+
+
+if __name__ == '__main__':
+    with flask_app.app_context():
+        db.create_all()
+        print("✅ Database tables created")
+
+    rollups.start(flask_app)
+    print("🚀 Starting AI ClassGuard Pro async server...")
+    web.run_app(web_app, host=os.environ.get('HOST', '0.0.0.0'), port=int(os.environ.get('PORT', 5000)))
@@ -1,6 +1,9 @@
 import os
 from datetime import timedelta
 
+# Runtime files (Flask's instance folder, where the default SQLite DB lives too)
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+
 class Config:
     """Base configuration"""
     SECRET_KEY = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
@@ -19,14 +22,21 @@ class Config:
     CACHE_TYPE = 'redis'
     CACHE_DEFAULT_TIMEOUT = 300
 
+    # Multi-worker mode: presence, frames, subscriptions and rate limits are
+    # kept in Redis so several server processes behave as one
+    MULTI_WORKER = os.environ.get('MULTI_WORKER', 'false').lower() == 'true'
+
     # SocketIO
     SOCKETIO_MESSAGE_QUEUE = os.environ.get('REDIS_URL')
     SOCKETIO_CORS_ALLOWED_ORIGINS = '*'
+    ASYNC_DB_WORKERS = int(os.environ.get('ASYNC_DB_WORKERS', '8'))  # async_app DB thread pool
 
     # Security
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=8)
     BCRYPT_LOG_ROUNDS = 12
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+    PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', '32'))  # admission limit
 
     # Rate Limiting
     RATELIMIT_STORAGE_URL = os.environ.get('REDIS_URL')
@@ -35,18 +45,87 @@ class Config:
     # AI Configuration
     GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
     GEMINI_MODEL = 'gemini-1.5-flash'  # Fast and free
-    AI_RATE_LIMIT = 15  # requests per minute (free tier)
+    GEMINI_API_ENDPOINT = os.environ.get('GEMINI_API_ENDPOINT')  # e.g. scripts/mock_gemini_server.py
+    AI_BACKEND = os.environ.get('AI_BACKEND')  # gemini/http; default http when GEMINI_API_ENDPOINT is set
+    AI_RATE_LIMIT = int(os.environ.get('AI_RATE_LIMIT', '15'))  # requests per minute (free tier)
     AI_TIMEOUT = 10  # seconds
+    AI_SCHEDULER_WORKERS = int(os.environ.get('AI_SCHEDULER_WORKERS', '4'))  # concurrent Gemini calls
+    AI_QUEUE_TIMEOUT = 30  # seconds an interactive request may wait for quota
+    AI_BATCH_QUEUE_TIMEOUT = 300  # seconds a whole-class check may wait for quota
+    AI_MOSAIC_BATCHING = os.environ.get('AI_MOSAIC_BATCHING', 'true').lower() == 'true'  # several screens per request
+    AI_MOSAIC_TILES = int(os.environ.get('AI_MOSAIC_TILES', '4'))  # screens per mosaic
+    AI_MOSAIC_MIN_CONFIDENCE = 60  # tiles below this are re-checked on their own
+    AI_SCREEN_CLUSTERING = os.environ.get('AI_SCREEN_CLUSTERING', 'true').lower() == 'true'  # one check per group of identical screens
+    AI_CLUSTER_RADIUS = 6  # perceptual hash bits for cluster candidates
+    AI_CLUSTER_MAX_BLOCK_DIFF = 24  # gray levels one 4x4 pixel block may differ and still match
+    AI_PRECLASSIFY = os.environ.get('AI_PRECLASSIFY', 'true').lower() == 'true'  # decide obvious screens from app/title/processes
+    AI_PRECLASSIFY_OFF_TASK_CONFIDENCE = float(os.environ.get('AI_PRECLASSIFY_OFF_TASK_CONFIDENCE', '0.9'))  # answer off_task locally at or above
+    AI_PRECLASSIFY_NO_CODE_CONFIDENCE = float(os.environ.get('AI_PRECLASSIFY_NO_CODE_CONFIDENCE', '0.95'))  # answer no_code locally at or above
+    AI_PRECLASSIFY_MIN_SAMPLES = 50  # AI labels before the trained tier may decide
+    AI_PRECLASSIFY_AUDIT_RATE = 0.05  # local decisions still sent to the model to measure precision
+    AI_PRECLASSIFY_MODEL_PATH = os.environ.get(
+        'AI_PRECLASSIFY_MODEL_PATH', os.path.join(INSTANCE_DIR, 'task_classifier.json'))  # '' keeps it in memory
+    AI_CODE_CHECK_JOBS = int(os.environ.get('AI_CODE_CHECK_JOBS', '2'))  # whole-class checks running at once
+    AI_CODE_CHECK_TIMEOUT = 2 * (AI_BATCH_QUEUE_TIMEOUT + AI_TIMEOUT)  # a mosaic plus its single-screen re-checks
+    AI_VISION_STEPS = os.environ.get('AI_VISION_STEPS', 'crop,trim,grayscale,fit,sharpen').split(',')  # screenshot preprocessing
+    AI_VISION_TOKEN_BUDGET = int(os.environ.get('AI_VISION_TOKEN_BUDGET', '516'))  # image tokens per screen (258 per 768px tile)
+    AI_VISION_QUALITY = 60  # JPEG quality of preprocessed screens (agent frames arrive at 60)
+    AI_CACHE_L1_SIZE = 256  # in-process entries in front of the shared cache
+    AI_CACHE_TTLS = {  # seconds, per endpoint
+        'classroom': 30,
+        'code_check': 600,
+        'code_check_mosaic': 600,
+        'message': 3600
+    }
 
     # Image Compression
     SCREENSHOT_QUALITY = 60  # JPEG quality (1-100)
     SCREENSHOT_MAX_WIDTH = 1280
     SCREENSHOT_MAX_HEIGHT = 720
+    COMPRESSION_WORKERS = int(os.environ.get('COMPRESSION_WORKERS', '2'))  # processes
+    COMPRESSION_QUEUE_SIZE = int(os.environ.get('COMPRESSION_QUEUE_SIZE', '16'))  # frames in flight
+    COMPRESSION_SHED_POLICY = os.environ.get('COMPRESSION_SHED_POLICY', 'downscale')  # downscale/skip
 
     # Monitoring
     SCREENSHOT_INTERVAL = 3  # seconds
     MAX_STUDENTS = 50
 
+    # Screen fan-out
+    SCREEN_FANOUT_MAX_FPS = float(os.environ.get('SCREEN_FANOUT_MAX_FPS', '2'))  # per teacher
+    UNWATCHED_SCREENSHOT_INTERVAL = 15  # seconds, for students no teacher is viewing
+    UNWATCHED_SCREENSHOT_MAX_WIDTH = 320
+    UNWATCHED_SCREENSHOT_MAX_HEIGHT = 180
+
+    # Activity rollups and retention
+    ROLLUP_FLUSH_INTERVAL = int(os.environ.get('ROLLUP_FLUSH_INTERVAL', '10'))  # seconds
+    ROLLUP_MAX_GAP = 60  # seconds between updates still counted as continuous use
+    ACTIVITY_RETENTION_DAYS = int(os.environ.get('ACTIVITY_RETENTION_DAYS', '14'))  # raw activities
+    ROLLUP_MINUTE_RETENTION_DAYS = int(os.environ.get('ROLLUP_MINUTE_RETENTION_DAYS', '30'))  # hour buckets are kept
+    RETENTION_BATCH_SIZE = 1000  # rows per delete transaction
+
+    # Live classroom metrics (AI insights)
+    CLASSROOM_METRICS_WINDOW = int(os.environ.get('CLASSROOM_METRICS_WINDOW', '600'))  # seconds
+
+    # Logging (written by a background thread)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.environ.get('LOG_FILE')  # rotating file, in addition to the console
+    LOG_JSON = os.environ.get('LOG_JSON', 'false').lower() == 'true'  # JSON lines in LOG_FILE
+    LOG_MAX_BYTES = 10 * 1024 * 1024
+    LOG_BACKUPS = 5
+    LOG_REPEAT_LIMIT = int(os.environ.get('LOG_REPEAT_LIMIT', '5'))  # identical messages per minute (0 = no limit)
+
+    # Prometheus /metrics (open when no token is set)
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+    # Profiling and recording routes (/api/admin/*) are limited to these teacher accounts
+    ADMIN_USERNAMES = [name for name in os.environ.get('ADMIN_USERNAMES', '').split(',') if name]
+    PROFILER_MAX_SECONDS = 60  # longest sampling session
+
+    # Socket.IO traffic traces for scripts/replay_traffic.py
+    TRAFFIC_TRACE_DIR = os.path.abspath(os.environ.get('TRAFFIC_TRACE_DIR') or os.path.join(INSTANCE_DIR, 'traces'))
+    TRAFFIC_RECORD = os.environ.get('TRAFFIC_RECORD')  # trace name to record from the first event
+    TRAFFIC_RECORD_FRAMES = os.environ.get('TRAFFIC_RECORD_FRAMES', 'true').lower() == 'true'  # store screenshots
+
 class DevelopmentConfig(Config):
     DEBUG = True
     TESTING = False
@@ -0,0 +1,39 @@
+from extensions import db
+
+
+class ActivityRollup(db.Model):
+    """Per-student app usage summed over a minute or hour bucket"""
+    __tablename__ = 'activity_rollups'
+
+    MINUTE = 60
+    HOUR = 3600
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.String(36), db.ForeignKey('users.id'), nullable=False)
+
+    resolution = db.Column(db.Integer, nullable=False)  # bucket size in seconds (60/3600)
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    active_app = db.Column(db.String(200), nullable=False, default='')
+
+    # Metrics
+    seconds = db.Column(db.Float, default=0)  # time spent in the app
+    idle_seconds = db.Column(db.Float, default=0)  # part of it with no screen change
+    switches = db.Column(db.Integer, default=0)  # switches into the app
+    samples = db.Column(db.Integer, default=0)  # screen updates received
+
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'resolution', 'bucket_start', 'active_app', name='uq_rollup_bucket'),
+        db.Index('idx_rollup_resolution_time', 'resolution', 'bucket_start'),
+    )
+
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'resolution': self.resolution,
+            'bucket_start': self.bucket_start.isoformat(),
+            'active_app': self.active_app,
+            'seconds': round(self.seconds, 1),
+            'idle_seconds': round(self.idle_seconds, 1),
+            'switches': self.switches,
+            'samples': self.samples
+        }
@@ -1,4 +1,5 @@
 from extensions import db, bcrypt
+from services.password_service import make_unusable_password_hash, is_usable_password_hash
 from datetime import datetime
 import uuid
 
@@ -10,6 +11,7 @@ class User(db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='student')  # teacher/student
+    token_version = db.Column(db.Integer, nullable=False, default=0)  # bump to revoke issued JWTs
 
     # Student-specific
     computer_id = db.Column(db.String(100), unique=True, index=True)
@@ -23,14 +25,24 @@ class User(db.Model):
 
     # Relationships
     activities = db.relationship('Activity', backref='user', lazy='dynamic', cascade='all, delete-orphan')
-    violations = db.relationship('Violation', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    violations = db.relationship('Violation', backref='user', lazy='dynamic', cascade='all, delete-orphan',
+                                 foreign_keys='Violation.user_id')
 
     def set_password(self, password):
         """Hash and set password"""
         self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
 
+    def set_unusable_password(self):
+        """Mark the account as having no password (no bcrypt work)"""
+        self.password_hash = make_unusable_password_hash()
+
+    def has_usable_password(self):
+        return is_usable_password_hash(self.password_hash)
+
     def check_password(self, password):
         """Verify password"""
+        if not self.has_usable_password():
+            return False
         return bcrypt.check_password_hash(self.password_hash, password)
 
     def to_dict(self):
@@ -0,0 +1,151 @@
+import base64
+import io
+import threading
+import requests
+from config import Config
+
+
+class AIBackendError(Exception):
+    """The model endpoint answered with an error"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class AIBackend:
+    """
+    Where ai_service sends its prompts.
+
+    Implementations turn a prompt (and optionally one base64 image) into the
+    model's text response, raising on failure. They are called from AI
+    scheduler worker threads, so they must be thread-safe.
+    """
+
+    name = 'base'
+
+    def generate(self, prompt, image_data=None):
+        """
+        Run one prompt
+
+        Args:
+            prompt: full prompt text
+            image_data: optional base64 encoded image (JPEG or PNG)
+
+        Returns:
+            response text
+        """
+        raise NotImplementedError
+
+
+class GeminiBackend(AIBackend):
+    """
+    Google's google-generativeai SDK.
+
+    The SDK takes over a second to import, so it is imported and configured
+    on the first request rather than when the backend is loaded.
+    """
+
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.model = None
+        self.lock = threading.Lock()
+
+    def _get_model(self):
+        with self.lock:
+            if self.model is None:
+                import google.generativeai as genai
+                import PIL.PngImagePlugin  # noqa: F401 (the SDK checks for it when sending images)
+
+                genai.configure(api_key=self.api_key)
+                self.model = genai.GenerativeModel(self.model_name)
+            return self.model
+
+    def generate(self, prompt, image_data=None):
+        model = self._get_model()
+        if image_data:
+            from PIL import Image
+
+            # Vision request
+            img = Image.open(io.BytesIO(base64.b64decode(image_data)))
+            response = model.generate_content([prompt, img])
+        else:
+            # Text-only request
+            response = model.generate_content(prompt)
+        return response.text
+
+
+class HTTPBackend(AIBackend):
+    """
+    Plain generateContent calls over HTTP.
+
+    Speaks the Gemini REST format directly, so it works against the real
+    API as well as a local stand-in such as scripts/mock_gemini_server.py,
+    without loading the SDK. Images are passed through as base64.
+    """
+
+    name = 'http'
+
+    def __init__(self, endpoint, api_key, model_name, timeout=10):
+        self.url = f"{endpoint.rstrip('/')}/v1beta/models/{model_name}:generateContent"
+        self.api_key = api_key
+        self.timeout = timeout
+        self.local = threading.local()  # one connection pool per worker thread
+
+    def _session(self):
+        if not hasattr(self.local, 'session'):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def generate(self, prompt, image_data=None):
+        parts = [{'text': prompt}]
+        if image_data:
+            mime_type = 'image/png' if image_data.startswith('iVBOR') else 'image/jpeg'
+            parts.append({'inline_data': {'mime_type': mime_type, 'data': image_data}})
+
+        response = self._session().post(
+            self.url,
+            params={'key': self.api_key or 'local'},
+            json={'contents': [{'role': 'user', 'parts': parts}]},
+            timeout=self.timeout
+        )
+        if response.status_code != 200:
+            try:
+                message = response.json()['error']['message']
+            except (ValueError, KeyError, TypeError):
+                message = response.text[:200]
+            raise AIBackendError(f"{response.status_code}: {message}", status=response.status_code)
+
+        try:
+            candidate = response.json()['candidates'][0]
+            return ''.join(part.get('text', '') for part in candidate['content']['parts'])
+        except (ValueError, KeyError, IndexError, TypeError):
+            raise AIBackendError("Malformed generateContent response")
+
+
+def create_ai_backend(name=None):
+    """
+    Build the configured AI backend
+
+    Args:
+        name: 'gemini' or 'http' (default AI_BACKEND; 'http' when
+              GEMINI_API_ENDPOINT is set, otherwise 'gemini')
+
+    Returns:
+        AIBackend
+    """
+    name = name or Config.AI_BACKEND or ('http' if Config.GEMINI_API_ENDPOINT else 'gemini')
+
+    if name == 'http':
+        return HTTPBackend(
+            Config.GEMINI_API_ENDPOINT or 'https://generativelanguage.googleapis.com',
+            Config.GEMINI_API_KEY,
+            Config.GEMINI_MODEL,
+            timeout=Config.AI_TIMEOUT
+        )
+    if name == 'gemini':
+        return GeminiBackend(Config.GEMINI_API_KEY, Config.GEMINI_MODEL)
+    raise ValueError(f"Unknown AI backend: {name}")
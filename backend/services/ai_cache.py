@@ -0,0 +1,129 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from config import Config
+from extensions import cache
+from services.telemetry import telemetry
+from utils.phash import content_hash
+
+
+def normalize(value):
+    """Canonical form of request inputs: collapsed whitespace, sorted keys"""
+    if isinstance(value, str):
+        return ' '.join(value.split())
+    if isinstance(value, dict):
+        return {str(k): normalize(v) for k, v in sorted(value.items(), key=lambda item: str(item[0]))}
+    if isinstance(value, (list, tuple)):
+        return [normalize(v) for v in value]
+    if isinstance(value, float):
+        return round(value, 3)
+    return value
+
+
+class AICache:
+    """
+    Content-addressed cache for AI responses.
+
+    Keys are a SHA-256 over model name, endpoint, prompt template version,
+    the normalized inputs and a hash of the image's decoded pixels, so they
+    are the same in every worker and across restarts and an unchanged screen
+    maps to the same entry. A perceptual hash is deliberately not used: it
+    cannot tell apart two versions of a student's code that differ by a
+    character. Bumping a template version invalidates that endpoint's
+    entries.
+
+    Lookups go through a small in-process LRU (L1) before the shared
+    Flask-Caching backend (L2); each endpoint has its own TTL.
+    """
+
+    def __init__(self, model_name, ttls, l1_size=256, shared=None):
+        self.model_name = model_name
+        self.ttls = ttls
+        self.l1_size = l1_size
+        self.shared = shared if shared is not None else cache
+        self.l1 = OrderedDict()  # key -> (expires_at, value)
+        self.lock = threading.Lock()
+        self.counters = defaultdict(lambda: {'l1_hits': 0, 'l2_hits': 0, 'misses': 0})
+
+    def key(self, endpoint, version, inputs, image=None):
+        """Stable cache key for one request (`image` may be a list of images)"""
+        if isinstance(image, (list, tuple)):
+            image_hash = [content_hash(img) for img in image]
+        else:
+            image_hash = content_hash(image) if image else None
+        material = {
+            'model': self.model_name,
+            'endpoint': endpoint,
+            'version': version,
+            'inputs': normalize(inputs),
+            'image': image_hash
+        }
+        digest = hashlib.sha256(json.dumps(material, sort_keys=True).encode('utf-8')).hexdigest()
+        return f"ai:{endpoint}:{digest}"
+
+    def get(self, endpoint, key):
+        now = time.time()
+        with self.lock:
+            entry = self.l1.get(key)
+            if entry and entry[0] > now:
+                self.l1.move_to_end(key)
+                self.counters[endpoint]['l1_hits'] += 1
+                return entry[1]
+            if entry:
+                del self.l1[key]
+
+        value = self._shared_get(key)
+        with self.lock:
+            if value is None:
+                self.counters[endpoint]['misses'] += 1
+                return None
+            self.counters[endpoint]['l2_hits'] += 1
+            self._l1_put(key, value, self.ttls.get(endpoint, 300), now)
+        return value
+
+    def set(self, endpoint, key, value):
+        ttl = self.ttls.get(endpoint, 300)
+        with self.lock:
+            self._l1_put(key, value, ttl, time.time())
+        self._shared_set(key, value, ttl)
+
+    def _l1_put(self, key, value, ttl, now):
+        self.l1[key] = (now + ttl, value)
+        self.l1.move_to_end(key)
+        while len(self.l1) > self.l1_size:
+            self.l1.popitem(last=False)
+
+    def _shared_get(self, key):
+        # The shared cache needs an app context and a reachable backend;
+        # without either we just run with L1
+        try:
+            return self.shared.get(key)
+        except Exception:
+            return None
+
+    def _shared_set(self, key, value, ttl):
+        try:
+            self.shared.set(key, value, timeout=ttl)
+        except Exception:
+            pass
+
+    def stats(self):
+        with self.lock:
+            endpoints = {name: dict(counts) for name, counts in self.counters.items()}
+            size = len(self.l1)
+        for counts in endpoints.values():
+            total = counts['l1_hits'] + counts['l2_hits'] + counts['misses']
+            counts['hit_rate'] = round((counts['l1_hits'] + counts['l2_hits']) / total, 3) if total else 0
+        return {'l1_size': size, 'endpoints': endpoints}
+
+
+# Global AI response cache
+ai_cache = AICache(Config.GEMINI_MODEL, Config.AI_CACHE_TTLS, l1_size=Config.AI_CACHE_L1_SIZE)
+
+telemetry.collect('counter', 'ai_cache_lookups_total', 'AI cache lookups by endpoint and result',
+                  lambda: {(endpoint, result): counts[result]
+                           for endpoint, counts in ai_cache.stats()['endpoints'].items()
+                           for result in ('l1_hits', 'l2_hits', 'misses')},
+                  labels=('endpoint', 'result'))
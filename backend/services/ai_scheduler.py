@@ -0,0 +1,253 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from config import Config
+from services.security_service import create_rate_limiter
+from services.telemetry import telemetry
+
+# Priorities (lower runs first)
+INTERACTIVE = 0  # a teacher is waiting on the response
+BATCH = 1  # whole-class jobs
+
+
+class AIRequestExpired(Exception):
+    """The request could not be started before its deadline"""
+
+
+class AIJob:
+    """One queued model call, shared by every caller with the same key"""
+
+    def __init__(self, fn, args, key, priority, deadline):
+        self.fn = fn
+        self.args = args
+        self.key = key
+        self.priority = priority
+        self.deadline = deadline
+        self.future = Future()
+        self.waiters = 1
+
+
+class AIScheduler:
+    """
+    Central queue for Gemini requests, paced to the API quota.
+
+    Instead of failing once the per-minute quota is used up, requests wait in
+    a priority queue (priority, then earliest deadline, then FIFO) and a
+    dispatcher thread starts them as the quota limiter's token bucket refills.
+    The limiter is the shared one from create_rate_limiter, so with
+    MULTI_WORKER all workers draw from the same quota. Its burst is 1: calls
+    start evenly, one every 60 / AI_RATE_LIMIT seconds, and never more than
+    AI_RATE_LIMIT in any rolling minute.
+
+    Requests with the same key (the AI cache key) while one is queued or
+    running share a single call and Future. A request not started by its
+    deadline fails with AIRequestExpired; a cancelled request is dropped
+    once its last waiter cancels. Callers block on `future.result()` or
+    attach `add_done_callback` to receive the result later.
+    """
+
+    def __init__(self, limiter, workers=4, quota_key='gemini'):
+        self.limiter = limiter
+        self.quota_key = quota_key
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai')
+        self.workers = threading.BoundedSemaphore(workers)
+
+        self.queue = []  # heap of (priority, deadline, seq, job)
+        self.inflight = {}  # key -> AIJob, queued or running
+        self.jobs = {}  # future -> AIJob
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.thread = None
+
+        # Metrics
+        self.submitted = 0
+        self.deduplicated = 0
+        self.completed = 0
+        self.expired = 0
+        self.cancelled = 0
+
+    def submit(self, fn, *args, key=None, priority=INTERACTIVE, timeout=None):
+        """
+        Queue fn(*args)
+
+        Args:
+            key: requests with equal keys are coalesced while in flight
+            priority: INTERACTIVE or BATCH
+            timeout: seconds the request may wait in the queue
+
+        Returns:
+            concurrent.futures.Future with fn's result
+        """
+        deadline = time.time() + timeout if timeout else float('inf')
+
+        with self.cond:
+            self.submitted += 1
+            job = self.inflight.get(key) if key else None
+            if job and not job.future.done():
+                job.waiters += 1
+                self.deduplicated += 1
+                # A more urgent duplicate promotes the shared job
+                if priority < job.priority or deadline < job.deadline:
+                    job.priority = min(priority, job.priority)
+                    job.deadline = min(deadline, job.deadline)
+                    heapq.heappush(self.queue, (job.priority, job.deadline, next(self.seq), job))
+                return job.future
+
+            job = AIJob(fn, args, key, priority, deadline)
+            if key:
+                self.inflight[key] = job
+            self.jobs[job.future] = job
+            job.future.add_done_callback(self._forget)
+            heapq.heappush(self.queue, (priority, deadline, next(self.seq), job))
+
+            if not self.thread:
+                self.thread = threading.Thread(target=self._dispatch_loop, name='ai-scheduler', daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+        return job.future
+
+    def cancel(self, future):
+        """Withdraw one waiter; the call is dropped when nobody is left waiting"""
+        with self.cond:
+            job = self.jobs.get(future)
+            if not job:
+                return False
+            job.waiters -= 1
+            if job.waiters > 0:
+                return True
+        if future.cancel():
+            with self.cond:
+                self.cancelled += 1
+            return True
+        return False
+
+    def _forget(self, future):
+        with self.cond:
+            job = self.jobs.pop(future, None)
+            if job and job.key and self.inflight.get(job.key) is job:
+                del self.inflight[job.key]
+
+    def _peek(self):
+        """Most urgent live job, dropping stale entries and failing expired ones (caller holds cond)"""
+        now = time.time()
+        while self.queue:
+            _, deadline, _, job = self.queue[0]
+            if job.future.done() or job.future.running() or deadline != job.deadline:
+                # cancelled/finished, or the old entry of a promoted job
+                heapq.heappop(self.queue)
+                continue
+            if job.deadline < now:
+                heapq.heappop(self.queue)
+                self.expired += 1
+                job.future.set_exception(AIRequestExpired("AI request expired in queue"))
+                continue
+            return job
+        return None
+
+    def _dispatch_loop(self):
+        while True:
+            self.workers.acquire()
+
+            with self.cond:
+                while not self._peek():
+                    self.cond.wait()
+
+            # Take a token before picking the job, so the most urgent request
+            # queued by then is the one that gets it (and can still be cancelled)
+            wait = self.limiter.retry_after(self.quota_key)
+            if wait > 0 or not self.limiter.allow(self.quota_key):
+                self.workers.release()
+                time.sleep(min(max(wait, 0.05), 1.0))
+                continue
+
+            with self.cond:
+                job = self._peek()
+                if job:
+                    heapq.heappop(self.queue)
+            if not job or not job.future.set_running_or_notify_cancel():
+                self.workers.release()
+                continue
+
+            self.executor.submit(self._run, job)
+
+    def _run(self, job):
+        try:
+            result = job.fn(*job.args)
+        except Exception as e:
+            job.future.set_exception(e)
+        else:
+            job.future.set_result(result)
+        finally:
+            with self.cond:
+                self.completed += 1
+            self.workers.release()
+
+    def stats(self):
+        with self.cond:
+            return {
+                'queued': sum(1 for job in self.jobs.values() if not job.future.running()),
+                'running': sum(1 for job in self.jobs.values() if job.future.running()),
+                'submitted': self.submitted,
+                'deduplicated': self.deduplicated,
+                'completed': self.completed,
+                'expired': self.expired,
+                'cancelled': self.cancelled,
+                'retry_after': round(self.limiter.retry_after(self.quota_key), 2)
+            }
+
+
+class AIBatch:
+    """
+    Futures submitted for one logical job (e.g. a whole-class code check)
+
+    cancel() withdraws every request still waiting; futures added after
+    that are cancelled straight away, so follow-up requests submitted from
+    completion callbacks cannot outlive the job.
+    """
+
+    def __init__(self, scheduler):
+        self.scheduler = scheduler
+        self.futures = set()
+        self.cancelled = False
+        self.lock = threading.Lock()
+
+    def add(self, future):
+        """Track a future; returns False (and cancels it) if the batch was cancelled"""
+        with self.lock:
+            cancelled = self.cancelled
+            if not cancelled:
+                self.futures.add(future)
+        if cancelled:
+            self.scheduler.cancel(future)
+            return False
+        future.add_done_callback(self._discard)
+        return True
+
+    def _discard(self, future):
+        with self.lock:
+            self.futures.discard(future)
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled = True
+            futures = list(self.futures)
+        for future in futures:
+            self.scheduler.cancel(future)
+
+
+# Global scheduler; the quota belongs to the API key, so it is shared across workers
+ai_scheduler = AIScheduler(
+    create_rate_limiter('gemini_quota', Config.AI_RATE_LIMIT, 60, burst=1),
+    workers=Config.AI_SCHEDULER_WORKERS
+)
+
+telemetry.collect('gauge', 'ai_requests', 'AI scheduler requests by state',
+                  lambda: {state: ai_scheduler.stats()[state] for state in ('queued', 'running')},
+                  labels=('state',))
+telemetry.collect('counter', 'ai_scheduler_total', 'AI scheduler requests by outcome',
+                  lambda: {outcome: ai_scheduler.stats()[outcome]
+                           for outcome in ('submitted', 'deduplicated', 'completed', 'expired', 'cancelled')},
+                  labels=('outcome',))
@@ -1,93 +1,132 @@
-import google.generativeai as genai
 import json
+import threading
 import time
+from concurrent.futures import Future, CancelledError, TimeoutError as FutureTimeout
 from datetime import datetime, timedelta
-from collections import deque
 from config import Config
-from extensions import cache
-import base64
-import io
-from PIL import Image
-
-# Configure Gemini
-genai.configure(api_key=Config.GEMINI_API_KEY)
-
-# Initialize model
-model = genai.GenerativeModel('gemini-1.5-flash')
+from services.ai_backend import create_ai_backend
+from services.ai_scheduler import ai_scheduler, AIBatch, AIRequestExpired, INTERACTIVE, BATCH
+from services.metrics_service import classroom_metrics
+from services.ai_cache import ai_cache
+from services.screen_prep import screen_prep
+from services.screen_clusters import screen_clusterer
+from services.task_classifier import task_classifier
+from services.telemetry import ai_call_seconds
+from utils.mosaic import build_mosaic
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class GeminiAIService:
     """Enhanced AI service with Gemini API"""
 
-    def __init__(self):
-        self.rate_limit_window = 60  # seconds
-        self.max_requests = 15  # free tier: 15 RPM
-        self.request_times = deque()
+    # Bump when a prompt template changes so cached answers are not reused
+    PROMPT_VERSIONS = {
+        'classroom': 1,
+        'code_check': 1,
+        'code_check_mosaic': 1,
+        'message': 1
+    }
 
-    def _check_rate_limit(self):
-        """Check if we can make a request"""
-        now = time.time()
-        cutoff = now - self.rate_limit_window
+    def __init__(self, backend=None):
+        """
+        Args:
+            backend: AIBackend to send prompts to (default create_ai_backend())
+        """
+        self.backend = backend or create_ai_backend()
 
-        # Remove old requests
-        while self.request_times and self.request_times[0] < cutoff:
-            self.request_times.popleft()
+    def _call_model(self, prompt, image_data, endpoint, cache_key, prepare=None):
+        """The actual model call; runs on an AI scheduler worker"""
+        if prepare:
+            image_data = prepare(image_data)
+        started = time.perf_counter()
+        try:
+            result = self.backend.generate(prompt, image_data)
+        except Exception:
+            ai_call_seconds.observe(time.perf_counter() - started, endpoint or 'uncached', 'error')
+            raise
+        ai_call_seconds.observe(time.perf_counter() - started, endpoint or 'uncached', 'ok')
 
-        if len(self.request_times) >= self.max_requests:
-            return False
+        # Cache result
+        if endpoint:
+            ai_cache.set(endpoint, cache_key, result)
 
-        self.request_times.append(now)
-        return True
+        return result
 
-    def _make_request(self, prompt, image_data=None, use_cache=True):
-        """Make API request with caching and error handling"""
+    def _submit_request(self, prompt, image_data=None, endpoint=None, inputs=None,
+                        priority=INTERACTIVE, timeout=None, key_images=None, prepare=None):
+        """
+        Queue an API request on the AI scheduler
 
-        # Check cache first
-        if use_cache:
-            cache_key = f"ai_{hash(prompt)}"
-            cached = cache.get(cache_key)
-            if cached:
-                return cached
+        Args:
+            prompt: full prompt text
+            image_data: optional base64 screenshot
+            endpoint: cache namespace/TTL (see AI_CACHE_TTLS); None disables caching
+            inputs: the values the prompt was built from, for the cache key
+            priority: INTERACTIVE or BATCH
+            timeout: seconds the request may wait for quota
+            key_images: images identifying the request for the cache key
+                        (default: image_data)
+            prepare: turns image_data into the image actually sent; runs on
+                     the worker, so only requests that reach the model pay
+                     for it
 
-        # Rate limit check
-        if not self._check_rate_limit():
-            print("⚠️ Rate limit reached, using fallback")
-            return None
+        Returns:
+            Future resolving to the response text
+        """
 
+        # Check cache first
+        cache_key = None
+        if endpoint:
+            cache_key = ai_cache.key(
+                endpoint, self.PROMPT_VERSIONS[endpoint], inputs,
+                image=key_images if key_images is not None else image_data
+            )
+            cached = ai_cache.get(endpoint, cache_key)
+            if cached:
+                future = Future()
+                future.set_result(cached)
+                return future
+
+        # Identical requests in flight share one call
+        return ai_scheduler.submit(
+            self._call_model, prompt, image_data, endpoint, cache_key, prepare,
+            key=cache_key, priority=priority, timeout=timeout or Config.AI_QUEUE_TIMEOUT
+        )
+
+    def _result(self, future, timeout=None):
+        """Wait for a submitted request; None means use the fallback"""
+        timeout = timeout or Config.AI_QUEUE_TIMEOUT
         try:
-            if image_data:
-                # Vision request
-                # Decode base64 to PIL Image
-                img_bytes = base64.b64decode(image_data)
-                img = Image.open(io.BytesIO(img_bytes))
-
-                response = model.generate_content([prompt, img])
-            else:
-                # Text-only request
-                response = model.generate_content(prompt)
-
-            result = response.text
-
-            # Cache result
-            if use_cache:
-                cache.set(cache_key, result, timeout=300)  # 5 min cache
-
-            return result
-
+            return future.result(timeout=timeout + Config.AI_TIMEOUT)
+        except AIRequestExpired:
+            logger.warning("⚠️ AI quota queue too long, using fallback")
+        except (FutureTimeout, CancelledError):
+            ai_scheduler.cancel(future)
+            logger.warning("⚠️ AI request timed out, using fallback")
         except Exception as e:
-            print(f"❌ Gemini API Error: {e}")
-            return None
+            logger.error(f"❌ Gemini API Error: {e}")
+        return None
+
+    def _make_request(self, prompt, image_data=None, endpoint=None, inputs=None):
+        """Make API request with caching and error handling, waiting for quota"""
+        return self._result(self._submit_request(prompt, image_data, endpoint, inputs))
 
-    def analyze_classroom(self, students_data):
+    def analyze_classroom(self, students_data=None):
         """
         Analyze entire classroom and provide insights
 
         Args:
-            students_data: dict with student metrics
+            students_data: dict with student metrics; defaults to the live
+                           classroom_metrics snapshot
 
         Returns:
             dict with analysis results
         """
 
+        if students_data is None:
+            students_data = classroom_metrics.snapshot()
+
         # Prepare metrics summary
         metrics = {
             'total_students': len(students_data),
@@ -135,7 +174,7 @@ Provide a concise analysis in JSON format:
 
 Be specific, actionable, and brief. Focus on students who need help NOW."""
 
-        response = self._make_request(prompt, use_cache=False)
+        response = self._make_request(prompt, endpoint='classroom', inputs=metrics['students'])
 
         if response:
             try:
@@ -150,7 +189,8 @@ Be specific, actionable, and brief. Focus on students who need help NOW."""
         # Fallback: rule-based analysis
         return self._fallback_classroom_analysis(students_data)
 
-    def check_code_on_screen(self, screenshot_base64, student_name, language='python'):
+    def check_code_on_screen(self, screenshot_base64, student_name, language='python', window_rect=None,
+                             context=None):
         """
         Analyze code on student's screen using Vision API
 
@@ -158,10 +198,28 @@ Be specific, actionable, and brief. Focus on students who need help NOW."""
             screenshot_base64: base64 encoded screenshot
             student_name: student's name
             language: programming language (python, javascript, etc.)
+            window_rect: active window [x, y, width, height] as screen
+                         fractions; the screenshot is cropped to it
+            context: dict with the student's active_app, active_window and
+                     processes; obvious off-task/no-code screens are then
+                     answered by the task pre-classifier (AI_PRECLASSIFY)
 
         Returns:
             dict with code analysis
         """
+        decision = task_classifier.classify(context) if context and Config.AI_PRECLASSIFY else None
+        if decision and decision['decided']:
+            return task_classifier.analysis(decision)
+
+        future = self._submit_code_check(screenshot_base64, student_name, language, window_rect=window_rect)
+        analysis = self._parse_code_check(self._result(future))
+        if decision:
+            task_classifier.learn(decision, analysis)
+        return analysis
+
+    def _submit_code_check(self, screenshot_base64, student_name, language='python',
+                           priority=INTERACTIVE, timeout=None, window_rect=None):
+        """Queue a code check; returns a Future with the raw response"""
 
         prompt = f"""Analyze the code visible on this student's screen.
 
@@ -188,14 +246,60 @@ Respond in JSON format:
 
 Be concise and helpful. If no code is visible, indicate what the student is doing instead."""
 
-        response = self._make_request(prompt, image_data=screenshot_base64, use_cache=False)
+        return self._submit_request(
+            prompt,
+            image_data=screenshot_base64,
+            endpoint='code_check',
+            inputs={
+                'student': student_name,
+                'language': language,
+                'window_rect': window_rect,
+                'prep': screen_prep.signature()
+            },
+            priority=priority,
+            timeout=timeout,
+            prepare=lambda image: screen_prep.process(image, window_rect)[0]
+        )
+
+    # Statuses the code check prompts ask for
+    CODE_STATUSES = ('correct', 'has_issues', 'error', 'no_code', 'off_task')
+
+    @staticmethod
+    def _normalize_analysis(analysis):
+        """
+        Make a parsed code check safe to categorize
 
+        Args:
+            analysis: one analysis dict as the model returned it
+
+        Returns:
+            the same dict with a known status (no_analysis otherwise), an
+            issues list and a numeric confidence, or None if it is not a dict
+        """
+        if not isinstance(analysis, dict):
+            return None
+        if analysis.get('status') not in GeminiAIService.CODE_STATUSES:
+            analysis['status'] = 'no_analysis'
+        if not isinstance(analysis.get('issues'), list):
+            analysis['issues'] = []
+        try:
+            confidence = float(analysis.get('confidence', 0))
+        except (TypeError, ValueError):
+            confidence = 0
+        analysis['confidence'] = confidence if confidence == confidence else 0  # NaN
+        return analysis
+
+    @staticmethod
+    def _parse_code_check(response):
+        """Code check JSON from a model response, or the no-analysis fallback"""
         if response:
             try:
                 json_start = response.find('{')
                 json_end = response.rfind('}') + 1
                 json_str = response[json_start:json_end]
-                return json.loads(json_str)
+                analysis = GeminiAIService._normalize_analysis(json.loads(json_str))
+                if analysis is not None:
+                    return analysis
             except:
                 pass
 
@@ -207,19 +311,87 @@ Be concise and helpful. If no code is visible, indicate what the student is doin
             "confidence": 0
         }
 
-    def batch_check_code(self, students):
-        """
-        Check code on multiple student screens in parallel
+    def _submit_mosaic_check(self, students, language='python', priority=BATCH, timeout=None):
+        """Queue one vision request covering several students' screens"""
 
-        Args:
-            students: list of dicts with {id, name, screenshot_base64}
+        roster = "\n".join(f"Tile {i + 1}: {student['name']}" for i, student in enumerate(students))
+        prompt = f"""This image is a grid of {len(students)} student screens. Each tile has a yellow number label in its top-left corner.
 
-        Returns:
-            dict categorizing students by code status
-        """
-        from concurrent.futures import ThreadPoolExecutor, as_completed
+{roster}
 
-        results = {
+Expected language: {language}
+
+Analyze the code visible in EACH tile separately. Respond in JSON format:
+{{
+  "tiles": [
+    {{
+      "tile": <tile number>,
+      "has_code": <true/false>,
+      "language_detected": "<language or 'none'>",
+      "status": "<correct|has_issues|error|no_code|off_task>",
+      "issues": [
+        {{
+          "type": "<syntax|logic|style|performance>",
+          "description": "<brief issue>",
+          "line": <line number or null>,
+          "severity": "<low|medium|high>"
+        }}
+      ],
+      "confidence": <0-100>
+    }}
+  ]
+}}
+
+Include every tile exactly once. Lower the confidence when a tile is too small to read."""
+
+        screenshots = [student['screenshot'] for student in students]
+        rects = [student.get('window_rect') for student in students]
+
+        def prepare(images):
+            # Tiles are scaled to fit the grid, so only crop and drop color here
+            return build_mosaic([
+                screen_prep.process(image, rect, steps=('crop', 'trim', 'grayscale'))[0]
+                for image, rect in zip(images, rects)
+            ])
+
+        return self._submit_request(
+            prompt,
+            image_data=screenshots,
+            endpoint='code_check_mosaic',
+            inputs={
+                'students': [student['name'] for student in students],
+                'language': language,
+                'window_rects': rects,
+                'prep': screen_prep.signature()
+            },
+            priority=priority,
+            timeout=timeout,
+            prepare=prepare
+        )
+
+    @staticmethod
+    def _parse_mosaic_check(response, count):
+        """Per-tile analyses from a mosaic response; None for missing tiles"""
+        analyses = [None] * count
+        if not response:
+            return analyses
+        try:
+            json_start = response.find('{')
+            json_end = response.rfind('}') + 1
+            for tile in json.loads(response[json_start:json_end]).get('tiles', []):
+                if not isinstance(tile, dict):
+                    continue
+                index = int(tile.get('tile', 0)) - 1
+                if 0 <= index < count:
+                    analyses[index] = GeminiAIService._normalize_analysis(tile)
+        except (ValueError, TypeError, AttributeError):
+            pass
+        return analyses
+
+    @staticmethod
+    def code_summary():
+        """Empty batch code check summary, one list per status category"""
+        return {
             'correct': [],
             'has_issues': [],
             'errors': [],
@@ -227,49 +399,179 @@ Be concise and helpful. If no code is visible, indicate what the student is doin
             'off_task': []
         }
 
-        def check_student(student):
-            analysis = self.check_code_on_screen(
-                student['screenshot'],
-                student['name']
+    @staticmethod
+    def categorize(results, name, analysis):
+        """Add one student's analysis to a code_summary() dict"""
+        status = analysis.get('status')
+
+        if status == 'correct':
+            results['correct'].append(name)
+        elif status == 'has_issues':
+            results['has_issues'].append({
+                'name': name,
+                'issues': analysis.get('issues', [])
+            })
+        elif status == 'error':
+            results['errors'].append({
+                'name': name,
+                'issues': analysis.get('issues', [])
+            })
+        elif status == 'off_task':
+            results['off_task'].append(name)
+        else:
+            results['no_code'].append(name)
+
+    def stream_check_code(self, students, on_result, language='python', mosaic=None, cluster=None,
+                          preclassify=None):
+        """
+        Queue code checks for several students without waiting for them
+
+        All checks are queued at batch priority and paced to the quota, so
+        every student gets a real analysis unless the queue wait exceeds
+        AI_BATCH_QUEUE_TIMEOUT. Screens the task pre-classifier is sure are
+        off task or show no code are answered locally (`classified_by`
+        names the tier) and never reach the model. In mosaic mode
+        AI_MOSAIC_TILES screens share one request; tiles the model is
+        unsure about (confidence below AI_MOSAIC_MIN_CONFIDENCE, or
+        missing) are re-checked on their own. With clustering, students
+        showing the same screen share one check; their copies of the
+        analysis name the student checked in `same_as`.
+
+        Args:
+            students: list of dicts with {id, name, screenshot, window_rect,
+                      active_app, active_window, processes (all optional
+                      but id, name and screenshot)}
+            on_result: called as on_result(student, analysis) once per
+                       student, as soon as its analysis is ready (on an AI
+                       worker thread, or right away for cached answers)
+            mosaic: tile several screens per request (default AI_MOSAIC_BATCHING)
+            cluster: group identical screens (default AI_SCREEN_CLUSTERING)
+            preclassify: decide obvious screens locally (default AI_PRECLASSIFY)
+
+        Returns:
+            AIBatch; cancel() drops the checks not yet started and no
+            further results are reported
+        """
+        batch = AIBatch(ai_scheduler)
+        timeout = Config.AI_BATCH_QUEUE_TIMEOUT
+        if mosaic is None:
+            mosaic = Config.AI_MOSAIC_BATCHING
+        if cluster is None:
+            cluster = Config.AI_SCREEN_CLUSTERING
+        if preclassify is None:
+            preclassify = Config.AI_PRECLASSIFY
+        tiles = max(1, Config.AI_MOSAIC_TILES)
+
+        # Easy cases are answered locally; the AI's answers for the rest train the classifier
+        decisions = {}
+        local = []
+        if preclassify:
+            escalated = []
+            for student in students:
+                decision = task_classifier.classify(student)
+                if decision['decided']:
+                    local.append((student, decision))
+                else:
+                    decisions[id(student)] = decision
+                    escalated.append(student)
+            students = escalated
+
+        # Only each group's first student is checked; the rest follow it
+        followers = {}
+        if cluster and len(students) > 1:
+            groups = screen_clusterer.cluster(students)
+            students = [group[0] for group in groups]
+            followers = {id(group[0]): group[1:] for group in groups if len(group) > 1}
+
+        def deliver(student, analysis):
+            try:
+                on_result(student, analysis)
+            except Exception as e:
+                logger.error(f"Error reporting code check: {e}")
+
+        def report(student, analysis):
+            if batch.cancelled:
+                return
+            if id(student) in decisions:
+                task_classifier.learn(decisions[id(student)], analysis)
+            deliver(student, analysis)
+            for member in followers.get(id(student), ()):
+                deliver(member, dict(analysis, same_as=student['name']))
+
+        def single(student):
+            future = self._submit_code_check(
+                student['screenshot'], student['name'], language, priority=BATCH, timeout=timeout,
+                window_rect=student.get('window_rect')
             )
-            return {
-                'student_id': student['id'],
-                'student_name': student['name'],
-                'analysis': analysis
-            }
+            if batch.add(future):
+                future.add_done_callback(
+                    lambda f: f.cancelled() or report(student, self._parse_code_check(self._result(f)))
+                )
+
+        def mosaic_done(group, future):
+            if future.cancelled():
+                return
+            analyses = self._parse_mosaic_check(self._result(future), len(group))
+            for student, analysis in zip(group, analyses):
+                if analysis and analysis['status'] != 'no_analysis' and \
+                        analysis['confidence'] >= Config.AI_MOSAIC_MIN_CONFIDENCE:
+                    report(student, analysis)
+                else:
+                    # Missing, unreadable or low confidence: look at this screen on its own
+                    single(student)
+
+        if mosaic and len(students) > 1:
+            for i in range(0, len(students), tiles):
+                group = students[i:i + tiles]
+                future = self._submit_mosaic_check(group, language, timeout=timeout)
+                if batch.add(future):
+                    future.add_done_callback(lambda f, group=group: mosaic_done(group, f))
+        else:
+            for student in students:
+                single(student)
+
+        for student, decision in local:
+            deliver(student, task_classifier.analysis(decision))
+
+        return batch
+
+    def batch_check_code(self, students, language='python', mosaic=None, cluster=None, preclassify=None):
+        """
+        Check code on multiple student screens and wait for all of them
+
+        See stream_check_code; this collects its results into one summary.
+
+        Args:
+            students: list of dicts with {id, name, screenshot, window_rect (optional)}
+            mosaic: tile several screens per request (default AI_MOSAIC_BATCHING)
+            cluster: group identical screens (default AI_SCREEN_CLUSTERING)
+            preclassify: decide obvious screens locally (default AI_PRECLASSIFY)
+
+        Returns:
+            dict categorizing students by code status
+        """
+        results = self.code_summary()
+        lock = threading.Lock()
+        finished = threading.Event()
+        remaining = [len(students)]
+
+        def collect(student, analysis):
+            with lock:
+                self.categorize(results, student['name'], analysis)
+                remaining[0] -= 1
+                if remaining[0] <= 0:
+                    finished.set()
+
+        if not students:
+            return results
+
+        batch = self.stream_check_code(students, collect, language, mosaic, cluster, preclassify)
+        if not finished.wait(Config.AI_CODE_CHECK_TIMEOUT):
+            batch.cancel()
+            logger.warning("⚠️ Batch code check timed out, returning partial results")
 
-        # Limit concurrent requests to avoid rate limits
-        max_workers = min(5, len(students))
-
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            futures = [executor.submit(check_student, s) for s in students]
-
-            for future in as_completed(futures):
-                try:
-                    result = future.result()
-                    status = result['analysis']['status']
-
-                    if status == 'correct':
-                        results['correct'].append(result['student_name'])
-                    elif status == 'has_issues':
-                        results['has_issues'].append({
-                            'name': result['student_name'],
-                            'issues': result['analysis']['issues']
-                        })
-                    elif status == 'error':
-                        results['errors'].append({
-                            'name': result['student_name'],
-                            'issues': result['analysis']['issues']
-                        })
-                    elif status == 'off_task':
-                        results['off_task'].append(result['student_name'])
-                    else:
-                        results['no_code'].append(result['student_name'])
-
-                except Exception as e:
-                    print(f"Error checking student: {e}")
-
-        return results
+        with lock:
+            return {category: list(items) for category, items in results.items()}
 
     def generate_smart_message(self, student_context):
         """
@@ -307,7 +609,7 @@ Rules:
 - Include appropriate emoji
 - Tailor to their specific situation"""
 
-        response = self._make_request(prompt, use_cache=False)
+        response = self._make_request(prompt, endpoint='message', inputs=student_context)
 
         if response:
             try:
@@ -0,0 +1,261 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from config import Config
+from extensions import socketio
+from services.ai_service import ai_service
+from services.metrics_service import classroom_metrics
+from services.shared_state import shared_state
+from services.telemetry import telemetry
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CodeCheckJobsBusy(Exception):
+    """Too many whole-class code checks are already running"""
+
+
+class CodeCheckJob:
+    """One whole-class code check and its results so far"""
+
+    def __init__(self, owner, sid, students, language):
+        self.id = uuid.uuid4().hex
+        self.owner = owner
+        self.sid = sid
+        self.language = language
+        self.total = len(students)
+        self.checked = 0
+        self.shared = 0  # results copied from a student with the same screen
+        self.local = 0  # answered by the task pre-classifier without the model
+        self.results = ai_service.code_summary()
+        self.status = 'running'  # running/completed/cancelled/timed_out
+        self.created_at = time.time()
+        self.finished_at = None
+        self.batch = None
+        self.timer = None
+
+    def to_dict(self):
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'language': self.language,
+            'checked': self.checked,
+            'shared': self.shared,
+            'local': self.local,
+            'total': self.total,
+            'results': {category: list(items) for category, items in self.results.items()},
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+
+
+class CodeCheckJobs:
+    """
+    Whole-class code checks that run in the background.
+
+    start() queues every student's check and returns at once. Each analysis
+    is pushed to the requesting teacher's socket as `code_check_result` the
+    moment it is ready, followed by one `code_check_complete` with the
+    categorized summary. The same state can be polled by job id.
+
+    At most `max_active` jobs run at a time, and a job is cancelled when
+    the teacher asks, when their socket disconnects, or after `timeout`.
+    Jobs run in the process that started them; finished ones are kept
+    (up to `keep`) so their summary can still be fetched. Given a shared
+    `state` (MULTI_WORKER), every job's progress is also published there,
+    so `status` and `cancel` work from any worker: a job running elsewhere
+    is cancelled by its own worker when its next result arrives.
+    """
+
+    def __init__(self, max_active=2, timeout=600, keep=50, emit=None, state=None):
+        self.max_active = max_active
+        self.timeout = timeout
+        self.keep = keep
+        self.emit = emit or (lambda event, data, to: socketio.emit(event, data, to=to))
+        self.state = state
+        self.jobs = OrderedDict()  # job id -> CodeCheckJob, oldest first
+        self.lock = threading.Lock()
+
+        # Metrics
+        self.started = 0
+        self.rejected = 0
+        self.finished = {'completed': 0, 'cancelled': 0, 'timed_out': 0}
+
+    def start(self, students, language='python', owner=None, sid=None):
+        """
+        Start checking code on the given screens
+
+        Args:
+            students: list of dicts with {id, name, screenshot, window_rect,
+                      active_app, active_window (optional)}
+            owner: user id of the requesting teacher
+            sid: Socket.IO session to stream results to (None: poll only)
+
+        Returns:
+            CodeCheckJob
+
+        Raises:
+            CodeCheckJobsBusy: max_active jobs are already running
+        """
+        job = CodeCheckJob(owner, sid, students, language)
+
+        # The process list (and anything the client left out) for the pre-classifier
+        for student in students:
+            context = classroom_metrics.context(student.get('id'))
+            for key, value in context.items():
+                if not student.get(key):
+                    student[key] = value
+
+        with self.lock:
+            if sum(1 for j in self.jobs.values() if j.status == 'running') >= self.max_active:
+                self.rejected += 1
+                raise CodeCheckJobsBusy()
+            self.started += 1
+            self.jobs[job.id] = job
+            trimmed = self._trim()
+
+        if self.state:
+            self.state.hdel('code_check_jobs', *trimmed)
+        self._share(job)
+
+        job.timer = threading.Timer(self.timeout, self._finish, args=(job, 'timed_out'))
+        job.timer.daemon = True
+        job.timer.start()
+
+        if not students:
+            self._finish(job, 'completed')
+            return job
+
+        job.batch = ai_service.stream_check_code(
+            students, lambda student, analysis: self._on_result(job, student, analysis), language
+        )
+        return job
+
+    def _on_result(self, job, student, analysis):
+        # Cancelled through another worker
+        if self.state and self.state.hget('code_check_cancel', job.id):
+            self._finish(job, 'cancelled')
+            return
+
+        with self.lock:
+            if job.status != 'running':
+                return
+            ai_service.categorize(job.results, student['name'], analysis)
+            job.checked += 1
+            if analysis.get('same_as'):
+                job.shared += 1
+            if analysis.get('classified_by'):
+                job.local += 1
+            checked = job.checked
+
+        if checked < job.total:
+            self._share(job)
+
+        if job.sid:
+            self.emit('code_check_result', {
+                'job_id': job.id,
+                'student_id': student.get('id'),
+                'name': student['name'],
+                'analysis': analysis,
+                'checked': checked,
+                'total': job.total
+            }, job.sid)
+
+        if checked >= job.total:
+            self._finish(job, 'completed')
+
+    def _finish(self, job, status):
+        with self.lock:
+            if job.status != 'running':
+                return False
+            job.status = status
+            job.finished_at = time.time()
+            self.finished[status] += 1
+
+        if job.timer:
+            job.timer.cancel()
+        if job.batch and status != 'completed':
+            job.batch.cancel()
+        if self.state:
+            self.state.hdel('code_check_cancel', job.id)
+        self._share(job)
+
+        if job.sid:
+            self.emit('code_check_complete', job.to_dict(), job.sid)
+        logger.info(f"🧑‍💻 Code check {job.id[:8]} {status}: {job.checked}/{job.total} students")
+        return True
+
+    def _trim(self):
+        """Drop the oldest finished jobs beyond `keep` (caller holds lock)"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.status != 'running']
+        trimmed = finished[:max(0, len(finished) - self.keep)]
+        for job_id in trimmed:
+            del self.jobs[job_id]
+        return trimmed
+
+    def _share(self, job):
+        """Publish a job's progress for the other workers"""
+        if self.state:
+            self.state.hset('code_check_jobs', job.id, {'owner': job.owner, 'job': job.to_dict()})
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def status(self, job_id):
+        """
+        A job's owner and progress, wherever it runs
+
+        Returns:
+            (owner, job dict) or None if the job is unknown
+        """
+        job = self.get(job_id)
+        if job:
+            return job.owner, job.to_dict()
+        shared = self.state.hget('code_check_jobs', job_id) if self.state else None
+        if not shared:
+            return None
+        return shared['owner'], shared['job']
+
+    def cancel(self, job_id):
+        """Cancel a running job; False if it is unknown or already finished"""
+        job = self.get(job_id)
+        if job:
+            return self._finish(job, 'cancelled')
+
+        # Running on another worker: it cancels the job on its next result
+        shared = self.state.hget('code_check_jobs', job_id) if self.state else None
+        if not shared or shared['job']['status'] != 'running':
+            return False
+        self.state.hset('code_check_cancel', job_id, True)
+        return True
+
+    def cancel_for_sid(self, sid):
+        """Cancel the jobs streaming to a socket that went away"""
+        with self.lock:
+            jobs = [job for job in self.jobs.values() if job.sid == sid and job.status == 'running']
+        for job in jobs:
+            self._finish(job, 'cancelled')
+
+    def stats(self):
+        with self.lock:
+            return {
+                'active': sum(1 for job in self.jobs.values() if job.status == 'running'),
+                'max_active': self.max_active,
+                'started': self.started,
+                'rejected': self.rejected,
+                **self.finished
+            }
+
+
+# Global whole-class code check jobs
+code_check_jobs = CodeCheckJobs(
+    max_active=Config.AI_CODE_CHECK_JOBS,
+    timeout=Config.AI_CODE_CHECK_TIMEOUT,
+    state=shared_state if Config.MULTI_WORKER else None
+)
+
+telemetry.collect('gauge', 'code_check_jobs_active', 'Whole-class code checks running',
+                  lambda: code_check_jobs.stats()['active'])
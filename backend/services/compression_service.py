@@ -1,7 +1,14 @@
-from PIL import Image
-import io
-import base64
-import hashlib
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from config import Config
+from services.telemetry import telemetry, compression_seconds
+from utils.compression import compress_image, timed_compress_image
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
 
 class ImageCompressor:
     """Efficient image compression for screenshots"""
@@ -16,49 +23,157 @@ class ImageCompressor:
         Compress base64 encoded image
         Returns: (compressed_base64, hash, size_kb)
         """
-        try:
-            # Decode base64
-            img_data = base64.b64decode(base64_str)
-
-            # Open image
-            img = Image.open(io.BytesIO(img_data))
-
-            # Convert RGBA to RGB if needed
-            if img.mode == 'RGBA':
-                img = img.convert('RGB')
+        return compress_image(base64_str, self.quality, self.max_width, self.max_height)
 
-            # Resize if too large
-            if img.width > self.max_width or img.height > self.max_height:
-                img.thumbnail((self.max_width, self.max_height), Image.Resampling.LANCZOS)
-
-            # Compress to JPEG
-            buffer = io.BytesIO()
-            img.save(buffer, format='JPEG', quality=self.quality, optimize=True)
-            compressed_data = buffer.getvalue()
+    def batch_compress(self, base64_images):
+        """Compress multiple images in parallel (Pillow releases the GIL while resizing and encoding)"""
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(self.compress_base64, base64_images))
 
-            # Calculate hash for deduplication
-            img_hash = hashlib.sha256(compressed_data).hexdigest()
+        return results
 
-            # Encode to base64
-            compressed_base64 = base64.b64encode(compressed_data).decode('utf-8')
 
-            # Calculate size in KB
-            size_kb = len(compressed_data) / 1024
+class CompressionPool:
+    """
+    Off-thread screenshot compression backed by a process pool.
+
+    Decode/resize/encode runs in worker processes so socket handlers never
+    hold the GIL for it. Workers only need utils.compression; the server
+    modules guard their bootstrapping so a spawned worker re-importing
+    __main__ does not build the app. At most `max_pending` jobs are in flight; past the
+    `downscale_at` fraction of that, new jobs are compressed at half size and
+    lower quality so the backlog drains faster ('downscale' policy), and once
+    the queue is full new frames are dropped.
+    """
+
+    def __init__(self, compressor, workers=2, max_pending=16, shed_policy='downscale', downscale_at=0.5):
+        self.compressor = compressor
+        self.workers = workers
+        self.max_pending = max_pending
+        self.shed_policy = shed_policy
+        self.downscale_at = downscale_at
+
+        self._executor = None
+        self.lock = threading.Lock()
+        self.pending = 0
+
+        # Metrics
+        self.submitted = 0
+        self.completed = 0
+        self.downscaled = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def _get_executor(self):
+        """Start worker processes on first use"""
+        with self.lock:
+            if self._executor is None:
+                # spawn: forking a threaded server can copy held locks into the child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')
+                )
+            return self._executor
+
+    def submit(self, base64_str, callback):
+        """
+        Queue a screenshot for compression
 
-            return compressed_base64, img_hash, size_kb
+        Args:
+            base64_str: base64 encoded image
+            callback: called with (compressed_base64, hash, size_kb) when done
 
+        Returns:
+            True if accepted, False if the frame was shed
+        """
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.skipped += 1
+                return False
+
+            self.pending += 1
+            self.submitted += 1
+            degrade = (self.shed_policy == 'downscale'
+                       and self.pending > self.max_pending * self.downscale_at)
+            if degrade:
+                self.downscaled += 1
+
+        quality = self.compressor.quality
+        max_width, max_height = self.compressor.max_width, self.compressor.max_height
+        if degrade:
+            quality = max(20, quality - 20)
+            max_width, max_height = max_width // 2, max_height // 2
+
+        submitted_at = time.perf_counter()
+        try:
+            future = self._get_executor().submit(
+                timed_compress_image, base64_str, quality, max_width, max_height
+            )
         except Exception as e:
-            print(f"Compression error: {e}")
-            return None, None, 0
+            logger.error(f"Compression pool error: {e}")
+            with self.lock:
+                self.pending -= 1
+                self.failed += 1
+            return False
 
-    def batch_compress(self, base64_images):
-        """Compress multiple images in parallel"""
-        from concurrent.futures import ThreadPoolExecutor
+        future.add_done_callback(partial(self._on_done, callback=callback, submitted_at=submitted_at))
+        return True
 
-        with ThreadPoolExecutor(max_workers=4) as executor:
-            results = list(executor.map(self.compress_base64, base64_images))
+    def _on_done(self, future, callback, submitted_at):
+        """Release the queue slot and hand the result to the caller"""
+        with self.lock:
+            self.pending -= 1
 
-        return results
+        try:
+            result, seconds = future.result()
+            compression_seconds.observe(seconds, 'encode')
+        except Exception as e:
+            logger.error(f"Compression worker error: {e}")
+            result = (None, None, 0)
+        compression_seconds.observe(time.perf_counter() - submitted_at, 'total')
+
+        with self.lock:
+            if result[0] is None:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+        callback(result)
+
+    def stats(self):
+        """Queue depth and shedding counters"""
+        with self.lock:
+            return {
+                'pending': self.pending,
+                'max_pending': self.max_pending,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'downscaled': self.downscaled,
+                'skipped': self.skipped,
+                'failed': self.failed
+            }
+
+    def shutdown(self):
+        """Stop worker processes"""
+        with self.lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
 
 # Global compressor instance
 compressor = ImageCompressor(quality=60, max_width=1280, max_height=720)
+
+# Global compression pool for socket handlers
+compression_pool = CompressionPool(
+    compressor,
+    workers=Config.COMPRESSION_WORKERS,
+    max_pending=Config.COMPRESSION_QUEUE_SIZE,
+    shed_policy=Config.COMPRESSION_SHED_POLICY
+)
+
+telemetry.collect('gauge', 'compression_pending', 'Screenshots queued or being compressed',
+                  lambda: compression_pool.pending)
+telemetry.collect('counter', 'compression_frames_total', 'Screenshots by compression outcome',
+                  lambda: {outcome: compression_pool.stats()[outcome]
+                           for outcome in ('completed', 'downscaled', 'skipped', 'failed')},
+                  labels=('outcome',))
@@ -0,0 +1,359 @@
+import itertools
+import threading
+import time
+from config import Config
+from extensions import socketio
+from services.shared_state import shared_state
+from services.telemetry import telemetry, broadcast_seconds
+
+
+class TeacherChannel:
+    """Per-teacher send state: last frame sent per student plus metrics"""
+
+    def __init__(self, sid, max_fps, index=None):
+        self.sid = sid
+        self.index = index  # opaque number for stats; the sid stays private
+        self.max_fps = max_fps
+        self.sent_seq = {}  # student_id -> seq of last frame sent
+        self.subscriptions = None  # student_id -> (width, height); None = all students
+        self.running = True
+
+        # Metrics
+        self.frames_sent = 0
+        self.frames_dropped = 0
+        self.last_send_at = None
+
+
+class FrameFanout:
+    """
+    Latest-wins screen_data fan-out.
+
+    Each student has a single slot holding its newest frame. Publishing a new
+    frame overwrites the slot, so a teacher that hasn't picked up the previous
+    frame yet simply never sees it (counted as a drop). Every teacher has its
+    own send loop that wakes at most `max_fps` times per second and pushes the
+    newest frame for every student that changed since its last send.
+
+    Teachers can narrow what they receive with `subscribe` (the students
+    visible on their dashboard). Students nobody is watching are told to
+    capture less often and at thumbnail size via `capture_settings`.
+
+    Frames, per-student sequence numbers, presence and subscriptions live in
+    the shared state store, so with MULTI_WORKER a teacher connected to one
+    worker sees students connected to another. Only the send loops and their
+    per-teacher cursors are local to the worker.
+    """
+
+    # Slowest rate a teacher can ask for; below it the dashboard looks frozen
+    MIN_FPS = 0.1
+    # Smallest display size a subscription can ask for
+    MIN_DISPLAY_SIZE = 16
+
+    def __init__(self, max_fps=2.0, emit=None, spawn_loops=True, state=None):
+        self.max_fps = max_fps
+        # Servers that run their own send loops (async_app) pass their emitter
+        self.emit = emit or (lambda event, data, to: socketio.emit(event, data, to=to))
+        self.spawn_loops = spawn_loops
+        self.state = state or shared_state
+        self.teachers = {}  # sid -> TeacherChannel (connected to this worker)
+        self.indices = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def publish(self, student_id, payload):
+        """Store the newest frame for a student, superseding any unsent one"""
+        seq = self.state.hincr('frame_seq', student_id)
+        self.state.hset('frames', student_id, {'seq': seq, 'payload': payload})
+
+    def add_student(self, student_id, sid):
+        """Remember a student's agent connection and send its capture settings"""
+        self.state.hset('presence', student_id, sid)
+        self.state.hdel('capture_settings', student_id)
+        self._update_capture_settings([student_id])
+
+    def remove_student(self, student_id):
+        """Forget the latest frame of a student that went offline"""
+        # frame_seq is kept so sequence numbers never go backwards for
+        # teachers on other workers that still hold a cursor for this student
+        self.state.hdel('frames', student_id)
+        self.state.hdel('presence', student_id)
+        self.state.hdel('capture_settings', student_id)
+        with self.lock:
+            for channel in self.teachers.values():
+                channel.sent_seq.pop(student_id, None)
+
+    def subscribe(self, sid, students, width=None, height=None):
+        """
+        Limit a teacher's screen_data to the students on its screen
+
+        Args:
+            sid: teacher socket id
+            students: list of student ids or {id, width, height} dicts,
+                      or None to receive every student again
+            width, height: default display size for plain ids
+
+        Returns:
+            dict of student_id -> (width, height), None for every student
+
+        Raises:
+            KeyError: sid is not a teacher registered on this worker
+            ValueError: students is neither None nor a list
+        """
+        width = self.display_size(width, Config.SCREENSHOT_MAX_WIDTH)
+        height = self.display_size(height, Config.SCREENSHOT_MAX_HEIGHT)
+
+        if students is None:
+            subscriptions = None
+        elif not isinstance(students, (list, tuple)):
+            raise ValueError('students must be a list of student ids or null')
+        else:
+            subscriptions = {}
+            for entry in students:
+                if isinstance(entry, dict):
+                    if entry.get('id') is None:
+                        continue
+                    subscriptions[str(entry['id'])] = (
+                        self.display_size(entry.get('width'), Config.SCREENSHOT_MAX_WIDTH, width),
+                        self.display_size(entry.get('height'), Config.SCREENSHOT_MAX_HEIGHT, height)
+                    )
+                elif isinstance(entry, (str, int)) and not isinstance(entry, bool):
+                    subscriptions[str(entry)] = (width, height)
+
+        with self.lock:
+            channel = self.teachers.get(sid)
+            if not channel:
+                raise KeyError(sid)
+            previous = channel.subscriptions
+            channel.subscriptions = subscriptions
+
+            # Newly visible students get their current frame on the next tick
+            if subscriptions is not None:
+                for student_id in subscriptions:
+                    if previous is not None and student_id not in previous:
+                        channel.sent_seq.pop(student_id, None)
+
+        self.state.hset('subscriptions', sid, subscriptions)
+        self._update_capture_settings(list(self.state.hgetall('presence').keys()))
+        return subscriptions
+
+    def display_size(self, requested, limit, default=None):
+        """
+        Display width or height for a client-supplied value
+
+        Args:
+            requested: the client's size (any type; missing or invalid
+                values get `default`)
+            limit: largest size frames are captured at
+            default: size for missing or invalid values (defaults to limit)
+
+        Returns:
+            int clamped to [MIN_DISPLAY_SIZE, limit]
+        """
+        default = limit if default is None else default
+        try:
+            size = float(requested) if requested is not None else default
+        except (TypeError, ValueError):
+            size = default
+        if size != size or size in (float('inf'), float('-inf')):  # NaN, inf
+            size = default
+        return int(min(max(size, self.MIN_DISPLAY_SIZE), limit))
+
+    def teacher_fps(self, requested):
+        """
+        Send rate for a teacher that asked for `requested` frames a second
+
+        Args:
+            requested: the client's max_fps (any type; missing or invalid
+                values get the server maximum)
+
+        Returns:
+            float clamped to [MIN_FPS, max_fps]
+        """
+        try:
+            fps = float(requested) if requested is not None else self.max_fps
+        except (TypeError, ValueError):
+            fps = self.max_fps
+        if fps != fps:  # NaN
+            fps = self.max_fps
+        return min(max(fps, self.MIN_FPS), self.max_fps)
+
+    def add_teacher(self, sid, max_fps=None):
+        """Register a teacher connection and start its send loop"""
+        with self.lock:
+            if sid in self.teachers:
+                return self.teachers[sid]
+            channel = TeacherChannel(sid, self.teacher_fps(max_fps), next(self.indices))
+            self.teachers[sid] = channel
+
+        self.state.hset('subscriptions', sid, None)
+        self._update_capture_settings(list(self.state.hgetall('presence').keys()))
+
+        if self.spawn_loops:
+            socketio.start_background_task(self._send_loop, channel)
+        return channel
+
+    def remove_teacher(self, sid):
+        """Stop the send loop of a disconnected teacher"""
+        with self.lock:
+            channel = self.teachers.pop(sid, None)
+        if channel:
+            channel.running = False
+            self.state.hdel('subscriptions', sid)
+            self._update_capture_settings(list(self.state.hgetall('presence').keys()))
+
+    def drain(self, sid):
+        """
+        Collect the frames a teacher hasn't seen yet
+
+        Returns:
+            list of screen_data payloads, newest frame per student
+        """
+        with self.lock:
+            channel = self.teachers.get(sid)
+        if not channel:
+            return []
+
+        seqs = self.state.hgetall('frame_seq')
+        with self.lock:
+            changed = [
+                student_id for student_id, seq in seqs.items()
+                if self._wants(channel, student_id) and channel.sent_seq.get(student_id, 0) < seq
+            ]
+        if not changed:
+            return []
+
+        frames = self.state.hmget('frames', changed)
+
+        pending = []
+        with self.lock:
+            for student_id, frame in zip(changed, frames):
+                if not frame:
+                    continue
+                last = channel.sent_seq.get(student_id)
+                if last is not None and frame['seq'] <= last:
+                    continue
+
+                # Frames published in between were superseded before we sent them
+                if last is not None:
+                    channel.frames_dropped += frame['seq'] - last - 1
+                channel.sent_seq[student_id] = frame['seq']
+                pending.append(frame['payload'])
+
+            channel.frames_sent += len(pending)
+            if pending:
+                channel.last_send_at = time.time()
+        return pending
+
+    def queue_depth(self, sid):
+        """Number of students with a frame waiting for this teacher"""
+        with self.lock:
+            channel = self.teachers.get(sid)
+        if not channel:
+            return 0
+
+        seqs = self.state.hgetall('frame_seq')
+        with self.lock:
+            return sum(
+                1 for student_id, seq in seqs.items()
+                if self._wants(channel, student_id) and channel.sent_seq.get(student_id, 0) < seq
+            )
+
+    @staticmethod
+    def _wants(channel, student_id):
+        """Whether a teacher is subscribed to a student's frames"""
+        return channel.subscriptions is None or student_id in channel.subscriptions
+
+    @staticmethod
+    def _demand(subscriptions, student_id):
+        """Largest display size any teacher wants for a student, or None"""
+        width = height = 0
+        for teacher_subscriptions in subscriptions.values():
+            if teacher_subscriptions is None:
+                return (Config.SCREENSHOT_MAX_WIDTH, Config.SCREENSHOT_MAX_HEIGHT)
+            size = teacher_subscriptions.get(student_id)
+            if size:
+                width, height = max(width, size[0]), max(height, size[1])
+        return (width, height) if width else None
+
+    def _update_capture_settings(self, student_ids):
+        """Tell agents to speed up or slow down when their viewers change"""
+        if not student_ids:
+            return
+
+        subscriptions = self.state.hgetall('subscriptions')
+        presence = self.state.hgetall('presence')
+        current = self.state.hgetall('capture_settings')
+
+        for student_id in student_ids:
+            sid = presence.get(student_id)
+            if not sid:
+                continue
+
+            demand = self._demand(subscriptions, student_id)
+            if demand:
+                settings = {
+                    'watched': True,
+                    'interval': Config.SCREENSHOT_INTERVAL,
+                    'max_width': min(demand[0], Config.SCREENSHOT_MAX_WIDTH),
+                    'max_height': min(demand[1], Config.SCREENSHOT_MAX_HEIGHT)
+                }
+            else:
+                settings = {
+                    'watched': False,
+                    'interval': Config.UNWATCHED_SCREENSHOT_INTERVAL,
+                    'max_width': Config.UNWATCHED_SCREENSHOT_MAX_WIDTH,
+                    'max_height': Config.UNWATCHED_SCREENSHOT_MAX_HEIGHT
+                }
+
+            if current.get(student_id) != settings:
+                self.state.hset('capture_settings', student_id, settings)
+                self.emit('capture_settings', settings, sid)
+
+    def _send_loop(self, channel):
+        """Push the newest frames to one teacher at most max_fps times a second"""
+        interval = 1.0 / channel.max_fps
+
+        while channel.running:
+            started = time.time()
+
+            for payload in self.drain(channel.sid):
+                with broadcast_seconds.time('screen_data'):
+                    self.emit('screen_data', payload, channel.sid)
+
+            elapsed = time.time() - started
+            socketio.sleep(max(0, interval - elapsed))
+
+    def stats(self):
+        """
+        Per-teacher queue depth and drop metrics
+
+        Teachers are keyed by their connection number on this worker, not
+        their socket id: any teacher can read these stats, and a sid is
+        enough to act as that connection.
+        """
+        with self.lock:
+            channels = list(self.teachers.values())
+
+        result = {'students': len(self.state.hgetall('presence')), 'teachers': {}}
+        for channel in channels:
+            result['teachers'][str(channel.index)] = {
+                'max_fps': channel.max_fps,
+                'subscribed': None if channel.subscriptions is None else len(channel.subscriptions),
+                'queue_depth': self.queue_depth(channel.sid),
+                'frames_sent': channel.frames_sent,
+                'frames_dropped': channel.frames_dropped,
+                'last_send_at': channel.last_send_at
+            }
+        return result
+
+
+# Global fan-out scheduler
+fanout = FrameFanout(max_fps=Config.SCREEN_FANOUT_MAX_FPS)
+
+telemetry.collect('gauge', 'fanout_queue_depth', 'Frames waiting to be sent, summed over teachers',
+                  lambda: sum(t['queue_depth'] for t in fanout.stats()['teachers'].values()))
+telemetry.collect('gauge', 'fanout_teachers', 'Teachers receiving screen frames', lambda: len(fanout.teachers))
+telemetry.collect('gauge', 'fanout_frames', 'Screen frames sent or replaced before sending, for connected teachers',
+                  lambda: {
+                      'sent': sum(t.frames_sent for t in list(fanout.teachers.values())),
+                      'dropped': sum(t.frames_dropped for t in list(fanout.teachers.values()))
+                  }, labels=('outcome',))
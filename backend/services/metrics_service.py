@@ -0,0 +1,267 @@
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from services.shared_state import shared_state
+
+
+class RollingWindow:
+    """
+    Fixed ring of time buckets with running totals.
+
+    Adding to the current bucket and expiring old buckets are O(1) per
+    event (at most one pass over the ring after a long silence).
+    """
+
+    FIELDS = 3  # active seconds, idle seconds, switches
+
+    def __init__(self, window, bucket):
+        self.bucket = bucket
+        self.size = max(1, int(window // bucket))
+        self.buckets = [[0.0] * self.FIELDS for _ in range(self.size)]
+        self.totals = [0.0] * self.FIELDS
+        self.head = None  # index (time // bucket) of the newest bucket
+
+    def advance(self, now):
+        """Expire buckets that fell out of the window"""
+        index = int(now // self.bucket)
+        if self.head is None:
+            self.head = index
+            return
+        steps = min(index - self.head, self.size)
+        for i in range(1, steps + 1):
+            expired = self.buckets[(self.head + i) % self.size]
+            for field in range(self.FIELDS):
+                self.totals[field] -= expired[field]
+                expired[field] = 0.0
+        if index > self.head:
+            self.head = index
+
+    def add(self, now, field, amount):
+        self.advance(now)
+        self.buckets[self.head % self.size][field] += amount
+        self.totals[field] += amount
+
+
+class StudentMetrics:
+    """Rolling activity of one student"""
+
+    def __init__(self, name, window, bucket):
+        self.name = name
+        self.activity = RollingWindow(window, bucket)
+        self.current_app = None
+        self.active_window = None
+        self.processes = []
+        self.last_update = None
+        self.last_hash = None
+        self.open_violations = OrderedDict()  # (type, detail) -> last seen, oldest first
+        self.published_at = None  # last time the row was shared with other workers
+
+
+class ClassroomMetrics:
+    """
+    Streaming per-student metrics for classroom insights.
+
+    Updated from every screen_update (time in the current app, idle time
+    when the frame didn't change, app switches) and process_update (open
+    violations: distinct detections still seen within the window). Each
+    event is O(1); `snapshot` returns every student's rolling totals under
+    one lock, in the shape analyze_classroom expects, without touching the
+    database.
+
+    Metrics are kept by the worker process the student is connected to.
+    Given a shared `state` (MULTI_WORKER), each worker also publishes its
+    students' rows there at most every `publish_interval` seconds, and
+    `snapshot`/`context` fill in the students connected to other workers
+    from it.
+    """
+
+    ACTIVE, IDLE, SWITCHES = range(3)
+    ROW_FIELDS = ('name', 'active_time', 'idle_time', 'switches', 'current_app', 'violations')
+
+    def __init__(self, window=600, bucket=10, max_gap=60, state=None, publish_interval=5):
+        self.window = window
+        self.bucket = bucket
+        self.max_gap = max_gap
+        self.state = state
+        self.publish_interval = publish_interval
+        self.students = {}  # user_id -> StudentMetrics
+        self.lock = threading.Lock()
+
+    def _student(self, user_id, name=None):
+        student = self.students.get(user_id)
+        if not student:
+            student = StudentMetrics(name, self.window, self.bucket)
+            self.students[user_id] = student
+        elif name:
+            student.name = name
+        return student
+
+    def add_student(self, user_id, name):
+        with self.lock:
+            student = self._student(user_id, name)
+            student.last_update = None  # the offline gap is not activity
+
+    def remove_student(self, user_id):
+        with self.lock:
+            self.students.pop(user_id, None)
+        if self.state:
+            self.state.hdel('classroom_metrics', user_id)
+
+    def record_screen(self, user_id, name, active_app, screenshot_hash=None, now=None, active_window=None):
+        """Account the time since the previous screen update"""
+        now = now or time.time()
+
+        with self.lock:
+            student = self._student(user_id, name)
+
+            if student.last_update is not None:
+                gap = now - student.last_update
+                if 0 < gap <= self.max_gap:
+                    idle = (
+                        screenshot_hash is not None
+                        and screenshot_hash == student.last_hash
+                        and active_app == student.current_app
+                    )
+                    student.activity.add(now, self.IDLE if idle else self.ACTIVE, gap)
+
+            if student.current_app is not None and active_app != student.current_app:
+                student.activity.add(now, self.SWITCHES, 1)
+
+            student.current_app = active_app
+            student.active_window = active_window
+            student.last_update = now
+            student.last_hash = screenshot_hash
+            row = self._due(student, now)
+
+        self._publish(user_id, row)
+
+    def record_violations(self, user_id, violations, now=None):
+        """
+        Mark violations as seen
+
+        Args:
+            violations: iterable of (violation_type, detail)
+        """
+        now = now or time.time()
+
+        with self.lock:
+            student = self.students.get(user_id)
+            if not student:
+                return
+            for key in violations:
+                student.open_violations[key] = now
+                student.open_violations.move_to_end(key)
+            self._expire_violations(student, now)
+            row = self._due(student, now)
+
+        self._publish(user_id, row)
+
+    def record_processes(self, user_id, processes):
+        """Keep the latest process list for the task pre-classifier"""
+        now = time.time()
+
+        with self.lock:
+            student = self.students.get(user_id)
+            if not student:
+                return
+            student.processes = list(processes)
+            # Process lists are rare and the pre-classifier needs them
+            row = self._due(student, now, force=True)
+
+        self._publish(user_id, row)
+
+    def context(self, user_id):
+        """
+        What the student was last seen doing
+
+        Returns:
+            dict with active_app, active_window and processes (empty if the
+            student is not connected)
+        """
+        with self.lock:
+            student = self.students.get(user_id)
+            if student:
+                return {
+                    'active_app': student.current_app,
+                    'active_window': student.active_window,
+                    'processes': list(student.processes)
+                }
+
+        row = self.state.hget('classroom_metrics', user_id) if self.state and user_id else None
+        if not row:
+            return {}
+        return {key: row[key] for key in ('active_app', 'active_window', 'processes')}
+
+    def _expire_violations(self, student, now):
+        cutoff = now - self.window
+        while student.open_violations:
+            key, seen = next(iter(student.open_violations.items()))
+            if seen >= cutoff:
+                break
+            student.open_violations.popitem(last=False)
+
+    def snapshot(self, now=None):
+        """
+        Consistent view of every student's rolling metrics
+
+        Returns:
+            dict user_id -> {name, active_time, idle_time (minutes),
+            switches, current_app, violations}
+        """
+        now = now or time.time()
+
+        with self.lock:
+            result = {user_id: self._row(student, now) for user_id, student in self.students.items()}
+
+        # Students connected to other workers, as they last published them
+        if self.state:
+            for user_id, row in self.state.hgetall('classroom_metrics').items():
+                if user_id not in result and now - row['published_at'] <= self.max_gap:
+                    result[user_id] = {key: row[key] for key in self.ROW_FIELDS}
+        return result
+
+    def _row(self, student, now):
+        """One student's snapshot row (caller holds lock)"""
+        student.activity.advance(now)
+        self._expire_violations(student, now)
+        totals = student.activity.totals
+        return {
+            'name': student.name,
+            'active_time': round(totals[self.ACTIVE] / 60, 1),
+            'idle_time': round(totals[self.IDLE] / 60, 1),
+            'switches': int(totals[self.SWITCHES]),
+            'current_app': student.current_app or 'Unknown',
+            'violations': len(student.open_violations)
+        }
+
+    def _due(self, student, now, force=False):
+        """
+        The row to share with other workers, if it is time to (caller holds lock)
+
+        Returns:
+            snapshot row plus the pre-classifier context, or None
+        """
+        if not self.state:
+            return None
+        if not force and student.published_at is not None and now - student.published_at < self.publish_interval:
+            return None
+        student.published_at = now
+        return {
+            **self._row(student, now),
+            'active_app': student.current_app,
+            'active_window': student.active_window,
+            'processes': list(student.processes),
+            'published_at': now
+        }
+
+    def _publish(self, user_id, row):
+        if row:
+            self.state.hset('classroom_metrics', user_id, row)
+
+
+# Global classroom metrics
+classroom_metrics = ClassroomMetrics(
+    window=Config.CLASSROOM_METRICS_WINDOW,
+    state=shared_state if Config.MULTI_WORKER else None
+)
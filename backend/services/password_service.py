@@ -0,0 +1,109 @@
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+from config import Config
+from services.telemetry import telemetry
+
+# Stored for accounts that have no password (auto-registered agents). It can
+# never be produced by bcrypt, so no password will ever match it.
+UNUSABLE_PASSWORD_PREFIX = '!'
+
+
+def make_unusable_password_hash():
+    """Random placeholder hash that no password matches"""
+    return UNUSABLE_PASSWORD_PREFIX + secrets.token_hex(16)
+
+
+def is_usable_password_hash(password_hash):
+    return bool(password_hash) and not password_hash.startswith(UNUSABLE_PASSWORD_PREFIX)
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing pool has no room for another request"""
+
+
+class PasswordHasher:
+    """
+    Bounded worker pool for bcrypt.
+
+    bcrypt releases the GIL while it works, so hashing in a few worker
+    threads keeps socket and HTTP threads responsive. At most `max_pending`
+    requests may be queued or running; beyond that callers get
+    PasswordHasherBusy immediately instead of piling up behind a burst.
+    """
+
+    def __init__(self, rounds=12, workers=2, max_pending=32):
+        self.rounds = rounds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.max_pending = max_pending
+
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+
+    def _submit(self, fn, *args):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            raise PasswordHasherBusy("Password hashing queue is full")
+
+        with self.lock:
+            self.pending += 1
+        future = self.executor.submit(fn, *args)
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        with self.lock:
+            self.pending -= 1
+        self.slots.release()
+
+    def _hash(self, password):
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    @staticmethod
+    def _check(password_hash, password):
+        if not is_usable_password_hash(password_hash):
+            return False
+        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def hash_async(self, password):
+        """Future resolving to the bcrypt hash of `password`"""
+        return self._submit(self._hash, password)
+
+    def check_async(self, password_hash, password):
+        """Future resolving to whether `password` matches `password_hash`"""
+        if not is_usable_password_hash(password_hash):
+            raise ValueError("Account has no usable password")
+        return self._submit(self._check, password_hash, password)
+
+    def hash(self, password, timeout=None):
+        """Hash in the pool and wait for the result"""
+        return self.hash_async(password).result(timeout)
+
+    def check(self, password_hash, password, timeout=None):
+        """Verify in the pool and wait for the result"""
+        if not is_usable_password_hash(password_hash):
+            return False
+        return self.check_async(password_hash, password).result(timeout)
+
+    def stats(self):
+        with self.lock:
+            return {
+                'pending': self.pending,
+                'max_pending': self.max_pending,
+                'rejected': self.rejected
+            }
+
+
+# Global hashing pool
+password_hasher = PasswordHasher(
+    rounds=Config.BCRYPT_LOG_ROUNDS,
+    workers=Config.PASSWORD_HASH_WORKERS,
+    max_pending=Config.PASSWORD_HASH_QUEUE_SIZE
+)
+
+telemetry.collect('gauge', 'password_hash_pending', 'bcrypt jobs queued or running',
+                  lambda: password_hasher.stats()['pending'])
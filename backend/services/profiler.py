@@ -0,0 +1,232 @@
+import cProfile
+import functools
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from config import Config
+
+
+class ProfilerBusy(Exception):
+    """A sampling session is already running"""
+
+
+# Innermost Python frames of threads blocked in C (lock/condition waits,
+# executor workers waiting for jobs, Socket.IO sleeps, socket reads)
+IDLE_FRAMES = {
+    'wait (threading)', '_wait_for_tstate_lock (threading)', '_worker (thread)', 'get (queue)',
+    'sleep (server)', 'select (selectors)', 'accept (socket)', 'readinto (socket)'
+}
+
+
+def _frame_label(code):
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{code.co_name} ({module})"
+
+
+class SamplingProfiler:
+    """
+    Time-boxed stack sampler across all threads.
+
+    Every `interval` seconds a background thread reads every other
+    thread's current frame (sys._current_frames) and counts the stack, so
+    the cost is one stack walk per thread per sample and nothing is hooked
+    into the running code. The result is in the collapsed format
+    flamegraph.pl and speedscope read: one `thread;outer;...;inner count`
+    line per distinct stack, rooted at the thread name.
+
+    One session runs at a time; sessions are capped at `max_seconds`.
+    """
+
+    def __init__(self, max_seconds=60, min_interval=0.001):
+        self.max_seconds = max_seconds
+        self.min_interval = min_interval
+        self.lock = threading.Lock()
+        self.running = False
+
+        # Metrics
+        self.sessions = 0
+        self.last = None
+
+    def profile(self, seconds=10, interval=0.01, idle=False):
+        """
+        Sample for `seconds` and return the collapsed stacks
+
+        Args:
+            seconds: how long to sample (capped at max_seconds)
+            interval: seconds between samples
+            idle: keep stacks of threads parked in IDLE_FRAMES (by
+                  default only threads doing something are counted)
+
+        Returns:
+            (collapsed stacks text, report dict)
+
+        Raises:
+            ProfilerBusy: another session is running
+        """
+        seconds = min(max(seconds, 0.1), self.max_seconds)
+        interval = max(interval, self.min_interval)
+
+        with self.lock:
+            if self.running:
+                raise ProfilerBusy()
+            self.running = True
+
+        stacks = Counter()
+        samples = 0
+        sampling_time = 0.0
+        me = threading.get_ident()
+        started = time.perf_counter()
+        try:
+            deadline = started + seconds
+            while time.perf_counter() < deadline:
+                tick = time.perf_counter()
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame.f_code))
+                        frame = frame.f_back
+                    if not idle and stack and self._is_idle(stack[0]):
+                        continue
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    stacks[';'.join(reversed(stack))] += 1
+                samples += 1
+                sampling_time += time.perf_counter() - tick
+                time.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+        finally:
+            with self.lock:
+                self.running = False
+
+        elapsed = time.perf_counter() - started
+        report = {
+            'seconds': round(elapsed, 3),
+            'interval': interval,
+            'samples': samples,
+            'stacks': len(stacks),
+            'overhead': round(sampling_time / elapsed, 4) if elapsed else 0
+        }
+        with self.lock:
+            self.sessions += 1
+            self.last = report
+
+        collapsed = '\n'.join(f"{stack} {count}" for stack, count in stacks.most_common())
+        return collapsed + '\n', report
+
+    @staticmethod
+    def _is_idle(leaf):
+        """Innermost Python frame of a thread parked in a well-known wait"""
+        return leaf in IDLE_FRAMES
+
+    def stats(self):
+        with self.lock:
+            return {'running': self.running, 'sessions': self.sessions, 'last': self.last}
+
+
+class EventProfiler:
+    """
+    Deterministic cProfile capture for chosen Socket.IO events.
+
+    Handlers are wrapped with @profiled('event'); while an event is not
+    armed the wrapper is one dict lookup. arm('screen_update', 50) runs the
+    next 50 invocations under cProfile (each on its own Profile, so
+    concurrent handler threads do not interfere) and merges them into one
+    report, which stays available until the event is armed again.
+    """
+
+    def __init__(self, max_calls=1000):
+        self.max_calls = max_calls
+        self.armed = {}  # event -> invocations left to profile
+        self.captures = {}  # event -> {calls, stats, armed_at, finished_at}
+        self.lock = threading.Lock()
+
+    def arm(self, event, calls=20):
+        """Profile the next `calls` invocations of `event`"""
+        calls = min(max(int(calls), 1), self.max_calls)
+        with self.lock:
+            self.armed[event] = calls
+            self.captures[event] = {'calls': 0, 'stats': None, 'armed_at': time.time(), 'finished_at': None}
+        return calls
+
+    def disarm(self, event):
+        with self.lock:
+            return self.armed.pop(event, None) is not None
+
+    def _take(self, event):
+        """Claim one profiled invocation, or False when the event is not armed"""
+        with self.lock:
+            left = self.armed.get(event)
+            if not left:
+                return False
+            if left == 1:
+                del self.armed[event]
+            else:
+                self.armed[event] = left - 1
+            return True
+
+    def _record(self, event, profile):
+        with self.lock:
+            capture = self.captures.get(event)
+            if capture is None:
+                return
+            if capture['stats'] is None:
+                capture['stats'] = pstats.Stats(profile)
+            else:
+                capture['stats'].add(profile)
+            capture['calls'] += 1
+            if event not in self.armed:
+                capture['finished_at'] = time.time()
+
+    def profiled(self, event):
+        """Decorator: profile `event`'s handler while the event is armed"""
+        def decorator(f):
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                if not self.armed or not self._take(event):
+                    return f(*args, **kwargs)
+                profile = cProfile.Profile()
+                try:
+                    return profile.runcall(f, *args, **kwargs)
+                finally:
+                    self._record(event, profile)
+            return wrapper
+        return decorator
+
+    def report(self, event, sort='cumulative', limit=40):
+        """
+        Captured profile of an event
+
+        Returns:
+            dict with calls, remaining, armed_at, finished_at and the
+            pstats table as text, or None if the event was never armed
+        """
+        with self.lock:
+            capture = self.captures.get(event)
+            if capture is None:
+                return None
+            remaining = self.armed.get(event, 0)
+            table = ''
+            if capture['stats'] is not None:
+                out = io.StringIO()
+                capture['stats'].stream = out
+                capture['stats'].sort_stats(sort).print_stats(limit)
+                table = out.getvalue()
+            return {
+                'event': event,
+                'calls': capture['calls'],
+                'remaining': remaining,
+                'armed_at': capture['armed_at'],
+                'finished_at': capture['finished_at'],
+                'profile': table
+            }
+
+
+# Global profilers behind the admin profiling routes
+sampling_profiler = SamplingProfiler(max_seconds=Config.PROFILER_MAX_SECONDS)
+event_profiler = EventProfiler()
+profiled = event_profiler.profiled
@@ -0,0 +1,308 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from config import Config
+from extensions import db
+from models.activity import Activity
+from models.activity_rollup import ActivityRollup
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+RESOLUTIONS = (ActivityRollup.MINUTE, ActivityRollup.HOUR)
+EPOCH = datetime(1970, 1, 1)  # timestamps are naive UTC, like Activity.timestamp
+
+
+def bucket_start(timestamp, resolution):
+    """Start of the minute/hour bucket containing `timestamp`"""
+    seconds = int((timestamp - EPOCH).total_seconds())
+    return EPOCH + timedelta(seconds=seconds - seconds % resolution)
+
+
+def _new_counters():
+    return [0.0, 0.0, 0, 0]  # seconds, idle_seconds, switches, samples
+
+
+class ActivityRollups:
+    """
+    Incremental per-minute and per-hour usage rollups.
+
+    Every screen update is turned into time spent in the student's previous
+    app (the gap since the last update, split at bucket boundaries) plus a
+    switch count when the app changed. A gap where the frame hash didn't
+    change counts as idle. Gaps longer than `max_gap` are treated as the
+    agent being offline and not counted.
+
+    `record` only touches an in-memory table; a background thread adds the
+    accumulated deltas to the activity_rollups table every `flush_interval`
+    seconds. Deltas are added to the stored values, so several workers can
+    flush into the same buckets.
+
+    The same thread applies the retention policy: raw activities older than
+    `raw_retention_days` and minute buckets older than
+    `minute_retention_days` are deleted in batches of `batch_size` rows, one
+    short transaction per batch. Hour buckets keep the downsampled history.
+    """
+
+    def __init__(self, flush_interval=10, max_gap=60, raw_retention_days=14,
+                 minute_retention_days=30, batch_size=1000, retention_interval=3600):
+        self.flush_interval = flush_interval
+        self.max_gap = max_gap
+        self.raw_retention_days = raw_retention_days
+        self.minute_retention_days = minute_retention_days
+        self.batch_size = batch_size
+        self.retention_interval = retention_interval
+
+        self.lock = threading.Lock()
+        self.cursors = {}  # user_id -> (timestamp, active_app, screenshot_hash)
+        self.pending = defaultdict(_new_counters)  # (user_id, resolution, bucket, app) -> counters
+        self.app = None
+        self.thread = None
+
+        # Metrics
+        self.flushes = 0
+        self.rows_flushed = 0
+        self.rows_pruned = 0
+        self.last_prune_at = 0
+
+    def start(self, app):
+        """Start the flush/retention thread for a Flask app (idempotent)"""
+        with self.lock:
+            if self.thread:
+                return
+            self.app = app
+            self.thread = threading.Thread(target=self._run, name='activity-rollups', daemon=True)
+        self.thread.start()
+
+    def record(self, user_id, active_app, screenshot_hash=None, timestamp=None):
+        """Account one screen update"""
+        timestamp = timestamp or datetime.utcnow()
+        active_app = (active_app or '')[:200]
+
+        with self.lock:
+            previous = self.cursors.get(user_id)
+            self.cursors[user_id] = (timestamp, active_app, screenshot_hash)
+
+            if previous:
+                prev_time, prev_app, prev_hash = previous
+                gap = (timestamp - prev_time).total_seconds()
+                if 0 < gap <= self.max_gap:
+                    idle = screenshot_hash is not None and screenshot_hash == prev_hash and active_app == prev_app
+                    self._add_span(user_id, prev_app, prev_time, timestamp, idle)
+
+            for resolution in RESOLUTIONS:
+                counters = self.pending[(user_id, resolution, bucket_start(timestamp, resolution), active_app)]
+                counters[3] += 1
+                if previous and previous[1] != active_app:
+                    counters[2] += 1
+
+    def forget(self, user_id, discard=False):
+        """
+        Student went offline; the next update starts a new span
+
+        Args:
+            discard: also drop the student's unflushed counters (account deleted)
+        """
+        with self.lock:
+            self.cursors.pop(user_id, None)
+            if discard:
+                for key in [key for key in self.pending if key[0] == user_id]:
+                    del self.pending[key]
+
+    def _add_span(self, user_id, active_app, start, end, idle):
+        """Add [start, end) to every bucket it overlaps (caller holds the lock)"""
+        for resolution in RESOLUTIONS:
+            cursor = start
+            while cursor < end:
+                bucket = bucket_start(cursor, resolution)
+                bucket_end = bucket + timedelta(seconds=resolution)
+                seconds = (min(end, bucket_end) - cursor).total_seconds()
+
+                counters = self.pending[(user_id, resolution, bucket, active_app)]
+                counters[0] += seconds
+                if idle:
+                    counters[1] += seconds
+                cursor = bucket_end
+
+    def flush(self):
+        """Add pending deltas to activity_rollups; call inside an app context"""
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(_new_counters)
+        if not pending:
+            return 0
+
+        rows = [
+            {
+                'user_id': user_id,
+                'resolution': resolution,
+                'bucket_start': bucket,
+                'active_app': active_app,
+                'seconds': counters[0],
+                'idle_seconds': counters[1],
+                'switches': counters[2],
+                'samples': counters[3]
+            }
+            for (user_id, resolution, bucket, active_app), counters in pending.items()
+        ]
+
+        try:
+            self._upsert(rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.warning(f"⚠️ Rollup flush failed, will retry: {e}")
+            # Put the deltas back so the next flush adds them
+            with self.lock:
+                for key, counters in pending.items():
+                    merged = self.pending[key]
+                    for i, value in enumerate(counters):
+                        merged[i] += value
+            return 0
+
+        self.flushes += 1
+        self.rows_flushed += len(rows)
+        return len(rows)
+
+    def _upsert(self, rows):
+        """INSERT ... ON CONFLICT DO UPDATE adding to the stored counters"""
+        dialect = db.engine.dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert
+            else:
+                from sqlalchemy.dialects.postgresql import insert
+
+            table = ActivityRollup.__table__
+            # Chunked to stay under SQLite's bound-parameter limit
+            for i in range(0, len(rows), 100):
+                stmt = insert(table).values(rows[i:i + 100])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['user_id', 'resolution', 'bucket_start', 'active_app'],
+                    set_={
+                        field: table.c[field] + stmt.excluded[field]
+                        for field in ('seconds', 'idle_seconds', 'switches', 'samples')
+                    }
+                )
+                db.session.execute(stmt)
+            return
+
+        # Other databases: read-modify-write
+        for row in rows:
+            rollup = ActivityRollup.query.filter_by(
+                user_id=row['user_id'],
+                resolution=row['resolution'],
+                bucket_start=row['bucket_start'],
+                active_app=row['active_app']
+            ).first()
+            if not rollup:
+                db.session.add(ActivityRollup(**row))
+                continue
+            for field in ('seconds', 'idle_seconds', 'switches', 'samples'):
+                setattr(rollup, field, (getattr(rollup, field) or 0) + row[field])
+
+    def prune(self, now=None):
+        """
+        Apply the retention policy in bounded batches
+
+        Returns:
+            number of rows deleted
+        """
+        now = now or datetime.utcnow()
+        deleted = self._delete_batches(
+            Activity, Activity.timestamp < now - timedelta(days=self.raw_retention_days)
+        )
+        deleted += self._delete_batches(
+            ActivityRollup,
+            (ActivityRollup.resolution == ActivityRollup.MINUTE)
+            & (ActivityRollup.bucket_start < now - timedelta(days=self.minute_retention_days))
+        )
+        self.rows_pruned += deleted
+        self.last_prune_at = time.time()
+        return deleted
+
+    def _delete_batches(self, model, condition):
+        """Delete matching rows by primary key, one short transaction per batch"""
+        deleted = 0
+        while True:
+            ids = [row[0] for row in db.session.query(model.id).filter(condition).limit(self.batch_size).all()]
+            if not ids:
+                return deleted
+            model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            deleted += len(ids)
+            # Let ingest transactions in between batches
+            time.sleep(0.05)
+
+    def usage(self, user_id, since, until=None, resolution=ActivityRollup.HOUR):
+        """
+        Time per app for one student
+
+        Returns:
+            dict with per-app totals and the individual buckets
+        """
+        filters = [
+            ActivityRollup.user_id == user_id,
+            ActivityRollup.resolution == resolution,
+            ActivityRollup.bucket_start >= bucket_start(since, resolution)
+        ]
+        if until:
+            filters.append(ActivityRollup.bucket_start < until)
+
+        totals = db.session.query(
+            ActivityRollup.active_app,
+            func.sum(ActivityRollup.seconds),
+            func.sum(ActivityRollup.idle_seconds),
+            func.sum(ActivityRollup.switches)
+        ).filter(*filters).group_by(ActivityRollup.active_app).all()
+        buckets = ActivityRollup.query.filter(*filters).order_by(ActivityRollup.bucket_start).all()
+
+        return {
+            'user_id': user_id,
+            'resolution': resolution,
+            'apps': sorted(
+                (
+                    {'active_app': app, 'seconds': round(seconds or 0, 1),
+                     'idle_seconds': round(idle or 0, 1), 'switches': switches or 0}
+                    for app, seconds, idle, switches in totals
+                ),
+                key=lambda entry: entry['seconds'],
+                reverse=True
+            ),
+            'buckets': [r.to_dict() for r in buckets]
+        }
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            with self.app.app_context():
+                try:
+                    self.flush()
+                    if time.time() - self.last_prune_at >= self.retention_interval:
+                        self.prune()
+                except Exception as e:
+                    db.session.rollback()
+                    logger.error(f"⚠️ Rollup maintenance error: {e}")
+                finally:
+                    db.session.remove()
+
+    def stats(self):
+        with self.lock:
+            pending = len(self.pending)
+        return {
+            'pending_buckets': pending,
+            'flushes': self.flushes,
+            'rows_flushed': self.rows_flushed,
+            'rows_pruned': self.rows_pruned
+        }
+
+
+# Global rollup aggregator
+rollups = ActivityRollups(
+    flush_interval=Config.ROLLUP_FLUSH_INTERVAL,
+    max_gap=Config.ROLLUP_MAX_GAP,
+    raw_retention_days=Config.ACTIVITY_RETENTION_DAYS,
+    minute_retention_days=Config.ROLLUP_MINUTE_RETENTION_DAYS,
+    batch_size=Config.RETENTION_BATCH_SIZE
+)
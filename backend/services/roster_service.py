@@ -0,0 +1,133 @@
+import secrets
+from extensions import socketio
+from services.shared_state import shared_state
+
+
+class Roster:
+    """
+    Versioned student roster for teacher dashboards.
+
+    The roster is loaded from the database once and then kept current by the
+    socket handlers. Every change bumps a version number and is appended to a
+    bounded delta log:
+
+        join    a student came online (carries the full student record)
+        leave   a student went offline
+        status  other per-student fields changed (e.g. screen locked)
+
+    Teachers get one snapshot on connect and `roster_delta` events after
+    that. A reconnecting teacher sends the epoch and version it last saw and
+    only receives the deltas it missed, or a fresh snapshot when those are no
+    longer in the log or the roster was reloaded (new epoch).
+
+    Records, version and log live in the shared state store so every worker
+    sees the same roster with MULTI_WORKER.
+    """
+
+    def __init__(self, max_log=500, emit=None, state=None):
+        self.max_log = max_log
+        # Servers with their own Socket.IO instance (async_app) pass their emitter
+        self.emit = emit or (lambda event, data, to: socketio.emit(event, data, to=to))
+        self.state = state or shared_state
+
+    def loaded(self):
+        return self.state.hget('roster_meta', 'epoch') is not None
+
+    def load(self, students):
+        """
+        Seed the roster from the database
+
+        Args:
+            students: list of User.to_dict() records
+        """
+        for student in students:
+            self.state.hset('roster', str(student['id']), student)
+        self.state.hset('roster_meta', 'epoch', secrets.token_hex(4))
+
+    def version(self):
+        return self.state.hget('roster_meta', 'version', 0)
+
+    def _record(self, delta):
+        """Assign the next version to a delta, log it and push it to teachers"""
+        version = self.state.hincr('roster_meta', 'version')
+        delta['version'] = version
+        delta['epoch'] = self.state.hget('roster_meta', 'epoch')
+
+        self.state.hset('roster_log', str(version), delta)
+        if version > self.max_log:
+            self.state.hdel('roster_log', str(version - self.max_log))
+
+        self.emit('roster_delta', delta, 'teachers')
+        return delta
+
+    def join(self, student):
+        """Student connected (new or returning)"""
+        self.state.hset('roster', str(student['id']), student)
+        return self._record({'op': 'join', 'student': student})
+
+    def leave(self, user_id, last_seen=None):
+        """Student disconnected"""
+        student = self.state.hget('roster', str(user_id))
+        if student:
+            student.update({'status': 'offline', 'last_seen': last_seen})
+            student.pop('locked', None)
+            self.state.hset('roster', str(user_id), student)
+        return self._record({'op': 'leave', 'id': user_id, 'last_seen': last_seen})
+
+    def remove(self, user_id):
+        """Student account deleted: sent as a leave, left out of later snapshots"""
+        self.state.hdel('roster', str(user_id))
+        return self._record({'op': 'leave', 'id': user_id, 'last_seen': None})
+
+    def update(self, user_id, **changes):
+        """Other status fields of a student changed"""
+        student = self.state.hget('roster', str(user_id))
+        if not student:
+            return None
+        if all(student.get(field) == value for field, value in changes.items()):
+            return None
+        student.update(changes)
+        self.state.hset('roster', str(user_id), student)
+        return self._record({'op': 'status', 'id': student['id'], 'changes': changes})
+
+    def online_ids(self):
+        return [student['id'] for student in self.state.hgetall('roster').values() if student.get('status') == 'online']
+
+    def snapshot(self):
+        """Full roster with the version it is current as of"""
+        # Version is read first: any change racing with the read has a higher
+        # version, so clients re-apply it (deltas are idempotent)
+        version = self.version()
+        return {
+            'epoch': self.state.hget('roster_meta', 'epoch'),
+            'version': version,
+            'students': list(self.state.hgetall('roster').values())
+        }
+
+    def since(self, epoch, version):
+        """
+        Deltas a client at (epoch, version) has missed
+
+        Returns:
+            {'epoch', 'version', 'deltas'} or None if a snapshot is needed
+        """
+        try:
+            version = int(version)
+        except (TypeError, ValueError):
+            return None
+
+        current = self.version()
+        if epoch is None or epoch != self.state.hget('roster_meta', 'epoch'):
+            return None
+        if version > current or current - version > self.max_log:
+            return None
+
+        versions = [str(v) for v in range(version + 1, current + 1)]
+        deltas = self.state.hmget('roster_log', versions)
+        if any(delta is None for delta in deltas):
+            return None
+        return {'epoch': epoch, 'version': current, 'deltas': deltas}
+
+
+# Global roster
+roster = Roster()
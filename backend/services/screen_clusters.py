@@ -0,0 +1,132 @@
+import base64
+import io
+import threading
+from PIL import Image, ImageChops
+from config import Config
+from utils.phash import BKTree, dhash
+
+
+class ScreenClusterer:
+    """
+    Groups students whose screens are the same, so a whole-class code check
+    analyzes one representative per group and copies its result to the
+    others.
+
+    Candidates come from a BK-tree over each screen's perceptual hash
+    (within `radius` bits). A perceptual hash alone cannot see a one
+    character code edit, so every candidate is then compared with the
+    group's representative in `block` x `block` pixel blocks at full
+    resolution: one block whose mean differs by more than `max_block_diff`
+    gray levels (a changed character, even a 0 that became a 6) keeps them
+    apart, while JPEG re-encoding noise (about 10 levels) does not. Screens are only compared inside the active
+    window when both report the same window, since that crop is all the
+    model sees. Only the `max_candidates` nearest groups are compared
+    (identical screens are at distance 0, so they come first); screens
+    matching none of them are checked on their own.
+    """
+
+    def __init__(self, radius=6, max_block_diff=24, block=4, max_candidates=3):
+        self.radius = radius
+        self.max_candidates = max_candidates
+        self.max_block_diff = max_block_diff
+        self.block = block
+        self.lock = threading.Lock()
+
+        # Metrics
+        self.batches = 0
+        self.screens = 0
+        self.clusters = 0
+        self.outliers = 0
+        self.rejected = 0  # hash neighbors that failed the pixel comparison
+
+    def _grayscale(self, screenshot, window_rect):
+        img = Image.open(io.BytesIO(base64.b64decode(screenshot))).convert('L')
+        if window_rect:
+            x, y, width, height = window_rect
+            img = img.crop((
+                int(x * img.width), int(y * img.height),
+                int((x + width) * img.width), int((y + height) * img.height)
+            ))
+        return img
+
+    def _same_screen(self, a, b):
+        if a.size != b.size:
+            return False
+        diff = ImageChops.difference(a, b)
+        blocks = diff.resize(
+            (max(1, diff.width // self.block), max(1, diff.height // self.block)),
+            Image.Resampling.BOX
+        )
+        return blocks.getextrema()[1] <= self.max_block_diff
+
+    @staticmethod
+    def _window_key(student):
+        rect = student.get('window_rect')
+        try:
+            return tuple(round(float(v), 3) for v in rect) if rect else None
+        except (TypeError, ValueError):
+            return None
+
+    def cluster(self, students):
+        """
+        Split students into groups of matching screens
+
+        Args:
+            students: list of dicts with {id, name, screenshot, window_rect (optional)}
+
+        Returns:
+            list of groups (lists of students); the first student in each
+            group is its representative
+        """
+        groups = []
+        trees = {}  # window key -> BKTree of representative hashes -> group index
+        images = []  # per group: the representative's grayscale screen
+
+        for student in students:
+            window = self._window_key(student)
+            try:
+                image = self._grayscale(student['screenshot'], window)
+                hash_value = dhash(image)
+            except Exception:
+                # Unreadable screenshot: let the model (or its fallback) deal with it
+                groups.append([student])
+                images.append(None)
+                continue
+
+            tree = trees.setdefault(window, BKTree())
+            for _, index in tree.search(hash_value, self.radius)[:self.max_candidates]:
+                if self._same_screen(images[index], image):
+                    groups[index].append(student)
+                    break
+                with self.lock:
+                    self.rejected += 1
+            else:
+                tree.add(hash_value, len(groups))
+                groups.append([student])
+                images.append(image)
+
+        with self.lock:
+            self.batches += 1
+            self.screens += len(students)
+            self.clusters += sum(1 for group in groups if len(group) > 1)
+            self.outliers += sum(1 for group in groups if len(group) == 1)
+        return groups
+
+    def stats(self):
+        with self.lock:
+            return {
+                'batches': self.batches,
+                'screens': self.screens,
+                'clusters': self.clusters,
+                'outliers': self.outliers,
+                'rejected': self.rejected,
+                # One model check per group instead of per screen
+                'checks_saved': self.screens - self.clusters - self.outliers
+            }
+
+
+# Global screen clustering for whole-class code checks
+screen_clusterer = ScreenClusterer(
+    radius=Config.AI_CLUSTER_RADIUS,
+    max_block_diff=Config.AI_CLUSTER_MAX_BLOCK_DIFF
+)
@@ -0,0 +1,215 @@
+import base64
+import io
+import math
+import threading
+from collections import defaultdict
+from PIL import Image, ImageChops, ImageFilter
+from config import Config
+
+# Gemini bills an image as 258 tokens per 768x768 tile; images no larger
+# than 384x384 are a single tile
+TOKENS_PER_TILE = 258
+TILE_SIZE = 768
+SMALL_IMAGE = 384
+
+
+def estimate_image_tokens(width, height):
+    """Approximate prompt tokens for an image of the given size"""
+    if width <= SMALL_IMAGE and height <= SMALL_IMAGE:
+        return TOKENS_PER_TILE
+    return math.ceil(width / TILE_SIZE) * math.ceil(height / TILE_SIZE) * TOKENS_PER_TILE
+
+
+def _valid_rect(rect):
+    """[x, y, width, height] fractions from the agent, or None if unusable"""
+    try:
+        x, y, width, height = (float(v) for v in rect)
+    except (TypeError, ValueError):
+        return None
+    if not (0 <= x < 1 and 0 <= y < 1 and 0 < width <= 1 and 0 < height <= 1):
+        return None
+    return x, y, min(width, 1 - x), min(height, 1 - y)
+
+
+class ScreenPrep:
+    """
+    Shrinks screenshots before they are sent to the vision model.
+
+    Steps, applied in order (each can be left out of `steps`):
+
+        crop       keep only the active window (rect reported by the agent)
+        trim       cut uniform borders around the content
+        grayscale  drop color
+        fit        downscale until the image fits `token_budget`, or by up
+                   to `min_scale` when that saves a whole tile
+        sharpen    unsharp mask so downscaled text stays legible (only
+                   after fit resized the image)
+
+    Every run re-encodes the image after each step, so the byte and token
+    savings of each transformation are counted separately (see stats()).
+    """
+
+    STEPS = ('crop', 'trim', 'grayscale', 'fit', 'sharpen')
+
+    def __init__(self, steps=STEPS, token_budget=516, quality=60, min_scale=0.9, min_crop=0.05, trim_threshold=12):
+        self.steps = [step for step in self.STEPS if step in steps]
+        self.token_budget = token_budget
+        self.quality = quality
+        self.min_scale = min_scale
+        self.min_crop = min_crop  # ignore window rects smaller than this share of the screen
+        self.trim_threshold = trim_threshold  # per-channel difference from the border color
+        self.lock = threading.Lock()
+
+        # Metrics
+        self.images = 0
+        self.totals = {'bytes_in': 0, 'bytes_out': 0, 'tokens_in': 0, 'tokens_out': 0}
+        self.savings = defaultdict(lambda: {'applied': 0, 'bytes_saved': 0, 'tokens_saved': 0})
+
+    def signature(self):
+        """Settings that change the output, for cache keys"""
+        return f"{','.join(self.steps)}:{self.token_budget}:{self.quality}:{self.min_scale}"
+
+    def process(self, image_data, window_rect=None, steps=None):
+        """
+        Run the pipeline on one screenshot
+
+        Args:
+            image_data: base64 encoded image
+            window_rect: [x, y, width, height] of the active window as
+                         fractions of the screen, if the agent reported it
+            steps: subset of self.steps to apply (default all)
+
+        Returns:
+            (base64 JPEG, report) where report lists width, height, bytes and
+            estimated tokens after each applied step
+        """
+        raw = base64.b64decode(image_data)
+        img = Image.open(io.BytesIO(raw))
+        if img.mode not in ('RGB', 'L'):
+            img = img.convert('RGB')
+
+        report = [{'step': 'input', 'width': img.width, 'height': img.height,
+                   'bytes': len(raw), 'tokens': estimate_image_tokens(img.width, img.height)}]
+        encoded = raw
+        applied = set()
+
+        for step in self.steps:
+            if steps is not None and step not in steps:
+                continue
+            if step == 'sharpen' and 'fit' not in applied:
+                continue
+            result = getattr(self, f"_{step}")(img, window_rect)
+            if result is None:
+                continue
+            img = result
+            applied.add(step)
+            encoded = self._encode(img)
+            report.append({'step': step, 'width': img.width, 'height': img.height,
+                           'bytes': len(encoded), 'tokens': estimate_image_tokens(img.width, img.height)})
+
+        if len(report) == 1:
+            # Nothing applied; still re-encode so the output is a JPEG
+            encoded = self._encode(img)
+            report.append({'step': 'encode', 'width': img.width, 'height': img.height,
+                           'bytes': len(encoded), 'tokens': report[0]['tokens']})
+
+        self._record(report)
+        return base64.b64encode(encoded).decode('utf-8'), report
+
+    def _encode(self, img):
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=self.quality)
+        return buffer.getvalue()
+
+    def _crop(self, img, window_rect):
+        rect = _valid_rect(window_rect) if window_rect else None
+        if not rect:
+            return None
+        x, y, width, height = rect
+        if width * height < self.min_crop or width * height > 0.98:
+            return None
+        box = (
+            int(x * img.width), int(y * img.height),
+            math.ceil((x + width) * img.width), math.ceil((y + height) * img.height)
+        )
+        return img.crop(box)
+
+    def _trim(self, img, window_rect):
+        # Border color from the top-left pixel; anything close to it is background
+        background = Image.new(img.mode, img.size, img.getpixel((0, 0)))
+        diff = ImageChops.difference(img, background)
+        if diff.mode != 'L':
+            diff = diff.convert('L')
+        box = diff.point(lambda p: 255 if p > self.trim_threshold else 0).getbbox()
+        if not box or box == (0, 0, img.width, img.height):
+            return None
+
+        pad = 4
+        box = (max(box[0] - pad, 0), max(box[1] - pad, 0),
+               min(box[2] + pad, img.width), min(box[3] + pad, img.height))
+        if (box[2] - box[0]) * (box[3] - box[1]) > 0.95 * img.width * img.height:
+            return None
+        return img.crop(box)
+
+    def _grayscale(self, img, window_rect):
+        return img.convert('L') if img.mode != 'L' else None
+
+    def _fit(self, img, window_rect):
+        budget = self.token_budget or estimate_image_tokens(img.width, img.height)
+
+        # (tiles, scale) for every tile grid no larger than the image's own
+        grids = [
+            (columns * rows, min(columns * TILE_SIZE / img.width, rows * TILE_SIZE / img.height))
+            for columns in range(1, math.ceil(img.width / TILE_SIZE) + 1)
+            for rows in range(1, math.ceil(img.height / TILE_SIZE) + 1)
+        ]
+        fitting = [(tiles, scale) for tiles, scale in grids if tiles * TOKENS_PER_TILE <= budget]
+        if not fitting:
+            scale = SMALL_IMAGE / max(img.width, img.height)
+        else:
+            # Largest scale within budget, unless a slight downscale needs fewer tiles
+            tiles, scale = max(fitting, key=lambda grid: grid[1])
+            cheap = [grid for grid in fitting if grid[1] >= self.min_scale]
+            if cheap:
+                tiles, scale = min(cheap, key=lambda grid: (grid[0], -grid[1]))
+        if scale >= 1:
+            return None
+
+        size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+        return img.resize(size, Image.Resampling.LANCZOS)
+
+    def _sharpen(self, img, window_rect):
+        return img.filter(ImageFilter.UnsharpMask(radius=1, percent=80, threshold=2))
+
+    def _record(self, report):
+        with self.lock:
+            self.images += 1
+            self.totals['bytes_in'] += report[0]['bytes']
+            self.totals['tokens_in'] += report[0]['tokens']
+            self.totals['bytes_out'] += report[-1]['bytes']
+            self.totals['tokens_out'] += report[-1]['tokens']
+            for before, after in zip(report, report[1:]):
+                savings = self.savings[after['step']]
+                savings['applied'] += 1
+                savings['bytes_saved'] += before['bytes'] - after['bytes']
+                savings['tokens_saved'] += before['tokens'] - after['tokens']
+
+    def stats(self):
+        with self.lock:
+            totals = dict(self.totals)
+            return {
+                'images': self.images,
+                'steps': self.steps,
+                'token_budget': self.token_budget,
+                **totals,
+                'byte_ratio': round(totals['bytes_out'] / totals['bytes_in'], 3) if totals['bytes_in'] else 0,
+                'savings': {step: dict(counts) for step, counts in self.savings.items()}
+            }
+
+
+# Global screenshot preprocessing for vision requests
+screen_prep = ScreenPrep(
+    steps=Config.AI_VISION_STEPS,
+    token_budget=Config.AI_VISION_TOKEN_BUDGET,
+    quality=Config.AI_VISION_QUALITY
+)
@@ -1,75 +1,272 @@
 from functools import wraps
 from flask import request, jsonify
-from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
-from collections import defaultdict
-from datetime import datetime, timedelta
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity, get_jwt
 import threading
+import time
+
+def burst_size(max_calls, burst=None):
+    """Calls allowed back to back: `burst`, default a fifth of max_calls, within [1, max_calls]"""
+    if burst is None:
+        burst = max_calls // 5
+    return min(max(int(burst), 1), max_calls)
+
+def gcra_params(max_calls, window_seconds, burst):
+    """
+    GCRA emission interval and burst tolerance for a limit of `max_calls`
+    per `window_seconds` with bursts of `burst`
+
+    A full burst followed by steady refill fits one window: burst calls
+    at once, then max_calls - burst more, one per emission interval.
+
+    Returns:
+        (emission_interval, burst_tolerance) in seconds
+    """
+    emission_interval = window_seconds / (max_calls - burst + 1)
+    # Slack so float rounding of the summed TAT cannot cost the last burst call
+    return emission_interval, (burst - 1) * emission_interval + 1e-6
 
 class RateLimiter:
-    """In-memory rate limiter with sliding window"""
+    """
+    In-memory GCRA (token bucket) rate limiter.
 
-    def __init__(self, max_calls, window_seconds):
+    Allows bursts of up to `burst` calls and refills so that a burst plus
+    what refills during one window never exceeds `max_calls`: the limit
+    holds over every rolling window, as with a sliding window log.
+    Per key it stores a single float, the theoretical arrival time (TAT) of
+    the next request on the monotonic clock; a key whose TAT is in the past
+    is indistinguishable from an unseen one, so expired keys are dropped
+    lazily during periodic sweeps instead of by a cleanup thread. Keys are
+    spread over striped locks so concurrent sockets rarely contend.
+    """
+
+    def __init__(self, max_calls, window_seconds, burst=None, stripes=16, sweep_every=1024):
         self.max_calls = max_calls
         self.window = window_seconds
-        self.calls = defaultdict(list)
-        self.lock = threading.Lock()
+        self.burst = burst_size(max_calls, burst)
+        self.emission_interval, self.burst_tolerance = gcra_params(max_calls, window_seconds, self.burst)
+
+        self.stripes = [{} for _ in range(stripes)]
+        self.locks = [threading.Lock() for _ in range(stripes)]
+        self.ops = [0] * stripes
+        self.sweep_every = sweep_every
 
-        # Cleanup old entries every minute
-        self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
-        self.cleanup_thread.start()
+    def _stripe(self, key):
+        return hash(key) % len(self.stripes)
 
     def allow(self, key):
         """Check if request is allowed"""
-        with self.lock:
-            now = datetime.now()
-            cutoff = now - timedelta(seconds=self.window)
-
-            # Remove old calls
-            self.calls[key] = [ts for ts in self.calls[key] if ts > cutoff]
-
-            # Check limit
-            if len(self.calls[key]) < self.max_calls:
-                self.calls[key].append(now)
-                return True
-            return False
-
-    def _cleanup_loop(self):
-        """Periodically clean up old entries"""
-        while True:
-            threading.Event().wait(60)  # Every minute
-            with self.lock:
-                cutoff = datetime.now() - timedelta(seconds=self.window * 2)
-                for key in list(self.calls.keys()):
-                    self.calls[key] = [ts for ts in self.calls[key] if ts > cutoff]
-                    if not self.calls[key]:
-                        del self.calls[key]
+        index = self._stripe(key)
+        with self.locks[index]:
+            table = self.stripes[index]
+            now = time.monotonic()
+
+            self.ops[index] += 1
+            if self.ops[index] >= self.sweep_every:
+                self.ops[index] = 0
+                self._sweep(table, now)
+
+            tat = max(table.get(key, now), now)
+            if tat - now > self.burst_tolerance:
+                return False
+
+            table[key] = tat + self.emission_interval
+            return True
+
+    def retry_after(self, key):
+        """Seconds until `key` may make its next request"""
+        index = self._stripe(key)
+        with self.locks[index]:
+            tat = self.stripes[index].get(key)
+        if tat is None:
+            return 0
+        return max(0, tat - self.burst_tolerance - time.monotonic())
+
+    @staticmethod
+    def _sweep(table, now):
+        """Drop keys whose bucket has fully refilled"""
+        for key in [k for k, tat in table.items() if tat <= now]:
+            del table[key]
+
+class RedisRateLimiter:
+    """
+    GCRA rate limiter in Redis, shared by every worker.
+
+    Same algorithm and burst sizing as RateLimiter (the script gets the
+    emission interval and tolerance from gcra_params), run atomically in
+    a Lua script against Redis' own clock so workers never disagree about
+    time. One key per limited client holding its TAT, expiring when the
+    bucket is full again.
+    """
+
+    SCRIPT = """
+    local t = redis.call('TIME')
+    local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+    local emission = tonumber(ARGV[1])
+    local tolerance = tonumber(ARGV[2])
+    local tat = tonumber(redis.call('GET', KEYS[1]) or now)
+    if tat < now then tat = now end
+    if tat - now > tolerance then
+        return {0, tostring(tat - tolerance - now)}
+    end
+    local new_tat = tat + emission
+    redis.call('SET', KEYS[1], tostring(new_tat), 'PX', math.ceil((new_tat - now) * 1000))
+    return {1, '0'}
+    """
+
+    def __init__(self, redis_client, name, max_calls, window_seconds, burst=None):
+        self.redis = redis_client
+        self.name = name
+        self.max_calls = max_calls
+        self.window = window_seconds
+        self.burst = burst_size(max_calls, burst)
+        self.emission_interval, self.burst_tolerance = gcra_params(max_calls, window_seconds, self.burst)
+        self.script = redis_client.register_script(self.SCRIPT)
+
+    def _key(self, key):
+        return f"classguard:ratelimit:{self.name}:{key}"
+
+    def allow(self, key):
+        """Check if request is allowed"""
+        allowed, _ = self.script(
+            keys=[self._key(key)],
+            args=[self.emission_interval, self.burst_tolerance]
+        )
+        return bool(allowed)
+
+    def retry_after(self, key):
+        """Seconds until `key` may make its next request"""
+        pipe = self.redis.pipeline()
+        pipe.get(self._key(key))
+        pipe.time()
+        tat, (seconds, micros) = pipe.execute()
+        if tat is None:
+            return 0
+        return max(0, float(tat) - self.burst_tolerance - (seconds + micros / 1e6))
+
+def create_rate_limiter(name, max_calls, window_seconds, burst=None):
+    """Shared Redis limiter in multi-worker mode, in-memory otherwise"""
+    from services.shared_state import shared_state, RedisState
+
+    if isinstance(shared_state, RedisState):
+        return RedisRateLimiter(shared_state.redis, name, max_calls, window_seconds, burst)
+    return RateLimiter(max_calls, window_seconds, burst)
 
 # Global rate limiters
-ai_rate_limiter = RateLimiter(max_calls=15, window_seconds=60)  # 15/min
-screenshot_rate_limiter = RateLimiter(max_calls=100, window_seconds=60)  # 100/min
+ai_rate_limiter = create_rate_limiter('ai', max_calls=15, window_seconds=60)  # 15/min
+screenshot_rate_limiter = create_rate_limiter('screenshot', max_calls=100, window_seconds=60)  # 100/min
+
+class TokenRevocations:
+    """
+    Minimum accepted token version per user, for invalidating issued JWTs.
+
+    Access tokens carry the user's `token_version` as the `ver` claim.
+    Bumping the version (role change, password reset, logout everywhere)
+    records it here until every token issued before it has expired anyway.
+    Lookups go through a short local TTL cache so require_auth costs no DB
+    query and, in multi-worker mode, at most one Redis read per user every
+    few seconds.
+    """
+
+    def __init__(self, state, retention_seconds, local_ttl=5):
+        self.state = state
+        self.retention = retention_seconds
+        self.local_ttl = local_ttl
+        self.local = {}  # user_id -> (min_version, cached_until)
+        self.lock = threading.Lock()
+
+    def revoke(self, user_id, min_version):
+        """Reject tokens for `user_id` older than `min_version`"""
+        self.state.hset('token_revocations', user_id, {
+            'version': min_version,
+            'until': time.time() + self.retention
+        })
+        with self.lock:
+            self.local.pop(user_id, None)
+
+    def min_version(self, user_id):
+        """Lowest token version still accepted for a user (0 = all)"""
+        now = time.monotonic()
+        with self.lock:
+            cached = self.local.get(user_id)
+            if cached and cached[1] > now:
+                return cached[0]
+
+        entry = self.state.hget('token_revocations', user_id)
+        version = 0
+        if entry:
+            if entry['until'] > time.time():
+                version = entry['version']
+            else:
+                self.state.hdel('token_revocations', user_id)
+
+        with self.lock:
+            if len(self.local) > 10000:
+                self.local.clear()
+            self.local[user_id] = (version, now + self.local_ttl)
+        return version
+
+def _create_token_revocations():
+    from config import Config
+    from services.shared_state import shared_state
+
+    return TokenRevocations(shared_state, Config.JWT_ACCESS_TOKEN_EXPIRES.total_seconds())
+
+token_revocations = _create_token_revocations()
+
+def token_claims(user):
+    """Extra JWT claims so requests can be authorized without a User lookup"""
+    return {'role': user.role, 'ver': user.token_version or 0}
+
+def revoke_user_tokens(user):
+    """
+    Invalidate every token issued to `user` so far
+
+    Call after changing a user's role or password; the caller commits.
+    """
+    user.token_version = (user.token_version or 0) + 1
+    token_revocations.revoke(user.id, user.token_version)
 
 def require_auth(role=None):
-    """Decorator to require authentication"""
+    """Decorator to require authentication (authorized from token claims)"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             try:
                 verify_jwt_in_request()
                 user_id = get_jwt_identity()
+                claims = get_jwt()
+            except Exception:
+                return jsonify({'error': 'Invalid token'}), 401
 
-                # Role check
-                if role:
-                    from models.user import User
-                    user = User.query.get(user_id)
-                    if not user or user.role != role:
-                        return jsonify({'error': 'Unauthorized'}), 403
+            # Tokens issued before a role change/revocation, or before
+            # claims were added, must be renewed by logging in again
+            if 'role' not in claims or claims.get('ver', 0) < token_revocations.min_version(user_id):
+                return jsonify({'error': 'Token revoked'}), 401
 
-                return f(*args, **kwargs)
-            except Exception as e:
-                return jsonify({'error': 'Invalid token'}), 401
+            # Role check
+            if role and claims['role'] != role:
+                return jsonify({'error': 'Unauthorized'}), 403
+
+            return f(*args, **kwargs)
         return decorated_function
     return decorator
 
+def require_admin(f):
+    """Decorator: teacher token whose account is listed in ADMIN_USERNAMES"""
+    @wraps(f)
+    @require_auth(role='teacher')
+    def decorated_function(*args, **kwargs):
+        from config import Config
+        from extensions import db
+        from models.user import User
+
+        user = db.session.get(User, get_jwt_identity())
+        if not user or user.username not in Config.ADMIN_USERNAMES:
+            return jsonify({'error': 'Unauthorized'}), 403
+
+        return f(*args, **kwargs)
+    return decorated_function
+
 def rate_limit(limiter, key_func=None):
     """Decorator for rate limiting"""
     def decorator(f):
@@ -83,7 +280,7 @@ def rate_limit(limiter, key_func=None):
             if not limiter.allow(key):
                 return jsonify({
                     'error': 'Rate limit exceeded',
-                    'retry_after': limiter.window
+                    'retry_after': round(limiter.retry_after(key), 1)
                 }), 429
 
             return f(*args, **kwargs)
@@ -0,0 +1,98 @@
+import json
+import threading
+from collections import defaultdict
+from config import Config
+
+
+class LocalState:
+    """In-process state store (single worker)"""
+
+    def __init__(self):
+        self.hashes = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def hget(self, name, key, default=None):
+        with self.lock:
+            return self.hashes[name].get(key, default)
+
+    def hmget(self, name, keys):
+        with self.lock:
+            table = self.hashes[name]
+            return [table.get(key) for key in keys]
+
+    def hgetall(self, name):
+        with self.lock:
+            return dict(self.hashes[name])
+
+    def hset(self, name, key, value):
+        with self.lock:
+            self.hashes[name][key] = value
+
+    def hdel(self, name, *keys):
+        with self.lock:
+            table = self.hashes[name]
+            for key in keys:
+                table.pop(key, None)
+
+    def hincr(self, name, key, amount=1):
+        with self.lock:
+            value = self.hashes[name].get(key, 0) + amount
+            self.hashes[name][key] = value
+            return value
+
+
+class RedisState:
+    """
+    Redis-backed state store shared by every worker process.
+
+    Same interface as LocalState; values are stored as JSON so workers can
+    exchange plain dicts/lists (frames, subscriptions, presence).
+    """
+
+    def __init__(self, url, prefix='classguard:'):
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, name):
+        return f"{self.prefix}{name}"
+
+    def hget(self, name, key, default=None):
+        value = self.redis.hget(self._key(name), key)
+        return json.loads(value) if value is not None else default
+
+    def hmget(self, name, keys):
+        if not keys:
+            return []
+        values = self.redis.hmget(self._key(name), keys)
+        return [json.loads(v) if v is not None else None for v in values]
+
+    def hgetall(self, name):
+        return {
+            key.decode('utf-8'): json.loads(value)
+            for key, value in self.redis.hgetall(self._key(name)).items()
+        }
+
+    def hset(self, name, key, value):
+        self.redis.hset(self._key(name), key, json.dumps(value))
+
+    def hdel(self, name, *keys):
+        if keys:
+            self.redis.hdel(self._key(name), *keys)
+
+    def hincr(self, name, key, amount=1):
+        return self.redis.hincrby(self._key(name), key, amount)
+
+
+def create_shared_state():
+    """Redis state in multi-worker mode, in-process state otherwise"""
+    if Config.MULTI_WORKER:
+        if not Config.REDIS_URL:
+            raise RuntimeError("MULTI_WORKER requires REDIS_URL")
+        return RedisState(Config.REDIS_URL)
+    return LocalState()
+
+
+# Global state store
+shared_state = create_shared_state()
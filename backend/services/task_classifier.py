@@ -0,0 +1,349 @@
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from config import Config
+from utils.violations import VIOLATION_KEYWORDS
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Labels, from the code check statuses the AI returns
+CODE = 'code'  # correct/has_issues/error: only the model can judge the code
+NO_CODE = 'no_code'
+OFF_TASK = 'off_task'
+LABELS = (CODE, NO_CODE, OFF_TASK)
+STATUS_LABELS = {
+    'correct': CODE, 'has_issues': CODE, 'error': CODE,
+    'no_code': NO_CODE, 'off_task': OFF_TASK
+}
+
+# Same lists as the process_update violation check; matched as whole title words
+OFF_TASK_KEYWORDS = VIOLATION_KEYWORDS
+# Executables (lowercase, without .exe) that are a game/social/video app
+# themselves. Matched exactly: substrings of the keywords would hit
+# Windows' own GameBar/gamingservices, which run on every school PC.
+OFF_TASK_APPS = {
+    'minecraft', 'minecraft.windows', 'minecraftlauncher', 'fortnite', 'fortniteclient-win64-shipping',
+    'fortnitelauncher', 'roblox', 'robloxplayerbeta', 'robloxplayerlauncher',
+    'facebook', 'instagram', 'twitter', 'tiktok', 'youtube', 'netflix', 'twitch'
+}
+CODING_APPS = {
+    'code', 'pycharm', 'idea', 'idea64', 'sublime_text', 'atom', 'vim', 'nvim', 'gvim', 'emacs',
+    'notepad++', 'thonny', 'idle', 'spyder', 'eclipse', 'netbeans', 'xcode', 'studio64',
+    'jupyter', 'terminal', 'iterm2', 'gnome-terminal', 'konsole', 'cmd', 'powershell', 'windowsterminal'
+}
+CODING_TITLES = ('visual studio code', 'jupyter', 'replit', 'colab', 'codepen', 'pycharm', 'intellij')
+
+APP_RULE_CONFIDENCE = 0.97  # the active app itself is a game/social/video app
+# Hints only, never decided locally: a title can mention a game ("Game
+# theory lecture notes") and a game can run behind the editor
+TITLE_RULE_CONFIDENCE = 0.6  # only the window title mentions one
+PROCESS_RULE_CONFIDENCE = 0.5  # one is running, but not in front
+PROCESS_WEIGHT = 0.2  # background processes say little about what is on screen
+
+TOKEN = re.compile(r"[a-z0-9+#]+")
+
+
+def _app_name(app):
+    name = os.path.basename((app or '').strip().lower().replace('\\', '/'))
+    return name[:-4] if name.endswith('.exe') else name
+
+
+def _title_tokens(title):
+    return {token for token in TOKEN.findall((title or '').lower()) if len(token) > 1 and not token.isdigit()}
+
+
+class TaskClassifier:
+    """
+    Cheap on/off-task decision in front of the vision model.
+
+    Two tiers look at what the agent already reports for a screen (active
+    app, window title, process list):
+
+        rules   the active app is a game, social or video app -> off_task;
+                a coding app in front -> code, which always goes to the
+                model. A window title naming one (the process_update
+                keyword lists) or such an app running in the background
+                is only a hint: off_task below any threshold, so the
+                screen escalates
+        model   multinomial naive Bayes over app, title and (down-weighted)
+                process tokens, trained online from the AI's own answers
+
+    A screen is answered locally only when the label is off_task or
+    no_code with confidence at or above its threshold, and the model tier
+    has seen `min_samples` AI labels; everything else escalates to the
+    vision model. A share (`audit_rate`) of local decisions is escalated
+    anyway, so precision is measured against AI labels rather than assumed.
+
+    Recall is estimated from the same data: locally decided screens count
+    as correct at the audited precision, and every escalated screen the
+    AI gave the label counts as missed.
+    """
+
+    def __init__(self, thresholds=None, min_samples=50, audit_rate=0.05, model_path=None,
+                 alpha=1.0, max_vocab=20000, save_every=25):
+        self.thresholds = thresholds or {OFF_TASK: 0.9, NO_CODE: 0.95}
+        self.min_samples = min_samples
+        self.audit_rate = audit_rate
+        self.model_path = model_path
+        self.alpha = alpha
+        self.max_vocab = max_vocab
+        self.save_every = save_every
+        self.lock = threading.Lock()
+
+        # Naive Bayes counts
+        self.docs = {label: 0 for label in LABELS}
+        self.token_counts = {label: defaultdict(float) for label in LABELS}
+        self.token_totals = {label: 0.0 for label in LABELS}
+        self.vocab = set()
+        self.unsaved = 0
+        self.load()
+
+        # Metrics
+        self.screens = 0
+        self.classify_seconds = 0.0
+        self.decided = {'rules': 0, 'model': 0}
+        self.escalated = 0
+        self.audited = 0
+        self.labels = defaultdict(lambda: {'decided': 0, 'audited': 0, 'agreed': 0, 'missed': 0})
+        self.shadow = {'predicted': 0, 'correct': 0}  # model argmax on escalated screens
+
+    def features(self, context):
+        """Token -> weight for a screen's app, title and processes"""
+        features = {}
+        app = _app_name(context.get('active_app'))
+        if app:
+            features[f"app:{app}"] = 1.0
+        for token in _title_tokens(context.get('active_window')):
+            features[token] = 1.0
+        for process in context.get('processes') or ():
+            name = _app_name(process)
+            if name:
+                features.setdefault(f"proc:{name}", PROCESS_WEIGHT)
+        return features
+
+    def _rules(self, context):
+        """(label, confidence, decisive) from the app/keyword rules, or None"""
+        app = _app_name(context.get('active_app'))
+        title = (context.get('active_window') or '').lower()
+        if app in CODING_APPS or any(name in title for name in CODING_TITLES):
+            return CODE, APP_RULE_CONFIDENCE, True
+        if app in OFF_TASK_APPS:
+            return OFF_TASK, APP_RULE_CONFIDENCE, True
+
+        tokens = _title_tokens(title)
+        if any(keyword in tokens for keywords in OFF_TASK_KEYWORDS.values() for keyword in keywords):
+            return OFF_TASK, TITLE_RULE_CONFIDENCE, False
+
+        if any(_app_name(process) in OFF_TASK_APPS for process in context.get('processes') or ()):
+            return OFF_TASK, PROCESS_RULE_CONFIDENCE, False
+        return None
+
+    def _posterior(self, features):
+        """Label -> probability, or None when no feature has been seen (caller holds lock)"""
+        known = {token: weight for token, weight in features.items() if token in self.vocab}
+        total = sum(self.docs.values())
+        if not known or not total:
+            return None
+
+        scores = {}
+        vocab = len(self.vocab) + 1
+        for label in LABELS:
+            score = math.log((self.docs[label] + 1) / (total + len(LABELS)))
+            denominator = self.token_totals[label] + self.alpha * vocab
+            counts = self.token_counts[label]
+            for token, weight in known.items():
+                score += weight * math.log((counts.get(token, 0.0) + self.alpha) / denominator)
+            scores[label] = score
+
+        top = max(scores.values())
+        exp = {label: math.exp(score - top) for label, score in scores.items()}
+        norm = sum(exp.values())
+        return {label: value / norm for label, value in exp.items()}
+
+    def classify(self, context):
+        """
+        Decide a screen locally if it is an easy case
+
+        Args:
+            context: dict with active_app, active_window and processes
+                     (any may be missing)
+
+        Returns:
+            dict with label, confidence, tier ('rules'/'model'/None),
+            decided (answer locally) and audit (decided, but escalated to
+            measure precision); pass it to learn() with the AI's answer
+        """
+        started = time.perf_counter()
+        features = self.features(context)
+        rule = self._rules(context)
+
+        with self.lock:
+            posterior = self._posterior(features)
+            trained = sum(self.docs.values()) >= self.min_samples
+
+        decisive = True
+        if rule:
+            (label, confidence, decisive), tier = rule, 'rules'
+        elif posterior and trained:
+            label = max(posterior, key=posterior.get)
+            confidence, tier = posterior[label], 'model'
+        else:
+            label, confidence, tier = None, 0.0, None
+
+        decided = decisive and label in self.thresholds and confidence >= self.thresholds[label]
+        audit = decided and random.random() < self.audit_rate
+        decision = {
+            'label': label,
+            'confidence': round(confidence, 3),
+            'tier': tier,
+            'decided': decided and not audit,
+            'audit': audit,
+            'predicted': max(posterior, key=posterior.get) if posterior else None,
+            'features': features
+        }
+
+        with self.lock:
+            self.screens += 1
+            self.classify_seconds += time.perf_counter() - started
+            if decision['decided']:
+                self.decided[tier] += 1
+                self.labels[label]['decided'] += 1
+            else:
+                self.escalated += 1
+                if audit:
+                    self.audited += 1
+        return decision
+
+    @staticmethod
+    def analysis(decision):
+        """Code check answer for a locally decided screen"""
+        return {
+            'has_code': False,
+            'language_detected': 'none',
+            'status': decision['label'],
+            'issues': [],
+            'positive_aspects': [],
+            'suggestions': [],
+            'confidence': int(decision['confidence'] * 100),
+            'classified_by': decision['tier']
+        }
+
+    def learn(self, decision, analysis):
+        """
+        Record the AI's answer for an escalated screen
+
+        Args:
+            decision: what classify() returned for the screen
+            analysis: the parsed code check from the model
+        """
+        label = STATUS_LABELS.get(analysis.get('status'))
+        if not label:
+            return  # no analysis, nothing to learn from
+
+        with self.lock:
+            if decision['audit']:
+                audited = self.labels[decision['label']]
+                audited['audited'] += 1
+                audited['agreed'] += decision['label'] == label
+            if label in self.thresholds and not (decision['audit'] and decision['label'] == label):
+                self.labels[label]['missed'] += 1
+            if decision['predicted']:
+                self.shadow['predicted'] += 1
+                self.shadow['correct'] += decision['predicted'] == label
+
+            self.docs[label] += 1
+            counts = self.token_counts[label]
+            for token, weight in decision['features'].items():
+                if token not in self.vocab:
+                    if len(self.vocab) >= self.max_vocab:
+                        continue
+                    self.vocab.add(token)
+                counts[token] += weight
+                self.token_totals[label] += weight
+
+            self.unsaved += 1
+            save = self.unsaved >= self.save_every
+            if save:
+                self.unsaved = 0
+
+        if save:
+            self.save()
+
+    def load(self):
+        if not self.model_path or not os.path.exists(self.model_path):
+            return
+        try:
+            with open(self.model_path) as f:
+                model = json.load(f)
+            with self.lock:
+                for label in LABELS:
+                    self.docs[label] = model['docs'].get(label, 0)
+                    self.token_counts[label] = defaultdict(float, model['token_counts'].get(label, {}))
+                    self.token_totals[label] = sum(self.token_counts[label].values())
+                    self.vocab.update(self.token_counts[label])
+            logger.info(f"🏷️ Task classifier loaded {sum(self.docs.values())} labels from {self.model_path}")
+        except (OSError, ValueError, KeyError, AttributeError) as e:
+            logger.error(f"Error loading task classifier: {e}")
+
+    def save(self):
+        """Write the model counts (atomically) so training survives restarts"""
+        if not self.model_path:
+            return
+        with self.lock:
+            model = {
+                'docs': dict(self.docs),
+                'token_counts': {label: dict(counts) for label, counts in self.token_counts.items()}
+            }
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.model_path)), exist_ok=True)
+            tmp_path = f"{self.model_path}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(model, f)
+            os.replace(tmp_path, self.model_path)
+        except OSError as e:
+            logger.error(f"Error saving task classifier: {e}")
+
+    def stats(self):
+        with self.lock:
+            labels = {}
+            for label, counts in self.labels.items():
+                precision = counts['agreed'] / counts['audited'] if counts['audited'] else None
+                correct = counts['decided'] * precision if precision is not None else None
+                recall = None
+                if correct is not None and correct + counts['missed']:
+                    recall = round(correct / (correct + counts['missed']), 3)
+                labels[label] = {
+                    **counts,
+                    'precision': round(precision, 3) if precision is not None else None,
+                    'recall': recall
+                }
+
+            return {
+                'screens': self.screens,
+                'decided': dict(self.decided),
+                'escalated': self.escalated,
+                'audited': self.audited,
+                'decided_ratio': round(sum(self.decided.values()) / self.screens, 3) if self.screens else 0,
+                'avg_classify_us': round(self.classify_seconds / self.screens * 1e6, 1) if self.screens else 0,
+                'thresholds': dict(self.thresholds),
+                'trained_labels': dict(self.docs),
+                'vocab': len(self.vocab),
+                'model_accuracy': round(self.shadow['correct'] / self.shadow['predicted'], 3)
+                if self.shadow['predicted'] else None,
+                'labels': labels
+            }
+
+
+# Global pre-classifier for code checks
+task_classifier = TaskClassifier(
+    thresholds={OFF_TASK: Config.AI_PRECLASSIFY_OFF_TASK_CONFIDENCE, NO_CODE: Config.AI_PRECLASSIFY_NO_CODE_CONFIDENCE},
+    min_samples=Config.AI_PRECLASSIFY_MIN_SAMPLES,
+    audit_rate=Config.AI_PRECLASSIFY_AUDIT_RATE,
+    model_path=Config.AI_PRECLASSIFY_MODEL_PATH
+)
@@ -0,0 +1,428 @@
+import asyncio
+import functools
+import math
+import threading
+import time
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SUB_BUCKETS = 4  # linear steps per power of two: values are kept within ~19%
+INF_BUCKET = 'le="+Inf"'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """
+    One metric family and its labeled series.
+
+    At most `max_series` label combinations are kept; further ones are
+    folded into a single series with every label set to 'other', so a
+    misbehaving label (a user name, a socket id) cannot grow the
+    exposition without bound.
+    """
+
+    type = None
+
+    def __init__(self, name, help, labels=(), max_series=64):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self.max_series = max_series
+        self.series = {}
+        self.lock = threading.Lock()
+        self.overflowed = 0
+
+    def labels(self, *values):
+        """The series for these label values (created on first use)"""
+        key = tuple(str(value) for value in values)
+        series = self.series.get(key)
+        if series is not None:
+            return series
+        with self.lock:
+            if key not in self.series and len(self.series) >= self.max_series:
+                self.overflowed += 1
+                key = ('other',) * len(self.label_names)
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = self._new_series()
+            return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self.lock:
+            items = list(self.series.items())
+        for values, series in items:
+            lines.extend(self._render_series(values, series))
+        return lines
+
+
+class _Value:
+    __slots__ = ('value', 'lock')
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def _new_series(self):
+        return _Value()
+
+    def inc(self, *values, amount=1):
+        self.labels(*values).inc(amount)
+
+    def _render_series(self, values, series):
+        yield f"{self.name}{_format_labels(self.label_names, values)} {_format_number(series.value)}"
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def set(self, value, *values):
+        self.labels(*values).set(value)
+
+
+class _HistogramSeries:
+    __slots__ = ('histogram', 'counts', 'count', 'sum', 'max', 'lock')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.counts = [0] * histogram.size
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = self.histogram.index(value)
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += value
+            if value > self.max:
+                self.max = value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th value (at most the max seen)"""
+        with self.lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        if not count:
+            return 0.0
+        rank = max(1, math.ceil(q * count))
+        seen = 0
+        for index, bucket in enumerate(counts):
+            seen += bucket
+            if seen >= rank:
+                return min(self.histogram.upper(index), largest)
+        return largest
+
+
+class Histogram(Metric):
+    """
+    HDR-style latency/size histogram.
+
+    Values are counted in log-linear buckets: SUB_BUCKETS equal steps per
+    power of two of `unit`, over `octaves` powers of two (1 µs to ~134 s
+    for the default unit). Recording is one frexp and one increment, and
+    the relative error is bounded at any magnitude. The Prometheus
+    exposition uses the power-of-two boundaries from `export[0]` to
+    `export[1]`; quantile() reads the full resolution.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), max_series=64, unit=1e-6, octaves=27, export=(4, 27)):
+        super().__init__(name, help, labels, max_series)
+        self.scale = 1.0 / unit
+        self.unit = unit
+        self.octaves = octaves
+        self.size = 1 + octaves * SUB_BUCKETS
+        self.export = range(export[0], export[1] + 1)
+
+    def index(self, value):
+        scaled = value * self.scale
+        if scaled < 1:
+            return 0
+        mantissa, exponent = math.frexp(scaled)  # scaled = mantissa * 2**exponent, 0.5 <= mantissa < 1
+        index = 1 + (exponent - 1) * SUB_BUCKETS + int((mantissa * 2 - 1) * SUB_BUCKETS)
+        return min(index, self.size - 1)
+
+    def upper(self, index):
+        """Exclusive upper bound of a bucket, in the observed unit"""
+        if index == 0:
+            return self.unit
+        octave, step = divmod(index - 1, SUB_BUCKETS)
+        return self.unit * (2 ** octave) * (1 + (step + 1) / SUB_BUCKETS)
+
+    def _new_series(self):
+        return _HistogramSeries(self)
+
+    def observe(self, value, *values):
+        self.labels(*values).observe(value)
+
+    def time(self, *values):
+        """Context manager observing the elapsed seconds of its block"""
+        return _Timer(self.labels(*values))
+
+    def _render_series(self, values, series):
+        with series.lock:
+            counts, count, total = list(series.counts), series.count, series.sum
+
+        cumulative = 0
+        index = 0
+        for octave in self.export:
+            # Buckets below 2**octave units end at index octave * SUB_BUCKETS
+            while index <= octave * SUB_BUCKETS and index < len(counts):
+                cumulative += counts[index]
+                index += 1
+            le = f'le="{self.unit * 2 ** octave:.6g}"'
+            yield f"{self.name}_bucket{_format_labels(self.label_names, values, le)} {cumulative}"
+        yield f"{self.name}_bucket{_format_labels(self.label_names, values, INF_BUCKET)} {count}"
+        yield f"{self.name}_sum{_format_labels(self.label_names, values)} {_format_number(total)}"
+        yield f"{self.name}_count{_format_labels(self.label_names, values)} {count}"
+
+    def summary(self, quantiles=(0.5, 0.9, 0.99)):
+        with self.lock:
+            items = list(self.series.items())
+        return {
+            ','.join(values) or 'all': {
+                'count': series.count,
+                **{f"p{int(q * 100)}": round(series.quantile(q), 6) for q in quantiles},
+                'max': round(series.max, 6)
+            }
+            for values, series in items
+        }
+
+
+class _Timer:
+    __slots__ = ('series', 'started')
+
+    def __init__(self, series):
+        self.series = series
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.series.observe(time.perf_counter() - self.started)
+        return False
+
+
+class _Collected:
+    """Counter/gauge read from a service's own stats when scraped"""
+
+    def __init__(self, type, name, help, fn, labels=()):
+        self.type = type
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label_names = tuple(labels)
+
+    def render(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            logger.error(f"Error collecting {self.name}: {e}")
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        for values, number in items:
+            values = values if isinstance(values, tuple) else (values,)
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {_format_number(number or 0)}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics in the Prometheus text format.
+
+    Hot paths hold a series (`histogram.labels('screen_update')`) and
+    record into it with a short per-series lock; nothing is aggregated or
+    formatted until /metrics is scraped. Queue depths and the counters the
+    services already keep are read from them at scrape time via collect().
+
+    Metrics are per worker process; Prometheus adds them up across workers.
+    """
+
+    def __init__(self, prefix='classguard'):
+        self.prefix = prefix
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, help, labels=(), max_series=64):
+        return self._register(Counter(f"{self.prefix}_{name}", help, labels, max_series))
+
+    def gauge(self, name, help, labels=(), max_series=64):
+        return self._register(Gauge(f"{self.prefix}_{name}", help, labels, max_series))
+
+    def histogram(self, name, help, labels=(), max_series=64, **layout):
+        return self._register(Histogram(f"{self.prefix}_{name}", help, labels, max_series, **layout))
+
+    def collect(self, type, name, help, fn, labels=()):
+        """
+        Report a value computed at scrape time
+
+        Args:
+            type: 'counter' or 'gauge'
+            fn: returns a number, or a dict of label value (tuple) -> number
+        """
+        return self._register(_Collected(type, f"{self.prefix}_{name}", help, fn, labels))
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def summary(self):
+        """Latency percentiles of every histogram, for the JSON stats routes"""
+        with self.lock:
+            histograms = [metric for metric in self.metrics.values() if isinstance(metric, Histogram)]
+        return {metric.name: metric.summary() for metric in histograms}
+
+
+# Global registry behind /metrics
+telemetry = MetricsRegistry()
+
+# Hot-path metrics (label values are fixed names, so cardinality stays small)
+socket_event_seconds = telemetry.histogram(
+    'socketio_event_seconds', 'Socket.IO handler latency', labels=('event',))
+socket_event_errors = telemetry.counter(
+    'socketio_event_errors_total', 'Socket.IO handlers that raised', labels=('event',))
+db_seconds = telemetry.histogram(
+    'db_seconds', 'Database session flush and commit latency', labels=('op',))
+ai_call_seconds = telemetry.histogram(
+    'ai_call_seconds', 'Model calls by endpoint and outcome', labels=('endpoint', 'outcome'))
+compression_seconds = telemetry.histogram(
+    'compression_seconds', 'Screenshot compression: encode in the worker, and total including the queue',
+    labels=('stage',))
+broadcast_seconds = telemetry.histogram(
+    'broadcast_seconds', 'Time to emit a fan-out event to one teacher', labels=('event',))
+screen_frame_bytes = telemetry.histogram(
+    'screen_frame_bytes', 'Compressed screenshot size per student update', unit=1, octaves=27, export=(8, 24))
+
+
+def instrument_event(event):
+    """
+    Time a Socket.IO handler (sync or async) under the given event name
+
+    Put it directly below @socketio.on / @sio.on so rate-limited calls are
+    counted too.
+    """
+    series = socket_event_seconds.labels(event)
+    errors = socket_event_errors.labels(event)
+
+    def decorator(f):
+        if asyncio.iscoroutinefunction(f):
+            @functools.wraps(f)
+            async def async_wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await f(*args, **kwargs)
+                except Exception:
+                    errors.inc()
+                    raise
+                finally:
+                    series.observe(time.perf_counter() - started)
+            return async_wrapper
+
+        @functools.wraps(f)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return f(*args, **kwargs)
+            except Exception:
+                errors.inc()
+                raise
+            finally:
+                series.observe(time.perf_counter() - started)
+        return wrapper
+
+    return decorator
+
+
+def instrument_sqlalchemy():
+    """Time every ORM session flush and commit (idempotent)"""
+    from sqlalchemy import event
+    from sqlalchemy.orm import Session
+
+    if event.contains(Session, 'before_commit', _before_commit):
+        return
+    event.listen(Session, 'before_flush', _before_flush)
+    event.listen(Session, 'after_flush_postexec', _after_flush)
+    event.listen(Session, 'before_commit', _before_commit)
+    event.listen(Session, 'after_commit', _after_commit)
+    event.listen(Session, 'after_rollback', _after_rollback)
+
+
+_flush_series = db_seconds.labels('flush')
+_commit_series = db_seconds.labels('commit')
+
+
+def _before_flush(session, flush_context, instances):
+    session.info['telemetry_flush'] = time.perf_counter()
+
+
+def _after_flush(session, flush_context):
+    started = session.info.pop('telemetry_flush', None)
+    if started is not None:
+        _flush_series.observe(time.perf_counter() - started)
+
+
+def _before_commit(session):
+    session.info['telemetry_commit'] = time.perf_counter()
+
+
+def _after_commit(session):
+    started = session.info.pop('telemetry_commit', None)
+    if started is not None:
+        _commit_series.observe(time.perf_counter() - started)
+
+
+def _after_rollback(session):
+    session.info.pop('telemetry_commit', None)
+    session.info.pop('telemetry_flush', None)
+
+
+def metrics_authorized(authorization):
+    """Check a scrape's Authorization header against METRICS_TOKEN (open when unset)"""
+    return not Config.METRICS_TOKEN or authorization == f"Bearer {Config.METRICS_TOKEN}"
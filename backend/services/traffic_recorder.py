@@ -0,0 +1,276 @@
+import atexit
+import base64
+import functools
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from config import Config
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class RecorderBusy(Exception):
+    """A recording is already running"""
+
+
+NAME = re.compile(r'^[A-Za-z0-9_.-]{1,64}$')
+TRACE_VERSION = 1
+
+
+class TrafficRecorder:
+    """
+    Append-only trace of every inbound Socket.IO event, for replay.
+
+    A trace is a directory holding one events-<pid>.jsonl per server
+    process and a frames/ directory. The first line of an events file is a
+    header with the wall-clock start time; every other line is
+
+        [seconds since start, client, event, data]
+
+    where client is a small integer per socket id. Screenshots are
+    replaced by {"frame": sha1, "bytes": n} and written once to
+    frames/<sha1>, so identical screens cost one file; with store_frames
+    off only the reference is kept and the replayer sends filler of the
+    same size.
+
+    Handlers wrapped with @recorded('event') only copy the event onto a
+    bounded queue; hashing, JSON encoding and file I/O happen on a writer
+    thread. Events are dropped (and counted) rather than blocking a
+    handler if the writer falls behind.
+
+    A recording named by `autostart` starts on the first event a process
+    handles, so only serving processes record: not the reloader parent,
+    spawned compression workers or scripts that import the app.
+    """
+
+    def __init__(self, directory='traces', store_frames=True, queue_size=10000, autostart=None):
+        self.directory = directory
+        self.store_frames = store_frames
+        self.queue_size = queue_size
+        self.autostart = autostart
+        self.lock = threading.Lock()
+        self.active = False
+        self.queue = None
+        self.writer = None
+        self.name = None
+        self.started = 0.0
+
+        self.clients = {}  # connected sid -> client number
+        self.next_client = 0
+        self.events = 0
+        self.frames = 0
+        self.frames_stored = 0
+        self.frame_bytes_stored = 0
+        self.dropped = 0
+        self.started_at = None
+        self.stopped_at = None
+        atexit.register(self.stop)  # flush the backlog on shutdown
+
+    def start(self, name=None):
+        """
+        Start recording into `directory`/`name`
+
+        Returns:
+            path of the trace directory
+
+        Raises:
+            RecorderBusy: a recording is already running
+            ValueError: invalid trace name
+        """
+        name = name or datetime.now().strftime('lesson-%Y%m%d-%H%M%S')
+        if not NAME.match(name):
+            raise ValueError(f"Invalid trace name: {name}")
+
+        with self.lock:
+            if self.active:
+                raise RecorderBusy()
+
+            path = os.path.join(self.directory, name)
+            os.makedirs(os.path.join(path, 'frames'), exist_ok=True)
+
+            self.name = name
+            self.started = time.monotonic()
+            self.started_at = time.time()
+            self.stopped_at = None
+            self.clients = {}
+            self.next_client = 0
+            self.events = self.frames = self.frames_stored = self.frame_bytes_stored = self.dropped = 0
+            self.queue = queue.Queue(maxsize=self.queue_size)
+            self.writer = threading.Thread(target=self._write, args=(path, self.queue), daemon=True,
+                                           name='traffic-recorder')
+            self.writer.start()
+            self.active = True
+
+        logger.info(f"Recording Socket.IO traffic to {path}")
+        return path
+
+    def stop(self):
+        """Stop recording and wait for the writer to flush; returns stats()"""
+        with self.lock:
+            active = self.active
+            if active:
+                self.active = False
+                self.stopped_at = time.time()
+                writer, events = self.writer, self.queue
+        if not active:
+            return self.stats()
+
+        events.put(None)  # blocks if full: stopping must not lose the sentinel
+        writer.join()
+        logger.info(f"Recording {self.name} stopped: {self.events} events, {self.dropped} dropped")
+        return self.stats()
+
+    def record(self, event, sid, data=None):
+        """Queue one inbound event (non-blocking)"""
+        if not self.active:
+            return
+
+        offset = time.monotonic() - self.started
+        with self.lock:
+            client = self.clients.get(sid)
+            if client is None:
+                client = self.clients[sid] = self.next_client
+                self.next_client += 1
+            if event == 'disconnect':
+                self.clients.pop(sid, None)
+
+        if isinstance(data, dict):
+            data = dict(data)  # handlers may rewrite fields (e.g. the compressed screenshot)
+
+        try:
+            self.queue.put_nowait((offset, client, event, data))
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+        except AttributeError:
+            pass  # stopped concurrently
+
+    def _autostart(self):
+        """Start the configured recording once, on the first handled event"""
+        with self.lock:
+            name, self.autostart = self.autostart, None
+        if not name:
+            return
+        try:
+            self.start(name)
+        except RecorderBusy:
+            pass
+        except (ValueError, OSError) as e:
+            logger.error(f"Error starting recording {name}: {e}")
+
+    def recorded(self, event):
+        """
+        Decorator: record a Socket.IO handler's inbound event
+
+        Works for Flask-SocketIO handlers (sid from the request, payload
+        as first argument) and AsyncServer handlers (sid, payload). The
+        connect payload (environ/auth) is not recorded.
+        """
+        def decorator(f):
+            import asyncio
+
+            if asyncio.iscoroutinefunction(f):
+                @functools.wraps(f)
+                async def async_wrapper(sid, *args, **kwargs):
+                    if self.autostart:
+                        self._autostart()
+                    if self.active:
+                        self.record(event, sid, args[0] if args and event != 'connect' else None)
+                    return await f(sid, *args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(f)
+            def wrapper(*args, **kwargs):
+                if self.autostart:
+                    self._autostart()
+                if self.active:
+                    from flask import request
+                    self.record(event, request.sid, args[0] if args and event != 'connect' else None)
+                return f(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _frame_ref(self, frames_path, screenshot, seen):
+        """Replace a base64 screenshot with its reference, writing it once"""
+        digest = hashlib.sha1(screenshot.encode('ascii', 'ignore')).hexdigest()
+        size = len(screenshot) * 3 // 4
+        stored = 0
+        if self.store_frames and digest not in seen:
+            seen.add(digest)
+            frame_path = os.path.join(frames_path, digest)
+            if not os.path.exists(frame_path):
+                try:
+                    with open(frame_path, 'wb') as f:
+                        f.write(base64.b64decode(screenshot))
+                    stored = size
+                except (ValueError, OSError) as e:
+                    logger.error(f"Error storing frame {digest}: {e}")
+        return {'frame': digest, 'bytes': size}, stored
+
+    def _write(self, path, events):
+        frames_path = os.path.join(path, 'frames')
+        seen = set(os.listdir(frames_path))
+        events_path = os.path.join(path, f"events-{os.getpid()}.jsonl")
+        header = {'version': TRACE_VERSION, 'started_at': self.started_at, 'pid': os.getpid(),
+                  'frames': self.store_frames}
+
+        with open(events_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(header, separators=(',', ':')) + '\n')
+            while True:
+                item = events.get()
+                if item is None:
+                    break
+                offset, client, event, data = item
+
+                frames = stored = 0
+                if isinstance(data, dict) and isinstance(data.get('screenshot'), str):
+                    data['screenshot'], stored = self._frame_ref(frames_path, data['screenshot'], seen)
+                    frames = 1
+
+                try:
+                    line = json.dumps([round(offset, 3), client, event, data], separators=(',', ':'), default=str)
+                except (TypeError, ValueError):
+                    line = json.dumps([round(offset, 3), client, event, None], separators=(',', ':'))
+                f.write(line + '\n')
+
+                with self.lock:
+                    self.events += 1
+                    self.frames += frames
+                    self.frames_stored += 1 if stored else 0
+                    self.frame_bytes_stored += stored
+
+                # Flush when caught up, so a crash loses at most the backlog
+                if events.empty():
+                    f.flush()
+
+    def stats(self):
+        with self.lock:
+            now = self.stopped_at or time.time()
+            return {
+                'active': self.active,
+                'name': self.name,
+                'path': os.path.join(self.directory, self.name) if self.name else None,
+                'seconds': round(now - self.started_at, 1) if self.started_at else 0,
+                'clients': len(self.clients),
+                'events': self.events,
+                'frames': self.frames,
+                'frames_stored': self.frames_stored,
+                'frame_mb_stored': round(self.frame_bytes_stored / 1024 / 1024, 1),
+                'queued': self.queue.qsize() if self.queue else 0,
+                'dropped': self.dropped
+            }
+
+
+# Global recorder; TRAFFIC_RECORD starts it with the server's first event
+traffic_recorder = TrafficRecorder(
+    directory=Config.TRAFFIC_TRACE_DIR,
+    store_frames=Config.TRAFFIC_RECORD_FRAMES,
+    autostart=Config.TRAFFIC_RECORD
+)
+recorded = traffic_recorder.recorded
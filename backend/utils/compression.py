@@ -0,0 +1,58 @@
+from PIL import Image
+import io
+import base64
+import hashlib
+import logging
+import time
+
+# Standard library logger: this module runs in compression worker processes,
+# which must not import the app (and its logging setup) to use it
+logger = logging.getLogger(__name__)
+
+
+def compress_image(base64_str, quality=60, max_width=1280, max_height=720):
+    """
+    Compress base64 encoded image
+    Returns: (compressed_base64, hash, size_kb)
+    """
+    try:
+        # Decode base64
+        img_data = base64.b64decode(base64_str)
+
+        # Open image
+        img = Image.open(io.BytesIO(img_data))
+
+        # Convert RGBA to RGB if needed
+        if img.mode == 'RGBA':
+            img = img.convert('RGB')
+
+        # Resize if too large
+        if img.width > max_width or img.height > max_height:
+            img.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+
+        # Compress to JPEG
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=quality, optimize=True)
+        compressed_data = buffer.getvalue()
+
+        # Calculate hash for deduplication
+        img_hash = hashlib.sha256(compressed_data).hexdigest()
+
+        # Encode to base64
+        compressed_base64 = base64.b64encode(compressed_data).decode('utf-8')
+
+        # Calculate size in KB
+        size_kb = len(compressed_data) / 1024
+
+        return compressed_base64, img_hash, size_kb
+
+    except Exception as e:
+        logger.error(f"Compression error: {e}")
+        return None, None, 0
+
+
+def timed_compress_image(base64_str, quality, max_width, max_height):
+    """Process pool entry point: compress_image's result and the seconds it took"""
+    started = time.perf_counter()
+    result = compress_image(base64_str, quality, max_width, max_height)
+    return result, time.perf_counter() - started
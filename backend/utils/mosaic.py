@@ -0,0 +1,59 @@
+from PIL import Image, ImageDraw, ImageFont
+import io
+import math
+import base64
+
+
+def build_mosaic(screenshots, tile_width=800, tile_height=450, quality=70):
+    """
+    Tile several screenshots into one labeled image
+
+    Each screenshot is downscaled to fit its tile and gets a numbered banner
+    ("1", "2", ...) in the top-left corner, so a vision model can report on
+    every tile separately.
+
+    Args:
+        screenshots: list of base64 encoded images, in tile order
+        tile_width, tile_height: size of one tile in pixels
+
+    Returns:
+        base64 encoded JPEG of the mosaic
+    """
+    columns = math.ceil(math.sqrt(len(screenshots)))
+    rows = math.ceil(len(screenshots) / columns)
+
+    mosaic = Image.new('RGB', (columns * tile_width, rows * tile_height), (40, 40, 40))
+    draw = ImageDraw.Draw(mosaic)
+    font = _label_font(tile_height // 12)
+
+    for index, screenshot in enumerate(screenshots):
+        x = (index % columns) * tile_width
+        y = (index // columns) * tile_height
+
+        img = Image.open(io.BytesIO(base64.b64decode(screenshot)))
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail((tile_width - 4, tile_height - 4), Image.Resampling.LANCZOS)
+        mosaic.paste(img, (x + 2, y + 2))
+
+        # Label banner
+        label = str(index + 1)
+        box = draw.textbbox((0, 0), label, font=font)
+        pad = max(4, tile_height // 60)
+        draw.rectangle(
+            (x, y, x + box[2] - box[0] + 3 * pad, y + box[3] - box[1] + 3 * pad),
+            fill=(255, 220, 0)
+        )
+        draw.text((x + pad - box[0], y + pad - box[1]), label, fill=(0, 0, 0), font=font)
+
+    buffer = io.BytesIO()
+    mosaic.save(buffer, format='JPEG', quality=quality)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def _label_font(size):
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has no sized default font
+        return ImageFont.load_default()
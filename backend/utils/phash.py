@@ -0,0 +1,118 @@
+from PIL import Image
+import io
+import base64
+import hashlib
+
+
+def _open(image):
+    if isinstance(image, str):
+        image = base64.b64decode(image)
+    if isinstance(image, bytes):
+        image = Image.open(io.BytesIO(image))
+    return image
+
+
+def content_hash(image):
+    """
+    SHA-256 of an image's decoded grayscale pixels
+
+    Equal for a re-sent frame or one re-encoded without visible change, but
+    unlike dhash it changes when a single character of on-screen code does,
+    so it is safe as a cache key for answers about screen content.
+
+    Args:
+        image: PIL Image, raw bytes or base64 string
+
+    Returns:
+        hex digest
+    """
+    image = _open(image).convert('L')
+    digest = hashlib.sha256(f"{image.width}x{image.height}:".encode('utf-8'))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def dhash(image, size=8):
+    """
+    Perceptual difference hash of an image
+
+    Small re-encoding differences (JPEG quality, a blinking cursor) leave the
+    hash unchanged or within a few bits, unlike a byte hash. Too coarse to
+    notice edits to on-screen text; use content_hash to tell screens apart.
+
+    Args:
+        image: PIL Image, raw bytes or base64 string
+        size: hash is size*size bits
+
+    Returns:
+        hex string (16 chars for the default 64 bits)
+    """
+    image = _open(image)
+
+    # One extra column so each row yields `size` left/right comparisons
+    pixels = list(image.convert('L').resize((size + 1, size), Image.Resampling.BILINEAR).getdata())
+
+    bits = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+
+    return f"{bits:0{size * size // 4}x}"
+
+
+def hamming(hash_a, hash_b):
+    """Number of differing bits between two hex hashes"""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over hex hashes with Hamming distance
+
+    Finds every stored hash within a radius of a query without comparing
+    against all of them: the triangle inequality prunes whole subtrees.
+    """
+
+    def __init__(self):
+        self.root = None  # (hash, items, {distance: child node})
+        self.size = 0
+
+    def add(self, hash_value, item):
+        """Store item under hash_value"""
+        self.size += 1
+        if self.root is None:
+            self.root = (hash_value, [item], {})
+            return
+
+        node = self.root
+        while True:
+            distance = hamming(hash_value, node[0])
+            if distance == 0:
+                node[1].append(item)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = (hash_value, [item], {})
+                return
+            node = child
+
+    def search(self, hash_value, radius):
+        """
+        Items stored within `radius` bits of hash_value
+
+        Returns:
+            list of (distance, item), nearest first
+        """
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = hamming(hash_value, node[0])
+            if distance <= radius:
+                found.extend((distance, item) for item in node[1])
+            for edge, child in node[2].items():
+                if distance - radius <= edge <= distance + radius:
+                    stack.append(child)
+        found.sort(key=lambda entry: entry[0])
+        return found
@@ -0,0 +1,30 @@
+VIOLATION_KEYWORDS = {
+    'game': ['game', 'minecraft', 'fortnite', 'roblox'],
+    'social_media': ['facebook', 'instagram', 'twitter', 'tiktok'],
+    'video': ['youtube', 'netflix', 'twitch']
+}
+
+
+def detect_violations(processes, urls):
+    """
+    Match process names and URLs against the violation keywords
+
+    Args:
+        processes: process names from the agent's process_update
+        urls: browser URLs from the same update
+
+    Returns:
+        list of (violation_type, detail) in keyword-list order
+    """
+    detected = []
+    for v_type, keywords in VIOLATION_KEYWORDS.items():
+        for process in processes:
+            process_lower = process.lower()
+            if any(keyword in process_lower for keyword in keywords):
+                detected.append((v_type, f"Detected process: {process}"))
+
+        for url in urls:
+            url_lower = url.lower()
+            if any(keyword in url_lower for keyword in keywords):
+                detected.append((v_type, f"Detected URL: {url}"))
+    return detected
@@ -7,21 +7,8 @@ const AIInsights = ({ students, screenData }) => {
   const [insights, setInsights] = useState(null);
 
   const fetchInsights = async () => {
-    const studentsData = {};
-    Object.entries(students).forEach(([id, student]) => {
-      const data = screenData[id];
-      studentsData[id] = {
-        name: student.username,
-        active_time: 0,
-        idle_time: 0,
-        switches: 0,
-        current_app: data?.active_app || 'Unknown',
-        violations: 0,
-        progress: 0
-      };
-    });
-
-    const result = await analyzeClassroom(studentsData);
+    // The server aggregates per-student activity itself
+    const result = await analyzeClassroom();
     if (result) {
       setInsights(result);
     }
@@ -1,12 +1,88 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { useAI } from '../../hooks/useAI';
 import { Code, Check, AlertTriangle, X, Loader2, Zap, FileCode } from 'lucide-react';
 
-const CodeReview = ({ students, screenData }) => {
-  const { checkAllCode, isLoading } = useAI();
+const emptyResults = () => ({
+  correct: [],
+  has_issues: [],
+  errors: [],
+  no_code: [],
+  off_task: []
+});
+
+// Same categories as the server's batch summary
+const addResult = (results, name, analysis) => {
+  const next = { ...results };
+  switch (analysis.status) {
+    case 'correct':
+      next.correct = [...results.correct, name];
+      break;
+    case 'has_issues':
+      next.has_issues = [...results.has_issues, { name, issues: analysis.issues }];
+      break;
+    case 'error':
+      next.errors = [...results.errors, { name, issues: analysis.issues }];
+      break;
+    case 'off_task':
+      next.off_task = [...results.off_task, name];
+      break;
+    default:
+      next.no_code = [...results.no_code, name];
+  }
+  return next;
+};
+
+const CodeReview = ({ socket, students, screenData }) => {
+  const { checkAllCode, cancelCodeCheck, isLoading: isStarting } = useAI();
   const [results, setResults] = useState(null);
   const [selectedLanguage, setSelectedLanguage] = useState('python');
   const [progress, setProgress] = useState({ current: 0, total: 0 });
+  const [jobId, setJobId] = useState(null);
+  const jobRef = useRef(null);
+  // Events that arrive before the POST returns the job id (cached answers)
+  const earlyRef = useRef(null);
+
+  const isLoading = isStarting || jobId !== null;
+
+  // Per-student results stream in while the job runs
+  useEffect(() => {
+    if (!socket) return;
+
+    const handleResult = (data) => {
+      if (data.job_id !== jobRef.current) {
+        earlyRef.current?.push(['result', data]);
+        return;
+      }
+      applyResult(data);
+    };
+
+    const handleComplete = (data) => {
+      if (data.job_id !== jobRef.current) {
+        earlyRef.current?.push(['complete', data]);
+        return;
+      }
+      applyComplete(data);
+    };
+
+    socket.on('code_check_result', handleResult);
+    socket.on('code_check_complete', handleComplete);
+    return () => {
+      socket.off('code_check_result', handleResult);
+      socket.off('code_check_complete', handleComplete);
+    };
+  }, [socket]);
+
+  const applyResult = (data) => {
+    setResults(prev => addResult(prev || emptyResults(), data.name, data.analysis));
+    setProgress({ current: data.checked, total: data.total });
+  };
+
+  const applyComplete = (data) => {
+    jobRef.current = null;
+    setJobId(null);
+    setResults(data.results);
+    setProgress({ current: 0, total: 0 });
+  };
 
   const handleCheckCode = async () => {
     // Prepare student screens for AI analysis
@@ -15,7 +91,12 @@ const CodeReview = ({ students, screenData }) => {
       .map(([id, student]) => ({
         id,
         name: student.username,
-        screenshot: screenData[id].image
+        screenshot: screenData[id].image,
+        // Lets the server crop to the active window before analysis
+        window_rect: screenData[id].window_rect,
+        // Obvious off-task screens are decided from these without the AI
+        active_app: screenData[id].active_app,
+        active_window: screenData[id].active_window
       }));
 
     if (studentsToCheck.length === 0) {
@@ -23,23 +104,29 @@ const CodeReview = ({ students, screenData }) => {
       return;
     }
 
-    // Set progress
+    setResults(emptyResults());
     setProgress({ current: 0, total: studentsToCheck.length });
 
-    // Simulate progress updates (since batch processing happens server-side)
-    const progressInterval = setInterval(() => {
-      setProgress(prev => ({
-        ...prev,
-        current: Math.min(prev.current + 1, prev.total)
-      }));
-    }, 2000);
+    earlyRef.current = [];
+    const job = await checkAllCode(studentsToCheck, selectedLanguage, socket?.id);
+    const early = earlyRef.current;
+    earlyRef.current = null;
 
-    try {
-      const analysisResults = await checkAllCode(studentsToCheck, selectedLanguage);
-      setResults(analysisResults);
-    } finally {
-      clearInterval(progressInterval);
+    if (!job) {
       setProgress({ current: 0, total: 0 });
+      return;
+    }
+
+    jobRef.current = job.job_id;
+    setJobId(job.job_id);
+    early
+      .filter(([, data]) => data.job_id === job.job_id)
+      .forEach(([kind, data]) => (kind === 'result' ? applyResult(data) : applyComplete(data)));
+  };
+
+  const handleCancel = async () => {
+    if (jobId) {
+      await cancelCodeCheck(jobId);
     }
   };
 
@@ -112,6 +199,15 @@ const CodeReview = ({ students, screenData }) => {
             <option value="rust">Rust</option>
           </select>
 
+          {jobId && (
+            <button
+              onClick={handleCancel}
+              className="px-4 py-3 border border-gray-300 text-gray-700 rounded-lg hover:bg-gray-50 font-semibold"
+            >
+              Cancel
+            </button>
+          )}
+
           <button
             onClick={handleCheckCode}
             disabled={isLoading || Object.keys(students).length === 0}
@@ -132,9 +228,9 @@ const CodeReview = ({ students, screenData }) => {
         </div>
       </div>
 
-      {/* Loading State with Progress */}
+      {/* Progress; results below fill in as each student is checked */}
       {isLoading && (
-        <div className="text-center py-12 bg-blue-50 rounded-lg border-2 border-blue-200">
+        <div className="text-center py-12 mb-6 bg-blue-50 rounded-lg border-2 border-blue-200">
           <div className="inline-flex items-center gap-3 mb-4">
             <Loader2 className="w-8 h-8 animate-spin text-blue-600" />
             <div className="text-left">
@@ -155,14 +251,14 @@ const CodeReview = ({ students, screenData }) => {
                   style={{ width: `${(progress.current / progress.total) * 100}%` }}
                 />
               </div>
-              <p className="text-xs text-blue-600 mt-2">This may take 10-30 seconds</p>
+              <p className="text-xs text-blue-600 mt-2">Results appear below as each student is checked</p>
             </div>
           )}
         </div>
       )}
 
       {/* Results */}
-      {results && !isLoading && (
+      {results && (
         <div className="space-y-4">
           {/* Summary Cards */}
           <div className="grid grid-cols-5 gap-3">
@@ -8,7 +8,7 @@ import PollCreator from '../Interactive/PollCreator';
 import { Users, Brain, Lock, BarChart3, Code } from 'lucide-react';
 
 const Dashboard = () => {
-  const { students, screenData, isConnected } = useWebSocket();
+  const { socket, students, screenData, isConnected, subscribeScreens } = useWebSocket();
   const [activeTab, setActiveTab] = useState('monitor');
 
   const tabs = [
@@ -76,7 +76,12 @@ const Dashboard = () => {
       {/* Main Content */}
       <main className="max-w-7xl mx-auto px-4 sm:px-6 lg:px-8 py-6">
         {activeTab === 'monitor' && (
-          <ScreenGrid students={students} screenData={screenData} isConnected={isConnected} />
+          <ScreenGrid
+            students={students}
+            screenData={screenData}
+            isConnected={isConnected}
+            subscribeScreens={subscribeScreens}
+          />
         )}
 
         {activeTab === 'ai' && (
@@ -84,7 +89,7 @@ const Dashboard = () => {
         )}
 
         {activeTab === 'codereview' && (
-          <CodeReview students={students} screenData={screenData} />
+          <CodeReview socket={socket} students={students} screenData={screenData} />
         )}
 
         {activeTab === 'controls' && (
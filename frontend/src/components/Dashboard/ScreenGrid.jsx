@@ -1,10 +1,23 @@
-import React, { useState, useMemo } from 'react';
+import React, { useState, useMemo, useEffect, useRef, useCallback } from 'react';
 import StudentCard from './StudentCard';
 import { Loader2, Users, AlertCircle } from 'lucide-react';
 
-const ScreenGrid = ({ students, screenData, isConnected }) => {
+// Approximate size of a StudentCard preview, used as the requested display size
+const CARD_WIDTH = 480;
+const CARD_HEIGHT = 270;
+// Start streaming a card shortly before it scrolls into view
+const VIEWPORT_MARGIN = '200px 0px';
+
+const ScreenGrid = ({ students, screenData, isConnected, subscribeScreens }) => {
   const [filter, setFilter] = useState('all');
   const [searchTerm, setSearchTerm] = useState('');
+  // Ids of the cards currently in (or near) the viewport; null = unknown
+  const [inView, setInView] = useState(() => (
+    typeof IntersectionObserver === 'undefined' ? null : new Set()
+  ));
+  const observerRef = useRef(null);
+  const cardsRef = useRef(new Map()); // id -> card element
+  const cardRefs = useRef(new Map()); // id -> stable ref callback
 
   const filteredStudents = useMemo(() => {
     let filtered = Object.entries(students);
@@ -19,6 +32,68 @@ const ScreenGrid = ({ students, screenData, isConnected }) => {
     return filtered;
   }, [students, searchTerm]);
 
+  // Track which cards are on screen as the teacher scrolls
+  useEffect(() => {
+    if (typeof IntersectionObserver === 'undefined') return;
+
+    const observer = new IntersectionObserver((entries) => {
+      setInView((previous) => {
+        let next = previous;
+        entries.forEach((entry) => {
+          const id = entry.target.dataset.studentId;
+          if (entry.isIntersecting !== next.has(id)) {
+            if (next === previous) next = new Set(previous);
+            if (entry.isIntersecting) next.add(id);
+            else next.delete(id);
+          }
+        });
+        return next;
+      });
+    }, { rootMargin: VIEWPORT_MARGIN });
+
+    observerRef.current = observer;
+    cardsRef.current.forEach((element) => observer.observe(element));
+    return () => {
+      observer.disconnect();
+      observerRef.current = null;
+    };
+  }, []);
+
+  const cardRef = useCallback((id) => {
+    let callback = cardRefs.current.get(id);
+    if (!callback) {
+      callback = (element) => {
+        const observer = observerRef.current;
+        const previous = cardsRef.current.get(id);
+        if (previous && observer) observer.unobserve(previous);
+
+        if (element) {
+          cardsRef.current.set(id, element);
+          if (observer) observer.observe(element);
+        } else {
+          cardsRef.current.delete(id);
+        }
+      };
+      cardRefs.current.set(id, callback);
+    }
+    return callback;
+  }, []);
+
+  // Tell the server which screens are visible so it only streams those
+  const visibleIds = filteredStudents
+    .filter(([id]) => !inView || inView.has(id))
+    .map(([id]) => id)
+    .join(',');
+  useEffect(() => {
+    if (!subscribeScreens || !isConnected) return;
+    subscribeScreens(visibleIds ? visibleIds.split(',') : [], CARD_WIDTH, CARD_HEIGHT);
+  }, [visibleIds, isConnected, subscribeScreens]);
+
+  // Other tabs still need every screen
+  useEffect(() => {
+    return () => subscribeScreens && subscribeScreens(null);
+  }, [subscribeScreens]);
+
   if (!isConnected) {
     return (
       <div className="flex items-center justify-center h-96 bg-white rounded-lg shadow">
@@ -56,12 +131,13 @@ const ScreenGrid = ({ students, screenData, isConnected }) => {
       ) : (
         <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 xl:grid-cols-4 gap-4">
           {filteredStudents.map(([id, student]) => (
-            <StudentCard
-              key={id}
-              studentId={id}
-              student={student}
-              screenData={screenData[id]}
-            />
+            <div key={id} ref={cardRef(id)} data-student-id={id}>
+              <StudentCard
+                studentId={id}
+                student={student}
+                screenData={screenData[id]}
+              />
+            </div>
           ))}
         </div>
       )}
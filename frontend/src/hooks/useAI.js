@@ -7,14 +7,12 @@ export const useAI = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState(null);
 
-  const analyzeClassroom = useCallback(async (studentsData) => {
+  const analyzeClassroom = useCallback(async () => {
     setIsLoading(true);
     setError(null);
 
     try {
-      const response = await axios.post(`${API_BASE_URL}/api/ai/classroom-insights`, {
-        students: studentsData
-      }, {
+      const response = await axios.post(`${API_BASE_URL}/api/ai/classroom-insights`, {}, {
         timeout: 15000
       });
 
@@ -29,14 +27,16 @@ export const useAI = () => {
     }
   }, []);
 
-  const checkAllCode = useCallback(async (students, language = 'python') => {
+  // Starts a background job; results arrive on the socket with id `sid`
+  const checkAllCode = useCallback(async (students, language = 'python', sid = null) => {
     setIsLoading(true);
     setError(null);
 
     try {
       const response = await axios.post(`${API_BASE_URL}/api/ai/check-all-code`, {
         students,
-        language
+        language,
+        sid
       }, {
         timeout: 30000
       });
@@ -52,6 +52,18 @@ export const useAI = () => {
     }
   }, []);
 
+  const cancelCodeCheck = useCallback(async (jobId) => {
+    try {
+      const response = await axios.delete(`${API_BASE_URL}/api/ai/check-all-code/${jobId}`, {
+        timeout: 10000
+      });
+      return response.data;
+    } catch (err) {
+      console.error('Cancel code review error:', err);
+      return null;
+    }
+  }, []);
+
   const generateMessage = useCallback(async (studentContext) => {
     setIsLoading(true);
     setError(null);
@@ -76,6 +88,7 @@ export const useAI = () => {
   return {
     analyzeClassroom,
     checkAllCode,
+    cancelCodeCheck,
     generateMessage,
     isLoading,
     error
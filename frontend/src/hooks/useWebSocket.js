@@ -1,4 +1,4 @@
-import { useState, useEffect, useCallback } from 'react';
+import { useState, useEffect, useCallback, useRef } from 'react';
 import { io } from 'socket.io-client';
 
 const SERVER_URL = import.meta.env.VITE_API_URL || 'http://localhost:5000';
@@ -8,6 +8,8 @@ export const useWebSocket = () => {
   const [isConnected, setIsConnected] = useState(false);
   const [students, setStudents] = useState({});
   const [screenData, setScreenData] = useState({});
+  // Roster epoch/version we are current as of; sent on reconnect to get only missed deltas
+  const rosterRef = useRef({ epoch: null, version: 0, syncing: false });
 
   useEffect(() => {
     // Create socket connection
@@ -23,9 +25,12 @@ export const useWebSocket = () => {
       console.log('✅ Connected to server');
       setIsConnected(true);
 
-      // Register as teacher
+      // Register as teacher; the reply is a snapshot or the missed deltas
+      rosterRef.current.syncing = true;
       newSocket.emit('register_teacher', {
-        name: 'Teacher'
+        name: 'Teacher',
+        roster_epoch: rosterRef.current.epoch,
+        roster_version: rosterRef.current.version
       });
     });
 
@@ -35,25 +40,58 @@ export const useWebSocket = () => {
     });
 
     // Student events
+    const applyDelta = (prev, delta) => {
+      switch (delta.op) {
+        case 'join':
+          return { ...prev, [delta.student.id]: delta.student };
+        case 'leave':
+          if (!prev[delta.id]) return prev;
+          return {
+            ...prev,
+            [delta.id]: { ...prev[delta.id], status: 'offline', locked: false, last_seen: delta.last_seen }
+          };
+        case 'status':
+          if (!prev[delta.id]) return prev;
+          return { ...prev, [delta.id]: { ...prev[delta.id], ...delta.changes } };
+        default:
+          return prev;
+      }
+    };
+
     newSocket.on('student_list', (data) => {
       console.log('📋 Received student list:', data.students);
       const studentsMap = {};
       data.students.forEach(student => {
         studentsMap[student.id] = student;
       });
+      rosterRef.current = { epoch: data.epoch, version: data.version, syncing: false };
       setStudents(studentsMap);
     });
 
-    newSocket.on('student_connected', (data) => {
-      console.log('👤 Student connected:', data.username);
-      setStudents(prev => ({
-        ...prev,
-        [data.user_id]: {
-          id: data.user_id,
-          username: data.username,
-          status: 'online'
-        }
-      }));
+    // Deltas missed while disconnected
+    newSocket.on('roster_deltas', (data) => {
+      const roster = rosterRef.current;
+      const missed = data.deltas.filter(delta => delta.version > roster.version);
+      rosterRef.current = { epoch: data.epoch, version: Math.max(roster.version, data.version), syncing: false };
+      setStudents(prev => missed.reduce(applyDelta, prev));
+    });
+
+    newSocket.on('roster_delta', (delta) => {
+      const roster = rosterRef.current;
+      if (roster.syncing) return;  // the pending sync reply covers it
+      if (delta.epoch !== roster.epoch || delta.version > roster.version + 1) {
+        // Missed something: ask for the gap (or a new snapshot)
+        roster.syncing = true;
+        newSocket.emit('sync_roster', { roster_epoch: roster.epoch, roster_version: roster.version });
+        return;
+      }
+      if (delta.version <= roster.version) return;
+
+      if (delta.op === 'join') {
+        console.log('👤 Student connected:', delta.student.username);
+      }
+      rosterRef.current = { ...roster, version: delta.version };
+      setStudents(prev => applyDelta(prev, delta));
     });
 
     newSocket.on('screen_data', (data) => {
@@ -63,6 +101,7 @@ export const useWebSocket = () => {
           image: data.image,
           active_window: data.active_window,
           active_app: data.active_app,
+          window_rect: data.window_rect,
           timestamp: data.timestamp
         }
       }));
@@ -104,6 +143,17 @@ export const useWebSocket = () => {
     }
   }, [socket]);
 
+  // Only receive screens for the students currently on screen (null = all)
+  const subscribeScreens = useCallback((studentIds, width, height) => {
+    if (socket) {
+      socket.emit('subscribe_screens', {
+        students: studentIds,
+        width,
+        height
+      });
+    }
+  }, [socket]);
+
   return {
     socket,
     isConnected,
@@ -111,6 +161,7 @@ export const useWebSocket = () => {
     screenData,
     sendMessage,
     lockScreens,
-    unlockScreens
+    unlockScreens,
+    subscribeScreens
   };
 };
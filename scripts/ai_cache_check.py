@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+AI cache key smoke test.
+
+Draws the same editor screen twice, the second time with one character
+of code changed, and checks that AICache.key tells them apart (a
+perceptual hash does not: both screens get the same dHash) while the
+same pixels re-encoded still map to one entry.
+
+    python scripts/ai_cache_check.py
+"""
+
+import base64
+import io
+import os
+import sys
+import warnings
+
+warnings.filterwarnings('ignore')
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from PIL import Image, ImageDraw  # noqa: E402
+
+from services.ai_cache import AICache  # noqa: E402
+from utils.phash import dhash  # noqa: E402
+
+CODE = ['def total(items):', '    result = 0', '    for value in items:', '        result += value',
+        '    return result']
+
+
+def screen(lines, compress_level=6):
+    """Base64 PNG of a dark editor showing `lines`"""
+    image = Image.new('RGB', (1280, 720), (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((40, 40 + 16 * i), line, fill=(220, 220, 170))
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', compress_level=compress_level)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def main():
+    cache = AICache('check-model', ttls={})
+    inputs = {'student': 'ada', 'language': 'python'}
+
+    original = screen(CODE)
+    edited = screen(CODE[:3] + ['        result -= value'] + CODE[4:])
+    reencoded = screen(CODE, compress_level=1)
+
+    def key(image):
+        return cache.key('code_check', 1, inputs, image)
+
+    print(f"dHash original {dhash(original)}, edited {dhash(edited)}")
+    failures = []
+    if key(original) == key(edited):
+        failures.append('a one-character edit maps to the cached answer for the old screen')
+    if key(original) != key(reencoded):
+        failures.append('the same pixels re-encoded miss the cache')
+    if cache.key('code_check_mosaic', 1, inputs, [original, reencoded]) == \
+            cache.key('code_check_mosaic', 1, inputs, [original, edited]):
+        failures.append('a mosaic with an edited tile maps to the cached answer for the old tiles')
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+AI service throughput and tail latency against the local Gemini stand-in.
+
+Starts scripts/mock_gemini_server.py with the given latency, error rate and
+quota, points ai_service at it (HTTP backend) and drives analyze_classroom,
+check_code_on_screen and batch_check_code from several client threads.
+Every call uses distinct inputs, so the AI cache never answers. Reports
+calls per second, latency percentiles and how many calls fell back to the
+rule-based/no-analysis answer.
+
+    python scripts/bench_ai_backend.py [--calls 40] [--concurrency 8] [--latency 800] [--error-rate 0.05]
+"""
+
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from bench_code_check import ROOT, free_port, screenshot
+
+warnings.filterwarnings('ignore')
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def classroom_data(call):
+    rng = random.Random(call)
+    return {
+        f"u{call}_{i}": {
+            'name': f"student_{i}",
+            'active_time': round(rng.uniform(0, 10), 1),
+            'idle_time': round(rng.uniform(0, 5), 1),
+            'switches': rng.randint(0, 12),
+            'current_app': rng.choice(['code', 'chrome', 'youtube', 'terminal']),
+            'violations': rng.choice([0, 0, 0, 1, 2])
+        }
+        for i in range(25)
+    }
+
+
+def make_ops(ai_service, images, batch_students):
+    """op name -> fn(call) returning True when the call fell back"""
+
+    def classroom(call):
+        return 'class_mood' not in ai_service.analyze_classroom(classroom_data(call))
+
+    def code(call):
+        analysis = ai_service.check_code_on_screen(images[call % len(images)], f"student_{call}")
+        return analysis['status'] == 'no_analysis'
+
+    def batch(call):
+        students = [
+            {'id': i, 'name': f"student_{call}_{i}", 'screenshot': images[(call + i) % len(images)]}
+            for i in range(batch_students)
+        ]
+        results = ai_service.batch_check_code(students)
+        # Students missing from the summary (failed checks count as no_code)
+        return sum(len(items) for items in results.values()) < batch_students
+
+    return {'classroom': classroom, 'code': code, 'batch': batch}
+
+
+def run(fn, calls, concurrency):
+    latencies = []
+    fallbacks = 0
+
+    def one(call):
+        started = time.perf_counter()
+        fell_back = fn(call)
+        return time.perf_counter() - started, fell_back
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for latency, fell_back in pool.map(one, range(calls)):
+            latencies.append(latency)
+            fallbacks += fell_back
+    return time.perf_counter() - started, latencies, fallbacks
+
+
+def main(args):
+    port = free_port()
+    endpoint = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'scripts', 'mock_gemini_server.py'),
+        '--port', str(port), '--latency', str(args.latency), '--jitter', str(args.jitter),
+        '--error-rate', str(args.error_rate), '--rpm', str(args.rpm)
+    ], stdout=subprocess.DEVNULL)
+
+    os.environ.update({
+        'GEMINI_API_ENDPOINT': endpoint,
+        'AI_BACKEND': 'http',
+        'AI_RATE_LIMIT': str(args.quota),
+        'AI_SCHEDULER_WORKERS': str(args.workers),
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        # Random mock statuses must not train (or be answered by) the task pre-classifier
+        'AI_PRECLASSIFY': 'false',
+        'AI_PRECLASSIFY_MODEL_PATH': ''
+    })
+    sys.path.append(os.path.join(ROOT, 'backend'))
+
+    try:
+        for _ in range(50):
+            try:
+                requests.get(f"{endpoint}/stats", timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+
+        started = time.perf_counter()
+        from services.ai_service import ai_service
+        import_time = time.perf_counter() - started
+
+        images = [screenshot(i, 'backend') for i in range(32)]
+        ops = make_ops(ai_service, images, args.batch_students)
+
+        print(f"backend {ai_service.backend.name}, ai_service import {import_time * 1000:.0f} ms")
+        print(f"stand-in: latency {args.latency:.0f} ms + exp({args.jitter:.0f} ms), errors {args.error_rate:.0%}, "
+              f"rpm {args.rpm or 'unlimited'}; scheduler: {args.workers} workers, quota {args.quota} RPM\n")
+        print(f"{'op':<10} {'calls':>5} {'fallback':>8} {'calls/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+              f"{'p99 ms':>8} {'max ms':>8} {'requests':>8}")
+
+        for name in args.ops.split(','):
+            requests.post(f"{endpoint}/stats/reset")
+            elapsed, latencies, fallbacks = run(ops[name], args.calls, args.concurrency)
+            stats = requests.get(f"{endpoint}/stats").json()
+            ms = [latency * 1000 for latency in latencies]
+            print(f"{name:<10} {len(ms):>5} {fallbacks:>8} {len(ms) / elapsed:>8.2f} {percentile(ms, 50):>8.0f} "
+                  f"{percentile(ms, 95):>8.0f} {percentile(ms, 99):>8.0f} {max(ms):>8.0f} {stats.get('requests', 0):>8}")
+
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', default='classroom,code,batch', help='comma separated: classroom, code, batch')
+    parser.add_argument('--calls', type=int, default=40, help='calls per operation')
+    parser.add_argument('--concurrency', type=int, default=8, help='client threads')
+    parser.add_argument('--batch-students', type=int, default=8, help='students per batch_check_code call')
+    parser.add_argument('--workers', type=int, default=4, help='AI scheduler workers (concurrent model calls)')
+    parser.add_argument('--quota', type=int, default=6000, help='AI_RATE_LIMIT the scheduler paces to')
+    parser.add_argument('--latency', type=float, default=800, help='stand-in base latency in ms')
+    parser.add_argument('--jitter', type=float, default=200, help='stand-in mean extra latency in ms')
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rpm', type=int, default=0, help='stand-in quota before 429 (0 = unlimited)')
+    main(parser.parse_args())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Whole-class code check benchmark: one request per student vs mosaic batching,
+each with and without grouping identical screens.
+
+Starts scripts/mock_gemini_server.py, points ai_service at it and runs
+batch_check_code for a synthetic class in both modes, paced by the real
+quota scheduler. Reports model requests per class (from the stand-in's
+counters), single-screen fallbacks, results shared within a group of
+identical screens and end-to-end time. --template-share gives that
+fraction of the class the same screen; half of them then change one
+character, which must not be grouped.
+
+    python scripts/bench_code_check.py [--students 30] [--rpm 15] [--tiles 4] [--template-share 0.6]
+"""
+
+import argparse
+import base64
+import io
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import requests
+
+warnings.filterwarnings('ignore')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def screenshot(student, salt, edit=None):
+    """A 1280x720 'editor' with a few lines of code unique to the student"""
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGB', (1280, 720), (30, 30, 30))
+    draw = ImageDraw.Draw(img)
+    for line in range(28):
+        text = f"{line + 1:3d}  total_{salt}_{student} = compute({line} * {student})"
+        if edit is not None and line == 12:
+            text += f" + {edit}"
+        draw.text((40, 20 + line * 24), text, fill=(220, 220, 220))
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=60)
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def main(args):
+    port = free_port()
+    endpoint = f"http://127.0.0.1:{port}"
+    server = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'scripts', 'mock_gemini_server.py'),
+        '--port', str(port), '--latency', str(args.latency),
+        '--low-confidence-rate', str(args.low_confidence_rate)
+    ], stdout=subprocess.DEVNULL)
+
+    os.environ.update({
+        'GEMINI_API_ENDPOINT': endpoint,
+        'AI_RATE_LIMIT': str(args.rpm),
+        'AI_MOSAIC_TILES': str(args.tiles),
+        'DATABASE_URL': f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}",
+        # Random mock statuses must not train (or be answered by) the task pre-classifier
+        'AI_PRECLASSIFY': 'false',
+        'AI_PRECLASSIFY_MODEL_PATH': ''
+    })
+    sys.path.append(os.path.join(ROOT, 'backend'))
+
+    try:
+        for _ in range(50):
+            try:
+                requests.get(f"{endpoint}/stats", timeout=1)
+                break
+            except requests.RequestException:
+                time.sleep(0.1)
+
+        from services.ai_service import ai_service
+        from services.ai_scheduler import ai_scheduler
+        from services.security_service import RateLimiter
+        from services.screen_clusters import screen_clusterer
+
+        print(f"{args.students} students, quota {args.rpm} RPM, stand-in latency {args.latency:.0f} ms, "
+              f"{args.tiles} tiles per mosaic, {args.template_share:.0%} on the template screen\n")
+        print(f"{'mode':<16} {'requests':>8} {'fallbacks':>9} {'shared':>6} {'errors':>6} {'seconds':>8}")
+
+        template = int(args.students * args.template_share)
+        for mode, cluster in (('single', False), ('single+cluster', True), ('mosaic', False), ('mosaic+cluster', True)):
+            # Fresh quota and distinct screens so no run helps another
+            ai_scheduler.limiter = RateLimiter(args.rpm, 60, burst=1)
+            students = [
+                {'id': i, 'name': f"student_{i}", 'screenshot': screenshot(i, mode)}
+                if i >= template else
+                {'id': i, 'name': f"student_{i}", 'screenshot': screenshot('template', mode, edit=i if i % 2 else None)}
+                for i in range(args.students)
+            ]
+            requests.post(f"{endpoint}/stats/reset")
+            saved_before = screen_clusterer.stats()['checks_saved']
+
+            started = time.perf_counter()
+            results = ai_service.batch_check_code(students, mosaic=mode.startswith('mosaic'), cluster=cluster)
+            elapsed = time.perf_counter() - started
+
+            stats = requests.get(f"{endpoint}/stats").json()
+            fallbacks = stats.get('code_check', 0) if mode.startswith('mosaic') else 0
+            shared = screen_clusterer.stats()['checks_saved'] - saved_before
+            errors = stats.get('errors', 0) + stats.get('rate_limited', 0)
+            assert sum(len(v) for v in results.values()) == args.students
+            print(f"{mode:<16} {stats.get('requests', 0):>8} {fallbacks:>9} {shared:>6} {errors:>6} {elapsed:>8.1f}")
+
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--rpm', type=int, default=15)
+    parser.add_argument('--tiles', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=800, help='stand-in base latency in ms')
+    parser.add_argument('--low-confidence-rate', type=float, default=0.1)
+    parser.add_argument('--template-share', type=float, default=0.0, help='fraction of students on one shared screen')
+    main(parser.parse_args())
@@ -0,0 +1,348 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the hot helpers, with stored baselines.
+
+  compress_image          agent: 1920x1080 PNG capture -> 1280x720 JPEG
+  compress_base64         server: ImageCompressor.compress_base64, same input
+  batch_compress          server: ImageCompressor.batch_compress, 8 captures
+  rate_limiter_allow      RateLimiter.allow over 1000 sids at their limit
+  detect_violations       keyword check of one process_update
+  user_to_dict_roster     User.to_dict for a 300-student roster
+  activity_insert         Activity add + commit on SQLite (one screen_update)
+
+Inputs are generated from fixed seeds, so every run and every machine
+times the same corpus; its fingerprint is stored with the baseline. Each
+benchmark is calibrated to run at least --min-time per repeat and the
+fastest repeat is kept, which is the least noisy estimate of what the code
+costs.
+
+    python scripts/bench_micro.py                    # run and compare with the baseline
+    python scripts/bench_micro.py --save             # record a new baseline
+    python scripts/bench_micro.py --check            # exit 1 on a >20% regression
+    python scripts/bench_micro.py --check --threshold 0.1 -k compress
+
+Baselines are only comparable on the machine that recorded them, so none
+is committed: save one per machine (or CI runner type) with --baseline.
+--check refuses a baseline recorded on a different machine().
+"""
+
+import argparse
+import base64
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+warnings.filterwarnings('ignore')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(ROOT, 'scripts', 'bench_baseline.json')
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.append(os.path.join(ROOT, 'backend'))
+
+WORDS = ['def', 'return', 'for', 'in', 'range', 'print', 'if', 'else', 'import', 'class',
+         'self', 'total', 'items', 'value', 'result', 'append', 'len', 'None', 'True']
+PROCESSES = ['python', 'code', 'chrome', 'explorer', 'svchost', 'dwm', 'spotify', 'discord', 'teams',
+             'onedrive', 'searchapp', 'runtimebroker', 'ctfmon', 'steam', 'zoom', 'slack', 'firefox']
+
+
+def load_agent_compression():
+    """agent/utils/compression.py; its utils.logger import resolves to the backend copy, same API"""
+    spec = importlib.util.spec_from_file_location(
+        'agent_compression', os.path.join(ROOT, 'agent', 'utils', 'compression.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.compress_image
+
+
+def make_capture(seed, size=(1920, 1080)):
+    """Deterministic editor-like full HD capture, base64 PNG as the agent sends it"""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    width, height = size
+    image = Image.new('RGB', size, (30, 30, 30))
+    draw = ImageDraw.Draw(image)
+    sidebar = width // 6
+    draw.rectangle([0, 0, sidebar, height], fill=(37, 37, 38))
+    for y in range(8, height, 14):
+        draw.text((8, y), rng.choice(WORDS) + '.py', fill=(200, 200, 200))
+    for y in range(8, height, 16):
+        x = sidebar + 12 + 24 * rng.randint(0, 3)
+        for _ in range(rng.randint(1, 9)):
+            word = rng.choice(WORDS)
+            draw.text((x, y), word, fill=rng.choice([(86, 156, 214), (206, 145, 120), (220, 220, 170)]))
+            x += 7 * len(word) + 7
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def make_process_updates(count=200, seed=1):
+    """process_update payloads: ~60 processes, a few URLs, 1 in 10 off task"""
+    rng = random.Random(seed)
+    updates = []
+    for i in range(count):
+        processes = [rng.choice(PROCESSES) + rng.choice(['', '.exe', '-helper']) for _ in range(60)]
+        if i % 10 == 0:
+            processes.append('Minecraft.Windows.exe')
+        urls = [f"https://docs.python.org/3/library/{rng.choice(WORDS)}.html" for _ in range(3)]
+        if i % 15 == 0:
+            urls.append('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+        updates.append((processes, urls))
+    return updates
+
+
+class Corpus:
+    def __init__(self):
+        self.captures = [make_capture(seed) for seed in range(8)]
+        self.process_updates = make_process_updates()
+        self.sids = [f"sid-{i}" for i in range(1000)]
+
+    def fingerprint(self):
+        digest = hashlib.sha256()
+        for capture in self.captures:
+            digest.update(capture.encode('ascii'))
+        digest.update(json.dumps(self.process_updates).encode('utf-8'))
+        return digest.hexdigest()[:16]
+
+
+# name -> (setup(corpus) returning (fn, operations per call), max repeats)
+BENCHMARKS = {}
+
+
+def benchmark(name, repeats=None):
+    def decorator(setup):
+        BENCHMARKS[name] = (setup, repeats)
+        return setup
+    return decorator
+
+
+@benchmark('compress_image')
+def bench_compress_image(corpus):
+    compress_image = load_agent_compression()
+    capture = corpus.captures[0]
+    return (lambda: compress_image(capture, quality=60, max_width=1280, max_height=720)), 1
+
+
+@benchmark('compress_base64')
+def bench_compress_base64(corpus):
+    from services.compression_service import ImageCompressor
+
+    compressor = ImageCompressor(quality=60, max_width=1280, max_height=720)
+    capture = corpus.captures[0]
+    return (lambda: compressor.compress_base64(capture)), 1
+
+
+@benchmark('batch_compress', repeats=3)
+def bench_batch_compress(corpus):
+    from services.compression_service import ImageCompressor
+
+    compressor = ImageCompressor(quality=60, max_width=1280, max_height=720)
+    return (lambda: compressor.batch_compress(corpus.captures)), len(corpus.captures)
+
+
+@benchmark('rate_limiter_allow')
+def bench_rate_limiter(corpus):
+    from services.security_service import RateLimiter
+
+    limiter = RateLimiter(max_calls=100, window_seconds=60)
+    sids = corpus.sids
+    for sid in sids:
+        for _ in range(limiter.max_calls):
+            limiter.allow(sid)
+
+    def run():
+        allow = limiter.allow
+        for sid in sids:
+            allow(sid)
+    return run, len(sids)
+
+
+@benchmark('detect_violations')
+def bench_detect_violations(corpus):
+    from utils.violations import detect_violations
+
+    updates = corpus.process_updates
+
+    def run():
+        for processes, urls in updates:
+            detect_violations(processes, urls)
+    return run, len(updates)
+
+
+@benchmark('user_to_dict_roster')
+def bench_user_to_dict(corpus):
+    from app import app
+    from extensions import db
+    from models.user import User
+
+    with app.app_context():
+        if User.query.filter_by(role='student').count() < 300:
+            for i in range(300):
+                user = User(username=f"bench_student_{i}", email=f"bench_{i}@school.local",
+                            role='student', computer_id=f"bench-{i}")
+                user.set_unusable_password()
+                db.session.add(user)
+            db.session.commit()
+        roster = User.query.filter_by(role='student').limit(300).all()
+        db.session.expunge_all()  # plain objects: time serialization, not lazy loads
+
+    return (lambda: [user.to_dict() for user in roster]), 1
+
+
+@benchmark('activity_insert')
+def bench_activity_insert(corpus):
+    from app import app
+    from extensions import db
+    from models.activity import Activity
+    from models.user import User
+
+    with app.app_context():
+        user_id = User.query.filter_by(role='student').first().id
+    rng = random.Random(2)
+    hashes = [f"{rng.getrandbits(256):064x}" for _ in range(100)]
+
+    def run():
+        with app.app_context():
+            for img_hash in hashes:
+                db.session.add(Activity(user_id=user_id, screenshot_hash=img_hash,
+                                        active_window='main.py - Visual Studio Code', active_app='code'))
+                db.session.commit()
+    return run, len(hashes)
+
+
+def measure(fn, ops, min_time, repeats):
+    """Fastest and median seconds per operation"""
+    fn()  # warm up
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops = max(loops * 2, int(loops * min_time / max(elapsed, 1e-9)))
+
+    timings = [elapsed]
+    for _ in range(repeats - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append(time.perf_counter() - started)
+    per_op = [t / (loops * ops) for t in timings]
+    return min(per_op), statistics.median(per_op)
+
+
+def format_time(seconds):
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('µs', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:7.2f} {unit}"
+    return f"{seconds / 1e-9:7.1f} ns"
+
+
+def machine():
+    return {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+
+
+def main(args):
+    names = [name for name in BENCHMARKS if not args.k or any(k in name for k in args.k)]
+    if not names:
+        raise SystemExit(f"No benchmark matches {args.k}")
+
+    # The backend is imported here, after DATABASE_URL points at a scratch
+    # database, and the database is removed however the run ends
+    workdir = tempfile.mkdtemp(prefix='classguard-bench-')
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    try:
+        from app import app
+        from extensions import db
+
+        with app.app_context():
+            db.create_all()
+        try:
+            run(args, names)
+        finally:
+            with app.app_context():
+                db.session.remove()
+                db.engine.dispose()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def run(args, names):
+    print('Generating corpus...', flush=True)
+    corpus = Corpus()
+    fingerprint = corpus.fingerprint()
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('corpus') != fingerprint:
+            print(f"Warning: baseline corpus {baseline.get('corpus')} != {fingerprint}; "
+                  f"inputs changed, re-save the baseline")
+        if baseline.get('machine') != machine():
+            if args.check:
+                raise SystemExit(f"Baseline {args.baseline} was recorded on {baseline.get('machine')}, "
+                                 f"this is {machine()}; run with --save (and --baseline) for this machine")
+            print(f"Warning: baseline recorded on {baseline.get('machine')}")
+    elif args.check:
+        raise SystemExit(f"No baseline at {args.baseline}; run with --save first")
+
+    print(f"\n{'benchmark':22} {'best/op':>11} {'median/op':>11} {'baseline':>11} {'change':>8}")
+    results, regressions = {}, []
+    for name in names:
+        setup, max_repeats = BENCHMARKS[name]
+        fn, ops = setup(corpus)
+        repeats = min(args.repeats, max_repeats or args.repeats)
+        best, median = measure(fn, ops, args.min_time, repeats)
+        results[name] = {'seconds_per_op': best, 'median_seconds_per_op': median}
+
+        line = f"{name:22} {format_time(best):>11} {format_time(median):>11}"
+        base = (baseline or {}).get('benchmarks', {}).get(name)
+        if base:
+            change = best / base['seconds_per_op'] - 1
+            flag = '  REGRESSION' if change > args.threshold else ''
+            if flag:
+                regressions.append((name, change))
+            line += f" {format_time(base['seconds_per_op']):>11} {change:+7.1%}{flag}"
+        print(line, flush=True)
+
+    if args.save:
+        saved = (baseline or {}).get('benchmarks', {}) if args.k else {}
+        saved.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': machine(), 'corpus': fingerprint, 'benchmarks': saved}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nBaseline saved to {args.baseline}")
+
+    if args.check:
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: "
+                  + ', '.join(f"{name} {change:+.1%}" for name, change in regressions))
+            sys.exit(1)
+        print(f"\nNo regressions over {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', action='append', help='only benchmarks whose name contains this (repeatable)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save', action='store_true', help='store these results as the baseline')
+    parser.add_argument('--check', action='store_true', help='exit 1 if any benchmark regressed')
+    parser.add_argument('--threshold', type=float, default=0.2, help='allowed slowdown for --check (0.2 = 20%%)')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds per repeat')
+    parser.add_argument('--repeats', type=int, default=5)
+    main(parser.parse_args())
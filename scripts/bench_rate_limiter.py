@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Rate limiter benchmark: GCRA RateLimiter vs the previous list-of-datetimes
+sliding window.
+
+Scenarios mirror the screenshot limiter (100 calls / 60 s per sid):
+  hot-key   one sid hammering allow() at its limit
+  many-keys 1000 sids round-robin (a full building of agents)
+  threads   8 threads x 1000 sids, to show lock contention
+
+    python scripts/bench_rate_limiter.py [--ops 200000] [--redis-url redis://...]
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from services.security_service import RateLimiter, RedisRateLimiter  # noqa: E402
+
+
+class LegacyRateLimiter:
+    """The sliding-window limiter RateLimiter replaced, kept for comparison"""
+
+    def __init__(self, max_calls, window_seconds):
+        self.max_calls = max_calls
+        self.window = window_seconds
+        self.calls = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def allow(self, key):
+        with self.lock:
+            now = datetime.now()
+            cutoff = now - timedelta(seconds=self.window)
+            self.calls[key] = [ts for ts in self.calls[key] if ts > cutoff]
+            if len(self.calls[key]) < self.max_calls:
+                self.calls[key].append(now)
+                return True
+            return False
+
+
+def run_ops(limiter, keys, ops):
+    n = len(keys)
+    for i in range(ops):
+        limiter.allow(keys[i % n])
+
+
+def bench(name, factory, keys, ops, threads=1):
+    limiter = factory()
+    # Prime every key to its limit so the steady state is measured
+    for key in keys:
+        for _ in range(limiter.max_calls):
+            limiter.allow(key)
+
+    per_thread = ops // threads
+    workers = [threading.Thread(target=run_ops, args=(limiter, keys, per_thread)) for _ in range(threads)]
+    started = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - started
+
+    total = per_thread * threads
+    print(f"  {name:<8} {total / elapsed:>12,.0f} ops/s  {elapsed / total * 1e6:>8.2f} us/op")
+
+
+def memory_per_key(factory, keys):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    limiter = factory()
+    for key in keys:
+        for _ in range(limiter.max_calls):
+            limiter.allow(key)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    return size / len(keys)
+
+
+def main(args):
+    max_calls, window = 100, 60
+    factories = {
+        'legacy': lambda: LegacyRateLimiter(max_calls, window),
+        'gcra': lambda: RateLimiter(max_calls, window),
+    }
+    if args.redis_url:
+        import redis
+        client = redis.Redis.from_url(args.redis_url)
+        factories['redis'] = lambda: RedisRateLimiter(client, 'bench', max_calls, window)
+
+    scenarios = [
+        ('hot-key', ["sid-0"], args.ops, 1),
+        ('many-keys', [f"sid-{i}" for i in range(1000)], args.ops, 1),
+        ('threads', [f"sid-{i}" for i in range(1000)], args.ops, 8),
+    ]
+
+    for scenario, keys, ops, threads in scenarios:
+        print(f"{scenario} ({len(keys)} keys, {threads} thread{'s' if threads > 1 else ''})")
+        for name, factory in factories.items():
+            bench(name, factory, keys, ops if name != 'redis' else ops // 20, threads)
+
+    print("memory per key at limit")
+    for name in ('legacy', 'gcra'):
+        print(f"  {name:<8} {memory_per_key(factories[name], [f'sid-{i}' for i in range(1000)]):>10,.0f} bytes")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--ops', type=int, default=200000)
+    parser.add_argument('--redis-url', help='also benchmark RedisRateLimiter against this server')
+    main(parser.parse_args())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Registration burst benchmark: a whole lab booting at once.
+
+Runs N simultaneous student registrations against a throwaway SQLite DB
+the way handle_register_student does, with
+  bcrypt    the old path (set_password('default_password') inline)
+  unusable  the current path (precomputed unusable hash)
+and N simultaneous logins through the bounded PasswordHasher pool.
+
+While each burst runs, a heartbeat thread sleeps 5 ms in a loop and records
+how late it wakes up: a stand-in for every other socket event the server
+should still be handling.
+
+    python scripts/bench_registration_burst.py [--students 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+warnings.filterwarnings('ignore')
+
+workdir = tempfile.mkdtemp(prefix='classguard-bench-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from app import app  # noqa: E402
+from extensions import db  # noqa: E402
+from models.user import User  # noqa: E402
+from services.password_service import password_hasher, PasswordHasherBusy  # noqa: E402
+
+db_lock = threading.Lock()  # SQLite allows one writer; keep the DB out of the measurement
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))] if values else 0
+
+
+class Heartbeat(threading.Thread):
+    """Measures scheduling delay of a thread that wants to run every 5 ms"""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.running = True
+        self.delays = []
+
+    def run(self):
+        while self.running:
+            started = time.perf_counter()
+            time.sleep(0.005)
+            self.delays.append((time.perf_counter() - started - 0.005) * 1000)
+
+
+def burst(label, fn, count):
+    barrier = threading.Barrier(count)
+    latencies, errors = [], []
+
+    def worker(i):
+        barrier.wait()
+        started = time.perf_counter()
+        try:
+            fn(i)
+            latencies.append((time.perf_counter() - started) * 1000)
+        except Exception as e:
+            errors.append(type(e).__name__)
+
+    heartbeat = Heartbeat()
+    heartbeat.start()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+    heartbeat.running = False
+    heartbeat.join()
+
+    print(f"{label}")
+    print(f"  wall {wall:6.2f} s   done {len(latencies)}/{count}   rejected {len(errors)}")
+    print(f"  latency ms   p50 {percentile(latencies, 50):8.1f}   p99 {percentile(latencies, 99):8.1f}")
+    print(f"  heartbeat delay ms   p99 {percentile(heartbeat.delays, 99):6.1f}   max {max(heartbeat.delays, default=0):6.1f}")
+
+
+def register(prefix, use_bcrypt):
+    def fn(i):
+        user = User(
+            username=f"{prefix}_{i}",
+            email=f"{prefix}_{i}@school.local",
+            role='student',
+            computer_id=f"{prefix}-{i}"
+        )
+        if use_bcrypt:
+            user.set_password('default_password')
+        else:
+            user.set_unusable_password()
+        with db_lock, app.app_context():
+            db.session.add(user)
+            db.session.commit()
+    return fn
+
+
+def main(args):
+    with app.app_context():
+        db.create_all()
+        teacher = User(username='bench_teacher', email='t@school.local', role='teacher',
+                       password_hash=password_hasher.hash('secret'))
+        db.session.add(teacher)
+        db.session.commit()
+        teacher_hash = teacher.password_hash
+
+    print(f"{args.students} simultaneous operations, bcrypt rounds {password_hasher.rounds}, "
+          f"hash pool {password_hasher.executor._max_workers} workers / {password_hasher.max_pending} slots\n")
+
+    with app.app_context():
+        burst("register: inline bcrypt (old)", register('old', True), args.students)
+        burst("register: unusable hash (current)", register('new', False), args.students)
+
+    def login(i):
+        if not password_hasher.check(teacher_hash, 'secret'):
+            raise ValueError('bad password')
+
+    burst("login: bcrypt check through PasswordHasher", login, args.students)
+    print(f"\n  pool stats {password_hasher.stats()}  (rejections are {PasswordHasherBusy.__name__} -> HTTP 503)")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=50)
+    main(parser.parse_args())
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Socket.IO connection/latency load test.
+
+Opens N student connections against a running server, registers each one,
+then has every client send acknowledged events at a fixed rate. Reports how
+many connections succeeded and the event round-trip latency percentiles.
+The first run against a fresh database also creates the student accounts;
+run it once to warm up before comparing numbers.
+
+Compare the two server modes on the same machine:
+
+    PORT=5000 python backend/app.py          # threaded (Flask-SocketIO)
+    PORT=5001 python backend/async_app.py    # asyncio (AsyncServer)
+
+    python scripts/loadtest_socketio.py --url http://localhost:5000 --clients 500
+    python scripts/loadtest_socketio.py --url http://localhost:5001 --clients 500
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import time
+
+import socketio
+
+
+def make_frame():
+    """Small pre-compressed JPEG so the server skips compression"""
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 180), (40, 90, 160)).save(buffer, format='JPEG', quality=60)
+    data = buffer.getvalue()
+    return base64.b64encode(data).decode('utf-8'), hashlib.sha256(data).hexdigest()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def run_client(args, index, frame, results, connected_event):
+    client = socketio.AsyncClient(reconnection=False)
+    try:
+        await client.connect(args.url, transports=['websocket'], wait_timeout=args.timeout)
+    except Exception as e:
+        results['failed'] += 1
+        results['errors'].append(str(e))
+        return
+
+    results['connected'] += 1
+    try:
+        try:
+            # Stable computer ids: repeat runs reuse the accounts instead of
+            # measuring N new password hashes
+            await client.call('register_student', {
+                'name': f"{args.prefix}_{index}",
+                'computer_id': f"{args.prefix}-{index}"
+            }, timeout=args.timeout)
+        except Exception as e:
+            results['unregistered'] += 1
+            results['errors'].append(f"register_student: {e!r}")
+            return
+
+        # Wait until every client has had a chance to connect
+        await connected_event.wait()
+
+        image, img_hash = frame
+        interval = 1.0 / args.rate
+        deadline = time.monotonic() + args.duration
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            try:
+                if args.event == 'screen_update':
+                    await client.call('screen_update', {
+                        'screenshot': image,
+                        'hash': img_hash,
+                        'active_app': 'python',
+                        'active_window': 'main.py'
+                    }, timeout=args.timeout)
+                else:
+                    await client.call('process_update', {'processes': ['python'], 'urls': []}, timeout=args.timeout)
+                results['latencies'].append((time.perf_counter() - started) * 1000)
+            except Exception:
+                results['timeouts'] += 1
+            await asyncio.sleep(max(0, interval - (time.perf_counter() - started)))
+    finally:
+        await client.disconnect()
+
+
+async def main(args):
+    frame = make_frame()
+    results = {'connected': 0, 'failed': 0, 'unregistered': 0, 'timeouts': 0, 'latencies': [], 'errors': []}
+    connected_event = asyncio.Event()
+
+    tasks = []
+    for i in range(args.clients):
+        tasks.append(asyncio.create_task(run_client(args, i, frame, results, connected_event)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.clients)
+
+    await asyncio.sleep(1)
+    connected_event.set()
+    started = time.monotonic()
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+
+    latencies = results['latencies']
+    print(f"Server:        {args.url}")
+    print(f"Connections:   {results['connected']}/{args.clients} (failed {results['failed']}, "
+          f"registration failed {results['unregistered']})")
+    print(f"Events:        {len(latencies)} acked, {results['timeouts']} timed out "
+          f"({len(latencies) / elapsed:.1f}/s)")
+    print(f"Latency (ms):  p50 {percentile(latencies, 50):.1f}  p95 {percentile(latencies, 95):.1f}  "
+          f"p99 {percentile(latencies, 99):.1f}  max {max(latencies, default=0):.1f}")
+    if results['errors']:
+        print(f"First error:   {results['errors'][0]}")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=100, help='concurrent student connections')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of steady load')
+    parser.add_argument('--rate', type=float, default=0.5, help='events per second per client')
+    parser.add_argument('--ramp', type=float, default=5, help='seconds to spread connects over')
+    parser.add_argument('--event', choices=['screen_update', 'process_update'], default='screen_update')
+    parser.add_argument('--prefix', default='load', help='student name/computer id prefix')
+    parser.add_argument('--timeout', type=float, default=30)
+    asyncio.run(main(parser.parse_args()))
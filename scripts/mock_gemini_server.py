@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Gemini REST API (generateContent).
+
+Answers the prompts ai_service sends with plausible JSON so the backend can
+be exercised offline: point it here with
+
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8765
+
+Latency, error rate and a per-minute quota are configurable. GET /stats
+returns request counters (POST /stats/reset clears them), which is how the
+benchmarks count requests per class.
+
+    python scripts/mock_gemini_server.py --port 8765 --latency 800 --rpm 15
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUSES = ['correct', 'correct', 'has_issues', 'error', 'no_code', 'off_task']
+
+
+class MockState:
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.lock = threading.Lock()
+        self.calls = deque()  # accepted request times, for the quota
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters = Counter()
+            self.calls.clear()
+
+    def admit(self):
+        """Apply the per-minute quota; False means answer 429"""
+        if not self.args.rpm:
+            return True
+        now = time.time()
+        with self.lock:
+            while self.calls and self.calls[0] <= now - 60:
+                self.calls.popleft()
+            if len(self.calls) >= self.args.rpm:
+                return False
+            self.calls.append(now)
+            return True
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+    def choice(self, options):
+        with self.lock:
+            return self.random.choice(options)
+
+
+def code_check(state, tile=None):
+    status = state.choice(STATUSES)
+    low = state.roll(state.args.low_confidence_rate) if tile else False
+    analysis = {
+        'has_code': status not in ('no_code', 'off_task'),
+        'language_detected': 'python' if status not in ('no_code', 'off_task') else 'none',
+        'status': status,
+        'issues': [
+            {'type': 'logic', 'description': 'Loop never terminates', 'line': 12, 'severity': 'high'}
+        ] if status in ('has_issues', 'error') else [],
+        'positive_aspects': ['Clear variable names'],
+        'suggestions': ['Add a docstring'],
+        'confidence': state.choice([30, 45]) if low else state.choice([80, 90, 95])
+    }
+    if tile:
+        analysis['tile'] = tile
+    return analysis
+
+
+def answer(state, prompt):
+    """Canned response for one of ai_service's prompt templates"""
+    grid = re.search(r'grid of (\d+) student screens', prompt)
+    if grid:
+        kind = 'mosaic'
+        body = {'tiles': [code_check(state, tile=i + 1) for i in range(int(grid.group(1)))]}
+    elif 'Analyze the code visible' in prompt:
+        kind = 'code_check'
+        body = code_check(state)
+    elif 'analyzing a classroom' in prompt:
+        kind = 'classroom'
+        body = {
+            'engagement_percentage': 72,
+            'status': 'warning',
+            'attention_needed': [],
+            'positive_moments': ['Most students are coding'],
+            'class_mood': 'mixed',
+            'recommendation': 'Check in with idle students',
+            'predicted_issues': []
+        }
+    elif 'message variants' in prompt:
+        kind = 'message'
+        body = {
+            'encouraging': 'Keep going, you are close! 💪',
+            'direct': 'Please return to the assignment.',
+            'helpful': 'Stuck? Ask me about the loop condition.'
+        }
+    else:
+        kind = 'other'
+        body = {'text': 'ok'}
+    return kind, '```json\n' + json.dumps(body, indent=2) + '\n```'
+
+
+def make_handler(state):
+    args = state.args
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.startswith('/stats'):
+                with state.lock:
+                    return self._send(200, dict(state.counters))
+            self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length)
+
+            if self.path.startswith('/stats/reset'):
+                state.reset()
+                return self._send(200, {})
+            if ':generateContent' not in self.path:
+                return self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+
+            parts = [part for content in json.loads(raw).get('contents', []) for part in content.get('parts', [])]
+            prompt = '\n'.join(part.get('text', '') for part in parts)
+            images = sum(1 for part in parts if 'inlineData' in part or 'inline_data' in part)
+
+            with state.lock:
+                state.counters['requests'] += 1
+                state.counters['images'] += images
+                state.counters['bytes_in'] += length
+
+            if not state.admit():
+                with state.lock:
+                    state.counters['rate_limited'] += 1
+                return self._send(429, {'error': {'code': 429, 'message': 'Quota exceeded', 'status': 'RESOURCE_EXHAUSTED'}})
+
+            kind, text = answer(state, prompt)
+            tiles = len(re.findall(r'^Tile \d+:', prompt, re.MULTILINE))
+
+            # Base latency, extra time per mosaic tile, exponential tail
+            delay = args.latency + args.tile_latency * tiles
+            if args.jitter:
+                with state.lock:
+                    delay += state.random.expovariate(1 / args.jitter)
+            time.sleep(delay / 1000)
+
+            if state.roll(args.error_rate):
+                with state.lock:
+                    state.counters['errors'] += 1
+                return self._send(500, {'error': {'code': 500, 'message': 'Internal error', 'status': 'INTERNAL'}})
+
+            with state.lock:
+                state.counters[kind] += 1
+            self._send(200, {
+                'candidates': [{
+                    'content': {'parts': [{'text': text}], 'role': 'model'},
+                    'finishReason': 'STOP',
+                    'index': 0
+                }],
+                'usageMetadata': {'promptTokenCount': len(prompt) // 4 + 258 * images}
+            })
+
+    return Handler
+
+
+def main(args):
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(MockState(args)))
+    print(f"🤖 Mock Gemini listening on http://{args.host}:{args.port} "
+          f"(latency {args.latency} ms, errors {args.error_rate:.0%}, rpm {args.rpm or 'unlimited'})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=800, help='base response time in ms')
+    parser.add_argument('--tile-latency', type=float, default=150, help='extra ms per mosaic tile')
+    parser.add_argument('--jitter', type=float, default=200, help='mean of the exponential extra delay in ms')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with 500')
+    parser.add_argument('--rpm', type=int, default=0, help='requests per minute before 429 (0 = unlimited)')
+    parser.add_argument('--low-confidence-rate', type=float, default=0.1, help='fraction of mosaic tiles with low confidence')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true')
+    return parser
+
+
+if __name__ == '__main__':
+    main(build_parser().parse_args())
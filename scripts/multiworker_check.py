@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Multi-worker smoke test.
+
+Starts a local Redis (unless --redis-url is given) and N backend workers in
+MULTI_WORKER mode, each on its own port. A teacher connects to worker 0 and
+students connect to the other workers; the check passes when the teacher
+receives a roster join and screen_data for every student and every
+student receives its capture_settings, i.e. presence, frames and emits all
+cross worker boundaries.
+
+    python scripts/multiworker_check.py --workers 3 --students 6
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import socketio
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend')
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(url, timeout=1).ok:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.3)
+    return False
+
+
+def start_redis():
+    """Start a throwaway redis-server; returns (process, url)"""
+    binary = shutil.which('redis-server')
+    if not binary:
+        sys.exit("redis-server not found on PATH (or pass --redis-url)")
+
+    port = free_port()
+    process = subprocess.Popen(
+        [binary, '--port', str(port), '--save', '', '--appendonly', 'no'],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    time.sleep(0.5)
+    return process, f"redis://127.0.0.1:{port}/0"
+
+
+def make_frame():
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (320, 180), (200, 80, 40)).save(buffer, format='JPEG', quality=60)
+    data = buffer.getvalue()
+    return base64.b64encode(data).decode('utf-8'), hashlib.sha256(data).hexdigest()
+
+
+def main(args):
+    processes = []
+    workdir = tempfile.mkdtemp(prefix='classguard-mw-')
+
+    redis_url = args.redis_url
+    if not redis_url:
+        redis_process, redis_url = start_redis()
+        processes.append(redis_process)
+
+    env = dict(os.environ)
+    env.update({
+        'MULTI_WORKER': 'true',
+        'REDIS_URL': redis_url,
+        'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'classguard.db')}",
+        'FLASK_ENV': 'development'
+    })
+
+    try:
+        # Create tables once before the workers start
+        subprocess.run(
+            [sys.executable, '-c', 'from app import app, db\nwith app.app_context(): db.create_all()'],
+            cwd=BACKEND_DIR, env=env, check=True, capture_output=True
+        )
+
+        ports = [free_port() for _ in range(args.workers)]
+        for port in ports:
+            processes.append(subprocess.Popen(
+                ['gunicorn', '-w', '1', '--threads', '50', '-b', f"127.0.0.1:{port}", 'app:app'],
+                cwd=BACKEND_DIR, env=env,
+                stdout=subprocess.DEVNULL, stderr=None if args.verbose else subprocess.DEVNULL
+            ))
+        for port in ports:
+            if not wait_for(f"http://127.0.0.1:{port}/health"):
+                sys.exit(f"worker on port {port} did not start")
+        print(f"Started {len(ports)} workers on ports {ports} (redis {redis_url})")
+
+        # Teacher on worker 0
+        teacher = socketio.Client()
+        seen_connected, seen_frames = set(), set()
+        done = threading.Event()
+
+        @teacher.on('roster_delta')
+        def on_roster(delta):
+            if delta['op'] == 'join':
+                seen_connected.add(delta['student']['username'])
+
+        @teacher.on('screen_data')
+        def on_frame(data):
+            seen_frames.add(data['username'])
+            if len(seen_frames) >= args.students:
+                done.set()
+
+        teacher.connect(f"http://127.0.0.1:{ports[0]}", transports=['websocket'])
+        teacher.call('register_teacher', {'name': 'mw-teacher'})
+
+        # Students spread over the other workers
+        student_ports = ports[1:] or ports
+        frame, frame_hash = make_frame()
+        students, settings = [], {}
+        for i in range(args.students):
+            name = f"mw_student_{i}"
+            client = socketio.Client()
+            client.on('capture_settings', lambda data, name=name: settings.setdefault(name, data))
+            client.connect(f"http://127.0.0.1:{student_ports[i % len(student_ports)]}", transports=['websocket'])
+            client.call('register_student', {'name': name, 'computer_id': f"mw-{i}"}, timeout=60)
+            client.call('screen_update', {
+                'screenshot': frame,
+                'hash': frame_hash,
+                'active_app': 'python',
+                'active_window': f"{name}.py"
+            })
+            students.append(client)
+
+        done.wait(args.timeout)
+        time.sleep(0.5)
+
+        expected = {f"mw_student_{i}" for i in range(args.students)}
+        checks = {
+            'roster join across workers': expected <= seen_connected,
+            'screen_data across workers': expected <= seen_frames,
+            'capture_settings delivered': expected <= set(settings),
+        }
+
+        for client in students + [teacher]:
+            client.disconnect()
+
+        for name, ok in checks.items():
+            print(f"{'PASS' if ok else 'FAIL'}  {name}")
+        if not all(checks.values()):
+            print(f"  connected: {sorted(seen_connected)}")
+            print(f"  frames:    {sorted(seen_frames)}")
+            sys.exit(1)
+
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--students', type=int, default=4)
+    parser.add_argument('--redis-url', help='use an existing Redis instead of starting one')
+    parser.add_argument('--timeout', type=float, default=20)
+    parser.add_argument('--verbose', action='store_true', help='show worker logs')
+    main(parser.parse_args())
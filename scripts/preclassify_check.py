@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Task pre-classifier smoke test.
+
+Starts a whole-class code check the way /api/ai/check-all-code does:
+students are identified by their UUID user id, and the request only
+carries name and screenshot, so what the server recorded for each
+student (active app, title, process list) must reach the classifier.
+A student with a game in front is answered locally as off_task without
+a model request; one with a game only in the background is flagged but
+still escalated.
+
+Then classifies screens from a typical school PC, whose process list
+always includes Windows' GameBar/gamingservices: an editor, the Python
+docs or a lecture about game theory must never be decided off_task
+locally.
+
+    python scripts/preclassify_check.py
+"""
+
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import uuid
+import warnings
+
+warnings.filterwarnings('ignore')
+
+workdir = tempfile.mkdtemp(prefix='classguard-check-')
+atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+os.environ.update({
+    'DATABASE_URL': f"sqlite:///{os.path.join(workdir, 'check.db')}",
+    'AI_PRECLASSIFY': 'true',
+    'AI_PRECLASSIFY_MODEL_PATH': '',
+    'LOG_LEVEL': 'WARNING'
+})
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from services.code_check_jobs import CodeCheckJobs  # noqa: E402
+from services.metrics_service import classroom_metrics  # noqa: E402
+from services.task_classifier import task_classifier, OFF_TASK  # noqa: E402
+
+# What psutil lists on a Windows 11 lab PC besides the student's own apps
+BACKGROUND = ['System', 'svchost.exe', 'explorer.exe', 'GameBar.exe', 'GameBarPresenceWriter.exe',
+              'gamingservices.exe', 'gamingservicesnet.exe', 'GameInputSvc.exe', 'XboxGameBarWidgets.exe',
+              'SearchHost.exe', 'RuntimeBroker.exe', 'OneDrive.exe', 'Teams.exe', 'YourPhone.exe']
+
+# (name, active_app, active_window, extra processes, may be decided off_task locally)
+SCREENS = [
+    ('editor', 'Code.exe', 'main.py - exercise - Visual Studio Code', ['Code.exe', 'python.exe'], False),
+    ('docs', 'chrome.exe', 'random — Generate pseudo-random numbers — Python 3.12 documentation - Google Chrome',
+     ['chrome.exe'], False),
+    ('lecture', 'chrome.exe', 'Game theory lecture notes - Google Chrome', ['chrome.exe'], False),
+    ('idle', 'explorer.exe', 'Downloads', [], False),
+    ('background game', 'chrome.exe', 'New Tab - Google Chrome', ['chrome.exe', 'Minecraft.Windows.exe'], False),
+    ('game', 'Minecraft.Windows.exe', 'Minecraft', ['Minecraft.Windows.exe'], True),
+]
+
+
+def check_job(failures):
+    """The UUID-keyed context reaches the classifier through a code check job"""
+    ids = {}
+    for name, app, title, processes, _ in SCREENS:
+        ids[name] = user_id = str(uuid.uuid4())
+        classroom_metrics.add_student(user_id, name)
+        classroom_metrics.record_screen(user_id, name, app, 'h', active_window=title)
+        classroom_metrics.record_processes(user_id, BACKGROUND + processes)
+
+    results = {}
+    done = threading.Event()
+
+    def emit(event, data, to):
+        if event == 'code_check_result':
+            results[data['name']] = data['analysis']
+            if data['name'] == 'game':
+                done.set()
+
+    jobs = CodeCheckJobs(emit=emit)
+    job = jobs.start([{'id': ids['game'], 'name': 'game', 'screenshot': ''}], owner='check', sid='check')
+    done.wait(10)
+    jobs.cancel(job.id)
+
+    analysis = results.get('game') or {}
+    print(f"job: game -> {analysis.get('status')} by {analysis.get('classified_by')}, local {job.local}/{job.total}")
+    if analysis.get('status') != OFF_TASK or not analysis.get('classified_by'):
+        failures.append('the game in front did not reach the pre-classifier through the job')
+
+    background = task_classifier.classify(classroom_metrics.context(ids['background game']))
+    if background['label'] != OFF_TASK or background['decided']:
+        failures.append(f"background game: expected an escalated off_task hint, got {background['label']} "
+                        f"decided={background['decided']}")
+
+
+def check_screens(failures):
+    """Common background processes never decide a screen off_task"""
+    for name, app, title, processes, may_decide in SCREENS:
+        decision = task_classifier.classify({'active_app': app, 'active_window': title,
+                                             'processes': BACKGROUND + processes})
+        local_off_task = decision['decided'] and decision['label'] == OFF_TASK
+        print(f"{name:16} {decision['label'] or '-':9} {decision['confidence']:.2f} "
+              f"{'local' if decision['decided'] else 'escalated'}")
+        if local_off_task != may_decide:
+            failures.append(f"{name}: decided off_task locally = {local_off_task}, expected {may_decide}")
+
+
+def main():
+    task_classifier.audit_rate = 0  # an audited decision would go to the (absent) model
+    failures = []
+    check_job(failures)
+    check_screens(failures)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
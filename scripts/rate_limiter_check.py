@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Rate limiter smoke test.
+
+Drives RateLimiter on a mocked monotonic clock with a client that retries
+every 50 ms for ten windows, and checks that no rolling window admits
+more than max_calls (the sliding-window limit the GCRA limiter replaced)
+while a full burst still gets through at once.
+
+    python scripts/rate_limiter_check.py
+"""
+
+import os
+import sys
+from bisect import bisect_left
+
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from services import security_service  # noqa: E402
+from services.security_service import RateLimiter  # noqa: E402
+
+CASES = [(15, 60, None), (100, 60, None), (15, 60, 1), (15, 60, 15), (2, 1, None)]
+STEP = 0.05
+
+
+class Clock:
+    """Advances in whole ticks, so call times carry no accumulated float error"""
+
+    def __init__(self):
+        self.ticks = 0
+
+    def monotonic(self):
+        return 1000.0 + self.ticks * STEP
+
+
+def admitted(max_calls, window, burst, clock):
+    """Times of the calls a greedy client gets through in 10 windows"""
+    limiter = RateLimiter(max_calls, window, burst)
+    start = clock.ticks
+    times = []
+    while (clock.ticks - start) * STEP < 10 * window:
+        while limiter.allow('client'):
+            times.append(clock.ticks - start)
+        clock.ticks += 1
+    return limiter, times
+
+
+def main():
+    clock = Clock()
+    real_time = security_service.time
+    security_service.time = clock
+    failures = []
+    try:
+        for max_calls, window, burst in CASES:
+            limiter, times = admitted(max_calls, window, burst, clock)
+            # Most calls in any rolling window [t, t + window)
+            span = round(window / STEP)
+            busiest = max(bisect_left(times, t + span) - i for i, t in enumerate(times))
+            first = bisect_left(times, 1)
+            print(f"{max_calls}/{window}s burst {limiter.burst}: first burst {first}, "
+                  f"busiest window {busiest}, total {len(times)} in {10 * window}s")
+            if busiest > max_calls:
+                failures.append(f"{max_calls}/{window}s admitted {busiest} calls in one window")
+            if first != limiter.burst:
+                failures.append(f"{max_calls}/{window}s burst was {first}, expected {limiter.burst}")
+    finally:
+        security_service.time = real_time
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print('OK')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded lesson against a server.
+
+Reads a trace written by the server's traffic recorder (TRAFFIC_RECORD or
+POST /api/admin/recording) and re-drives it: every recorded client gets
+its own Socket.IO connection, opened and closed when the original was,
+and sends its events at the recorded offsets divided by --speed. Bell
+connect bursts, lock storms and poll answers arrive in the same pattern
+as in the real lesson, so two server versions can be compared on
+identical traffic.
+
+Screenshots come from the trace's frames/ directory; traces recorded
+without frames get filler of the recorded size. Student computer ids are
+replayed as recorded, so use a test database. Targeted locks/messages
+name the recorded student ids, which may not match the test database.
+
+Reported:
+  schedule    how late events went out versus the recorded timeline
+              (a replayer that cannot keep up says so instead of
+              quietly stretching the lesson)
+  server      per-event handler latency from the /metrics histograms
+              (bucket upper bounds), counted over the replay only
+  teachers    screen_data frames received by replayed teacher sockets
+
+    python scripts/replay_traffic.py backend/instance/traces/lesson-1 --url http://localhost:5000
+    python scripts/replay_traffic.py backend/instance/traces/lesson-1 --speed 4 --json after.json
+"""
+
+import argparse
+import asyncio
+import base64
+import glob
+import json
+import os
+import re
+import time
+import urllib.error
+import urllib.request
+from collections import Counter, defaultdict
+
+import socketio
+
+BUCKET_LINE = re.compile(
+    r'^classguard_socketio_event_seconds_bucket\{event="(\w+)",le="([^"]+)"\} ([0-9.e+]+)$', re.M)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def load_trace(path, start=0.0, end=None):
+    """
+    Merge the per-process event files of a trace
+
+    Returns:
+        list of (seconds from trace start, client key, event, data),
+        sorted by time
+    """
+    files = sorted(glob.glob(os.path.join(path, 'events-*.jsonl')))
+    if not files:
+        raise SystemExit(f"No events-*.jsonl in {path}")
+
+    events = []
+    origin = None
+    for index, name in enumerate(files):
+        with open(name, encoding='utf-8') as f:
+            # A file holds one or more recordings, each starting with a header
+            started_at = None
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line of a crashed server
+                if isinstance(record, dict):
+                    started_at = record['started_at']
+                    session = (index, started_at)
+                    continue
+                offset, client, event, data = record
+                events.append((started_at + offset, (session, client), event, data))
+
+    events.sort(key=lambda e: e[0])
+    if events:
+        origin = events[0][0]
+    window = [(t - origin, client, event, data) for t, client, event, data in events
+              if t - origin >= start and (end is None or t - origin <= end)]
+    return window
+
+
+class FrameStore:
+    """Screenshots of a trace, read from disk on demand"""
+
+    def __init__(self, path, cache_size=256):
+        self.path = os.path.join(path, 'frames')
+        self.cache = {}
+        self.cache_size = cache_size
+        self.missing = 0
+
+    def get(self, ref):
+        digest = ref.get('frame')
+        image = self.cache.get(digest)
+        if image is None:
+            try:
+                with open(os.path.join(self.path, digest), 'rb') as f:
+                    image = base64.b64encode(f.read()).decode('utf-8')
+            except (OSError, TypeError):
+                self.missing += 1
+                image = base64.b64encode(b'\0' * int(ref.get('bytes') or 0)).decode('utf-8')
+            if len(self.cache) >= self.cache_size:
+                self.cache.pop(next(iter(self.cache)))
+            self.cache[digest] = image
+        return image
+
+
+class ReplayClient:
+    """One recorded socket: its events run in order on their own task"""
+
+    def __init__(self, args, key, results):
+        self.args = args
+        self.key = key
+        self.results = results
+        self.queue = asyncio.Queue()
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.client.on('screen_data', self.on_screen_data)
+        self.task = asyncio.create_task(self.run())
+
+    async def on_screen_data(self, data):
+        self.results['screen_data'] += 1
+
+    async def run(self):
+        results = self.results
+        while True:
+            item = await self.queue.get()
+            if item is None:
+                break
+            due, event, data = item
+            try:
+                if event == 'connect':
+                    if not self.client.connected:
+                        await self.client.connect(self.args.url, transports=['websocket'],
+                                                  wait_timeout=self.args.timeout)
+                    results['connects'] += 1
+                elif event == 'disconnect':
+                    if self.client.connected:
+                        await self.client.disconnect()
+                else:
+                    if not self.client.connected:
+                        # Recording started after this client connected
+                        await self.client.connect(self.args.url, transports=['websocket'],
+                                                  wait_timeout=self.args.timeout)
+                        results['late_joins'] += 1
+                    await self.client.emit(event, data)
+                results['lag'].append((time.monotonic() - due) * 1000)
+                results['sent'][event] += 1
+            except Exception as e:
+                results['errors'].append(f"{event}: {e!r}")
+
+        if self.client.connected:
+            await self.client.disconnect()
+
+
+def histograms(args):
+    """Cumulative socketio_event_seconds buckets per event from /metrics, or None"""
+    request = urllib.request.Request(args.url.rstrip('/') + '/metrics')
+    if args.metrics_token:
+        request.add_header('Authorization', f"Bearer {args.metrics_token}")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            text = response.read().decode('utf-8')
+    except (urllib.error.URLError, OSError):
+        return None
+
+    buckets = defaultdict(dict)
+    for event, le, count in BUCKET_LINE.findall(text):
+        buckets[event][float(le)] = float(count)
+    return buckets
+
+
+def latency_summary(before, after):
+    """Per-event count and bucket-bound p50/p95/p99 (ms) of what happened between two scrapes"""
+    summary = {}
+    for event, buckets in after.items():
+        previous = before.get(event, {})
+        delta = sorted((le, count - previous.get(le, 0)) for le, count in buckets.items())
+        total = delta[-1][1] if delta else 0
+        if total <= 0:
+            continue
+
+        def quantile(q):
+            for le, count in delta:
+                if count >= q * total:
+                    return round(le * 1000, 2) if le != float('inf') else None
+            return None
+
+        summary[event] = {'count': int(total), 'p50': quantile(0.5), 'p95': quantile(0.95), 'p99': quantile(0.99)}
+    return summary
+
+
+async def main(args):
+    events = load_trace(args.trace, args.start, args.end)
+    if not events:
+        raise SystemExit('No events in the selected window')
+
+    frames = FrameStore(args.trace)
+    results = {'sent': Counter(), 'lag': [], 'errors': [], 'connects': 0, 'late_joins': 0, 'screen_data': 0}
+    clients = {}
+
+    length = events[-1][0] - events[0][0]
+    print(f"Replaying {len(events)} events from {len(set(e[1] for e in events))} clients, "
+          f"{length:.0f}s recorded, at {args.speed}x ({length / args.speed:.0f}s)", flush=True)
+
+    before = histograms(args)
+    started = time.monotonic()
+    first = events[0][0]
+    for offset, key, event, data in events:
+        due = started + (offset - first) / args.speed
+        delay = due - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        if isinstance(data, dict) and isinstance(data.get('screenshot'), dict):
+            data = dict(data, screenshot=frames.get(data['screenshot']))
+
+        client = clients.get(key)
+        if client is None or (event == 'connect' and client.task.done()):
+            client = clients[key] = ReplayClient(args, key, results)
+        client.queue.put_nowait((due, event, data))
+        if event == 'disconnect':
+            client.queue.put_nowait(None)
+
+    for client in clients.values():
+        client.queue.put_nowait(None)
+    await asyncio.gather(*(client.task for client in clients.values()), return_exceptions=True)
+    elapsed = time.monotonic() - started
+    await asyncio.sleep(1)  # last handlers finish before the scrape
+    after = histograms(args)
+
+    lag = results['lag']
+    server = latency_summary(before, after) if before is not None and after is not None else None
+    summary = {
+        'trace': args.trace,
+        'url': args.url,
+        'speed': args.speed,
+        'recorded_seconds': round(length, 1),
+        'replay_seconds': round(elapsed, 1),
+        'events': dict(results['sent']),
+        'clients': len(clients),
+        'late_joins': results['late_joins'],
+        'missing_frames': frames.missing,
+        'lag_ms': {'p50': round(percentile(lag, 50), 1), 'p99': round(percentile(lag, 99), 1),
+                   'max': round(max(lag, default=0), 1)},
+        'screen_data_received': results['screen_data'],
+        'server_latency_ms': server,
+        'errors': len(results['errors'])
+    }
+
+    print()
+    print(f"Server:        {args.url}")
+    print(f"Replayed:      {sum(results['sent'].values())} events in {elapsed:.1f}s "
+          f"({len(clients)} clients, {results['late_joins']} joined mid-recording)")
+    print(f"Schedule lag:  p50 {summary['lag_ms']['p50']} ms  p99 {summary['lag_ms']['p99']} ms  "
+          f"max {summary['lag_ms']['max']} ms")
+    print(f"Teachers:      {results['screen_data']} screen_data frames received")
+    if server:
+        print("Server handler latency (ms, bucket upper bounds):")
+        for event, stats in sorted(server.items(), key=lambda item: -item[1]['count']):
+            print(f"  {event:18} {stats['count']:7}   p50 {stats['p50']}   p95 {stats['p95']}   p99 {stats['p99']}")
+    else:
+        print("Server:        /metrics not reachable (set --metrics-token if METRICS_TOKEN is set)")
+    if frames.missing:
+        print(f"Frames:        {frames.missing} not in the trace, sent as filler")
+    if results['errors']:
+        print(f"Errors:        {len(results['errors'])}, first: {results['errors'][0]}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('trace', help='trace directory (TRAFFIC_TRACE_DIR/<name>)')
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--speed', type=float, default=1.0, help='replay N times faster than recorded')
+    parser.add_argument('--start', type=float, default=0, help='skip the first N recorded seconds')
+    parser.add_argument('--end', type=float, default=None, help='stop at N recorded seconds')
+    parser.add_argument('--metrics-token', help='METRICS_TOKEN of the server')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--json', help='also write the summary to this file')
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,619 @@
+#!/usr/bin/env python3
+"""
+Synthetic classroom: N simulated student agents and T teachers.
+
+Students behave like agent/core/agent.py: they register, send
+screen_update frames (pre-generated JPEGs of an editor window, sized to
+the capture_settings the server sends) and process_update lists on their
+own intervals, stop sending while locked, and answer polls after a short
+think time. Teachers register, receive the screen_data fan-out and can
+issue lock/unlock storms and polls at fixed intervals. The server only
+acts on lock_screens/create_poll from a socket bound to a teacher
+account, which register_teacher does not do, so the Classroom line of the
+report shows whether they reached the students.
+
+Reported:
+  ingest      screen/process updates handled per second, from the
+              server's /metrics (client send rate if /metrics is closed)
+  latency     student emit -> teacher screen_data, per delivered frame
+  dropped     frames a teacher should have seen but never got (replaced
+              by a newer frame in the latest-wins fan-out, or lost)
+  server      CPU and RSS of the server process and its children, when it
+              runs on this machine (found by the port, or --server-pid)
+
+Frames are matched by a JPEG comment segment ("sim <student> <seq>") the
+students put in every screenshot. Image decoders and the server ignore
+it, and Pillow keeps it when the server recompresses (--raw), so it
+reaches teachers with the image while every field the agent sends keeps
+its real shape.
+
+    python backend/app.py &
+    python scripts/simulate_fleet.py --students 200 --teachers 2 --duration 60
+    python scripts/simulate_fleet.py --students 500 --interval 1 --lock-every 20 --poll-every 30
+
+Run once to create the student accounts before comparing numbers (as with
+loadtest_socketio.py, repeat runs reuse them).
+"""
+
+import argparse
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlparse
+
+import socketio
+
+WATCHED_SIZE = (1280, 720)
+UNWATCHED_SIZE = (320, 180)
+
+# Active window as the agent reports it: [x, y, width, height] as fractions of the screen
+WINDOW_RECTS = [
+    [0.0, 0.0, 1.0, 0.963],  # maximized above the taskbar
+    [0.0, 0.0, 0.5, 0.963],  # snapped left
+    [0.125, 0.1, 0.75, 0.75]
+]
+APPS = [
+    ('code', 'main.py - Visual Studio Code'),
+    ('pycharm64', 'exercise_3.py - PyCharm'),
+    ('chrome', 'Python documentation - Google Chrome'),
+    ('chrome', 'YouTube - Google Chrome'),
+    ('explorer', 'Downloads')
+]
+PROCESSES = ['python', 'code', 'chrome', 'explorer', 'spotify', 'discord']
+OFF_TASK_PROCESSES = ['minecraft', 'roblox']
+WORDS = ['def', 'return', 'for', 'in', 'range', 'print', 'if', 'else', 'import', 'class',
+         'self', 'total', 'items', 'value', 'result', 'append', 'len', 'None', 'True']
+
+METRIC_LINE = re.compile(r'^classguard_socketio_event_seconds_count\{event="(\w+)"\} ([0-9.e+]+)$', re.M)
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+def make_frames(count, size, quality=60, seed=0):
+    """
+    Editor-like screenshots: dark theme, file tree, lines of code
+
+    Text and syntax colours give JPEG sizes close to a real screen; a flat
+    image would compress to almost nothing and understate the load.
+    """
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    width, height = size
+    frames = []
+    for _ in range(count):
+        image = Image.new('RGB', size, (30, 30, 30))
+        draw = ImageDraw.Draw(image)
+        sidebar = width // 6
+        draw.rectangle([0, 0, sidebar, height], fill=(37, 37, 38))
+        for y in range(8, height, 14):
+            draw.text((8, y), rng.choice(WORDS) + '.py', fill=(200, 200, 200))
+        for y in range(8, height, 16):
+            x = sidebar + 12 + 24 * rng.randint(0, 3)
+            for _ in range(rng.randint(1, 7)):
+                word = rng.choice(WORDS)
+                draw.text((x, y), word, fill=rng.choice([(86, 156, 214), (206, 145, 120), (220, 220, 170), (212, 212, 212)]))
+                x += 7 * len(word) + 7
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality)
+        data = buffer.getvalue()
+        frames.append((data, hashlib.sha256(data).hexdigest(), len(data) / 1024))
+    return frames
+
+
+def tag_frame(data, student, seq):
+    """Base64 JPEG with a "sim <student> <seq>" comment segment after the SOI marker"""
+    comment = f"sim {student} {seq}".encode('ascii')
+    segment = b'\xff\xfe' + (len(comment) + 2).to_bytes(2, 'big') + comment
+    return base64.b64encode(data[:2] + segment + data[2:]).decode('utf-8')
+
+
+def frame_tag(image, prefix=4096):
+    """
+    (student, seq) from a tag_frame comment, or None
+
+    Only the header is decoded: segments are walked until the comment or
+    the start of the image data.
+    """
+    try:
+        data = base64.b64decode(image[:prefix])
+    except (TypeError, ValueError):
+        return None
+    offset = 2
+    while offset + 4 <= len(data) and data[offset] == 0xFF:
+        marker = data[offset + 1]
+        length = int.from_bytes(data[offset + 2:offset + 4], 'big')
+        if marker == 0xFE:
+            parts = data[offset + 4:offset + 2 + length].split()
+            if len(parts) == 3 and parts[0] == b'sim':
+                return int(parts[1]), int(parts[2])
+        elif marker == 0xDA:  # start of scan
+            return None
+        offset += 2 + length
+    return None
+
+
+class Results:
+    """Counters shared by every simulated client (one event loop, no locking)"""
+
+    def __init__(self):
+        self.measuring = False
+        self.students_connected = 0
+        self.students_failed = 0
+        self.teachers_connected = 0
+        self.errors = []
+        self.frames_sent = 0
+        self.frames_bytes = 0
+        self.processes_sent = 0
+        self.expected = 0  # frames x teachers watching the sender
+        self.delivered = 0
+        self.latencies = []
+        self.sent_at = {}  # (student index, seq) -> perf_counter at emit
+        self.locks = 0
+        self.unlocks = 0
+        self.polls = 0
+        self.poll_answers = 0
+        self.poll_results = 0
+        self.settings = 0
+
+
+class SimStudent:
+    """One agent: register, then screen and process loops"""
+
+    def __init__(self, args, index, frames, results, watchers):
+        self.args = args
+        self.index = index
+        self.frames = frames
+        self.results = results
+        self.watchers = watchers
+        self.rng = random.Random(index)
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.user_id = None
+        self.registered = asyncio.Event()
+        self.locked = False
+        self.interval = args.interval
+        self.size = WATCHED_SIZE
+        self.wakeup = asyncio.Event()
+        self.seq = 0
+        self.app = self.rng.choice(APPS)
+        self.window_rect = self.rng.choice(WINDOW_RECTS)
+        self.off_task = self.rng.random() < args.off_task
+
+        client = self.client
+        client.on('registered', self.on_registered)
+        client.on('capture_settings', self.on_capture_settings)
+        client.on('screen_lock', self.on_lock)
+        client.on('screen_unlock', self.on_unlock)
+        client.on('show_poll', self.on_poll)
+        client.on('receive_message', lambda data: None)
+
+    async def on_registered(self, data):
+        self.user_id = data.get('user_id')
+        self.registered.set()
+
+    async def on_capture_settings(self, data):
+        self.results.settings += 1
+        self.interval = max(self.args.interval, data.get('interval', self.args.interval))
+        self.size = WATCHED_SIZE if data.get('watched', True) else UNWATCHED_SIZE
+        self.wakeup.set()
+
+    async def on_lock(self, data):
+        self.results.locks += 1
+        self.locked = True
+
+    async def on_unlock(self, data):
+        self.results.unlocks += 1
+        self.locked = False
+        self.wakeup.set()
+
+    async def on_poll(self, data):
+        self.results.polls += 1
+        options = data.get('options') or ['yes']
+        await asyncio.sleep(self.rng.uniform(0, self.args.poll_think))
+        try:
+            await self.client.emit('poll_response', {'poll_id': data.get('poll_id'), 'answer': self.rng.choice(options)})
+            self.results.poll_answers += 1
+        except Exception:
+            pass
+
+    async def run(self, start, stop):
+        results = self.results
+        try:
+            await self.client.connect(self.args.url, transports=['websocket'], wait_timeout=self.args.timeout)
+            await self.client.emit('register_student', {
+                'name': f"{self.args.prefix}_{self.index}",
+                'computer_id': f"{self.args.prefix}-{self.index}",
+                'platform': 'Simulated',
+                'hostname': f"sim-{self.index}"
+            })
+            await asyncio.wait_for(self.registered.wait(), self.args.timeout)
+        except Exception as e:
+            results.students_failed += 1
+            results.errors.append(f"student {self.index}: {e!r}")
+            await self.client.disconnect()
+            return
+
+        results.students_connected += 1
+        try:
+            await start.wait()
+            await asyncio.gather(self.screen_loop(stop), self.process_loop(stop))
+        finally:
+            await self.client.disconnect()
+
+    async def screen_loop(self, stop):
+        results = self.results
+        # Spread the first frames over one interval, as real agents are not in phase
+        await asyncio.sleep(self.rng.uniform(0, self.interval))
+        while not stop.is_set():
+            if not self.locked:
+                data, img_hash, size_kb = self.rng.choice(self.frames[self.size])
+                self.seq += 1
+                image = tag_frame(data, self.index, self.seq)
+                key = (self.index, self.seq)
+                results.sent_at[key] = time.perf_counter()
+                try:
+                    await self.client.emit('screen_update', {
+                        'screenshot': image,
+                        'hash': None if self.args.raw else img_hash,
+                        'size_kb': size_kb,
+                        'active_window': self.app[1],
+                        'active_app': self.app[0],
+                        'window_rect': self.window_rect,
+                        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+                    })
+                    if results.measuring:
+                        results.frames_sent += 1
+                        results.frames_bytes += len(data)
+                        results.expected += self.watchers(self.user_id)
+                    else:
+                        del results.sent_at[key]
+                except Exception as e:
+                    del results.sent_at[key]
+                    results.errors.append(f"screen_update: {e!r}")
+
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def process_loop(self, stop):
+        results = self.results
+        await asyncio.sleep(self.rng.uniform(0, self.args.process_interval))
+        while not stop.is_set():
+            processes = self.rng.sample(PROCESSES, 4)
+            if self.off_task:
+                processes.append(self.rng.choice(OFF_TASK_PROCESSES))
+            try:
+                await self.client.emit('process_update', {
+                    'processes': processes,
+                    'urls': [],
+                    'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+                })
+                if results.measuring:
+                    results.processes_sent += 1
+            except Exception as e:
+                results.errors.append(f"process_update: {e!r}")
+            await asyncio.sleep(self.args.process_interval)
+
+
+class SimTeacher:
+    """Dashboard connection: receives screen_data, optionally drives locks and polls"""
+
+    def __init__(self, args, index, results):
+        self.args = args
+        self.index = index
+        self.results = results
+        self.client = socketio.AsyncClient(reconnection=False)
+        self.watching = None  # student ids, or None for all
+        self.client.on('screen_data', self.on_screen_data)
+        self.client.on('poll_results', self.on_poll_results)
+
+    def watches(self, user_id):
+        return self.watching is None or user_id in self.watching
+
+    async def on_screen_data(self, data):
+        results = self.results
+        tag = frame_tag(data.get('image') or '')
+        sent = results.sent_at.get(tag) if tag else None
+        if sent is not None and results.measuring:
+            results.delivered += 1
+            results.latencies.append((time.perf_counter() - sent) * 1000)
+
+    async def on_poll_results(self, data):
+        self.results.poll_results += 1
+
+    async def connect(self, students):
+        await self.client.connect(self.args.url, transports=['websocket'], wait_timeout=self.args.timeout)
+        await self.client.emit('register_teacher', {'name': f"sim_teacher_{self.index}", 'max_fps': self.args.teacher_fps})
+        if self.args.watch:
+            ids = [student.user_id for student in students if student.user_id is not None]
+            rng = random.Random(1000 + self.index)
+            self.watching = set(rng.sample(ids, min(self.args.watch, len(ids))))
+            await self.client.emit('subscribe_screens', {
+                'students': sorted(self.watching),
+                'width': WATCHED_SIZE[0],
+                'height': WATCHED_SIZE[1]
+            })
+        self.results.teachers_connected += 1
+
+    async def drive(self, stop):
+        """Lock storms and polls (first teacher only)"""
+        loops = []
+        if self.args.lock_every:
+            loops.append(self._every(self.args.lock_every, self._lock_storm, stop))
+        if self.args.poll_every:
+            loops.append(self._every(self.args.poll_every, self._poll, stop))
+        await asyncio.gather(*loops)
+
+    @staticmethod
+    async def _every(seconds, action, stop):
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), seconds)
+                return
+            except asyncio.TimeoutError:
+                await action()
+
+    async def _lock_storm(self):
+        await self.client.emit('lock_screens', {'students': 'all', 'duration': self.args.lock_seconds,
+                                                'message': 'Eyes on the board'})
+        await asyncio.sleep(self.args.lock_seconds)
+        await self.client.emit('unlock_screens', {'students': 'all'})
+
+    async def _poll(self):
+        await self.client.emit('create_poll', {'question': 'Finished exercise 3?', 'options': ['yes', 'no', 'almost']})
+
+
+def event_counts(args):
+    """screen_update/process_update counts from /metrics, or None if unavailable"""
+    request = urllib.request.Request(args.url.rstrip('/') + '/metrics')
+    if args.metrics_token:
+        request.add_header('Authorization', f"Bearer {args.metrics_token}")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            text = response.read().decode('utf-8')
+    except (urllib.error.URLError, OSError):
+        return None
+    return {event: float(value) for event, value in METRIC_LINE.findall(text)}
+
+
+class ServerUsage(threading.Thread):
+    """Samples CPU and RSS of the server process tree once a second"""
+
+    def __init__(self, args):
+        super().__init__(daemon=True)
+        self.process = self._find(args)
+        self.running = True
+        self.cpu = []
+        self.rss = []
+
+    @staticmethod
+    def _find(args):
+        try:
+            import psutil
+        except ImportError:
+            return None
+        if args.server_pid:
+            return psutil.Process(args.server_pid)
+        url = urlparse(args.url)
+        if url.hostname not in ('localhost', '127.0.0.1', '0.0.0.0', '::1'):
+            return None
+        port = url.port or 80
+        try:
+            for conn in psutil.net_connections(kind='tcp'):
+                if conn.status == psutil.CONN_LISTEN and conn.laddr.port == port and conn.pid:
+                    return psutil.Process(conn.pid)
+        except (psutil.AccessDenied, PermissionError):
+            pass
+        return None
+
+    def _tree(self):
+        try:
+            return [self.process] + self.process.children(recursive=True)
+        except Exception:
+            return [self.process]
+
+    def run(self):
+        if not self.process:
+            return
+        seen = {}
+        while self.running:
+            cpu = rss = 0.0
+            for process in self._tree():
+                try:
+                    # cpu_percent() is relative to the previous call on the same object
+                    process = seen.setdefault(process.pid, process)
+                    cpu += process.cpu_percent(None)
+                    rss += process.memory_info().rss
+                except Exception:
+                    continue
+            self.cpu.append(cpu)
+            self.rss.append(rss / 1024 / 1024)
+            time.sleep(1)
+
+
+async def report_progress(args, results, stop, started, usage):
+    last_sent = last_delivered = 0
+    while True:
+        try:
+            await asyncio.wait_for(stop.wait(), args.report_every)
+            return
+        except asyncio.TimeoutError:
+            pass
+        sent, delivered = results.frames_sent, results.delivered
+        cpu = f"   server cpu {usage.cpu[-1]:5.0f}%  rss {usage.rss[-1]:6.0f} MB" if usage.cpu else ''
+        print(f"  t={time.monotonic() - started:5.0f}s   frames sent {(sent - last_sent) / args.report_every:7.1f}/s   "
+              f"delivered {(delivered - last_delivered) / args.report_every:7.1f}/s{cpu}", flush=True)
+        last_sent, last_delivered = sent, delivered
+
+
+async def main(args):
+    print(f"Generating {args.frames} frames at {WATCHED_SIZE[0]}x{WATCHED_SIZE[1]} and "
+          f"{UNWATCHED_SIZE[0]}x{UNWATCHED_SIZE[1]}...", flush=True)
+    frames = {
+        WATCHED_SIZE: make_frames(args.frames, WATCHED_SIZE),
+        UNWATCHED_SIZE: make_frames(args.frames, UNWATCHED_SIZE)
+    }
+    results = Results()
+    teachers = [SimTeacher(args, i, results) for i in range(args.teachers)]
+
+    def watchers(user_id):
+        return sum(1 for teacher in teachers if teacher.watches(user_id))
+
+    start, stop = asyncio.Event(), asyncio.Event()
+    students = [SimStudent(args, i, frames, results, watchers) for i in range(args.students)]
+
+    print(f"Connecting {args.students} students over {args.ramp:.0f}s...", flush=True)
+    tasks = []
+    for student in students:
+        tasks.append(asyncio.create_task(student.run(start, stop)))
+        if args.ramp:
+            await asyncio.sleep(args.ramp / args.students)
+    await asyncio.sleep(1)
+
+    for teacher in teachers:
+        try:
+            await teacher.connect(students)
+        except Exception as e:
+            results.errors.append(f"teacher {teacher.index}: {e!r}")
+
+    usage = ServerUsage(args)
+    usage.start()
+    counts_before = event_counts(args)
+
+    results.measuring = True
+    start.set()
+    started = time.monotonic()
+    print(f"Measuring for {args.duration:.0f}s...", flush=True)
+    background = [asyncio.create_task(report_progress(args, results, stop, started, usage))]
+    connected = [teacher for teacher in teachers if teacher.client.connected]
+    if connected:
+        background.append(asyncio.create_task(connected[0].drive(stop)))
+
+    await asyncio.sleep(args.duration)
+    stop.set()
+    counts_after = event_counts(args)
+    elapsed = time.monotonic() - started
+
+    # Let in-flight frames reach the teachers before counting drops
+    await asyncio.sleep(args.grace)
+    results.measuring = False
+    await asyncio.gather(*tasks, *background, return_exceptions=True)
+    for teacher in teachers:
+        await teacher.client.disconnect()
+    usage.running = False
+
+    ingest = None
+    if counts_before is not None and counts_after is not None:
+        ingest = {event: (counts_after.get(event, 0) - counts_before.get(event, 0)) / elapsed
+                  for event in ('screen_update', 'process_update')}
+
+    latencies = results.latencies
+    dropped = max(0, results.expected - results.delivered)
+    summary = {
+        'url': args.url,
+        'students': args.students,
+        'students_connected': results.students_connected,
+        'teachers_connected': results.teachers_connected,
+        'seconds': round(elapsed, 1),
+        'frames_sent_per_s': round(results.frames_sent / elapsed, 1),
+        'frame_kb_avg': round(results.frames_bytes / results.frames_sent / 1024, 1) if results.frames_sent else 0,
+        'processes_sent_per_s': round(results.processes_sent / elapsed, 1),
+        'ingest_per_s': {event: round(rate, 1) for event, rate in ingest.items()} if ingest else None,
+        'frames_expected': results.expected,
+        'frames_delivered': results.delivered,
+        'frames_dropped': dropped,
+        'drop_ratio': round(dropped / results.expected, 3) if results.expected else 0,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50), 1),
+            'p95': round(percentile(latencies, 95), 1),
+            'p99': round(percentile(latencies, 99), 1),
+            'max': round(max(latencies, default=0), 1)
+        },
+        'server': {
+            'pid': usage.process.pid,
+            'cpu_avg': round(sum(usage.cpu) / len(usage.cpu), 1),
+            'cpu_max': round(max(usage.cpu), 1),
+            'rss_max_mb': round(max(usage.rss), 1)
+        } if usage.process and usage.cpu else None,
+        'locks': results.locks,
+        'unlocks': results.unlocks,
+        'polls': results.polls,
+        'poll_answers': results.poll_answers,
+        'poll_results': results.poll_results
+    }
+
+    print()
+    print(f"Server:        {args.url}")
+    print(f"Clients:       {results.students_connected}/{args.students} students "
+          f"(failed {results.students_failed}), {results.teachers_connected}/{args.teachers} teachers")
+    print(f"Sent:          {summary['frames_sent_per_s']} frames/s (avg {summary['frame_kb_avg']} KB), "
+          f"{summary['processes_sent_per_s']} process updates/s")
+    if ingest:
+        print(f"Ingest:        {ingest['screen_update']:.1f} screen_update/s, "
+              f"{ingest['process_update']:.1f} process_update/s (server /metrics)")
+    else:
+        print("Ingest:        /metrics not reachable (set --metrics-token if METRICS_TOKEN is set)")
+    print(f"Fan-out:       {results.delivered}/{results.expected} frames delivered, "
+          f"{dropped} dropped ({summary['drop_ratio']:.1%})")
+    print(f"Latency (ms):  p50 {summary['latency_ms']['p50']}  p95 {summary['latency_ms']['p95']}  "
+          f"p99 {summary['latency_ms']['p99']}  max {summary['latency_ms']['max']}")
+    if summary['server']:
+        server = summary['server']
+        print(f"Server usage:  cpu avg {server['cpu_avg']}%  max {server['cpu_max']}%  "
+              f"rss max {server['rss_max_mb']} MB (pid {server['pid']} and children)")
+    else:
+        print("Server usage:  not measured (server not local; pass --server-pid)")
+    if args.lock_every or args.poll_every:
+        print(f"Classroom:     {results.locks} locks / {results.unlocks} unlocks and {results.polls} polls "
+              f"reached students, {results.poll_answers} answers, {results.poll_results} results to teachers")
+    if results.errors:
+        print(f"Errors:        {len(results.errors)}, first: {results.errors[0]}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--students', type=int, default=100)
+    parser.add_argument('--teachers', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=30, help='seconds of measured load')
+    parser.add_argument('--ramp', type=float, default=10, help='seconds to spread student connects over')
+    parser.add_argument('--interval', type=float, default=3,
+                        help='minimum seconds between screenshots (the server may ask for slower)')
+    parser.add_argument('--process-interval', type=float, default=5, help='seconds between process updates')
+    parser.add_argument('--frames', type=int, default=16, help='distinct pre-generated screenshots per size')
+    parser.add_argument('--raw', action='store_true', help='send frames without a hash so the server recompresses them')
+    parser.add_argument('--off-task', type=float, default=0.1, help='share of students running a game')
+    parser.add_argument('--teacher-fps', type=float, default=None, help='max_fps each teacher asks for')
+    parser.add_argument('--watch', type=int, default=0, help='students on each teacher screen (0 = all)')
+    parser.add_argument('--lock-every', type=float, default=0, help='seconds between lock storms (0 = none)')
+    parser.add_argument('--lock-seconds', type=float, default=5, help='how long each lock lasts')
+    parser.add_argument('--poll-every', type=float, default=0, help='seconds between polls (0 = none)')
+    parser.add_argument('--poll-think', type=float, default=10, help='max seconds a student takes to answer')
+    parser.add_argument('--grace', type=float, default=3, help='seconds to wait for in-flight frames')
+    parser.add_argument('--report-every', type=float, default=5, help='seconds between progress lines')
+    parser.add_argument('--server-pid', type=int, help='server process to measure (default: found by port)')
+    parser.add_argument('--metrics-token', help='METRICS_TOKEN of the server')
+    parser.add_argument('--prefix', default='sim', help='student name/computer id prefix')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--json', help='also write the summary to this file')
+    asyncio.run(main(parser.parse_args()))